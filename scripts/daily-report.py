@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 # 添加邮件发送模块路径
 sys.path.insert(0, '/workspace/projects/workspace/skills/email-sender')
 from send_email import send_email
+from retry_metrics import read_metrics, summarize as summarize_retry_metrics
 
 class DailyReport:
     def __init__(self, report_date=None):
@@ -38,6 +39,7 @@ class DailyReport:
             'decisions': [],
             'todos': [],
             'token_usage': {'tokens': 0, 'cost': 0, 'requests': 0},
+            'retry_metrics': {'tasks': {}, 'targets': {}},
             'system_status': {}
         }
         
@@ -56,6 +58,9 @@ class DailyReport:
         
         # 收集token使用
         self._collect_token_usage()
+        
+        # 收集重试指标
+        self._collect_retry_metrics()
     
     def _collect_new_skills(self):
         """收集今日新增技能"""
@@ -137,6 +142,30 @@ class DailyReport:
         except:
             pass
     
+    def _collect_retry_metrics(self):
+        """收集重试指标（scripts/retry_metrics.py 导出的 Prometheus 文件，累计值）"""
+        try:
+            self.data['retry_metrics'] = summarize_retry_metrics(read_metrics())
+        except Exception:
+            pass
+    
+    def _retry_status(self):
+        """系统状态中"重试机制"一行的说明和状态"""
+        tasks = self.data['retry_metrics']['tasks']
+        targets = self.data['retry_metrics']['targets']
+        calls = sum(t['calls'] for t in tasks.values())
+        failed = sum(t['failed'] for t in tasks.values())
+        open_circuits = [name for name, t in targets.items() if t.get('circuit_open')]
+        
+        if not calls:
+            return '', 'status-success', '已启用'
+        desc = f'累计 {calls:.0f} 次调用，失败 {failed:.0f} 次（{failed / calls:.0%}）'
+        if open_circuits:
+            return desc + f'，已熔断: {", ".join(open_circuits)}', 'status-warning', '熔断'
+        if failed / calls > 0.2:
+            return desc, 'status-warning', '失败偏多'
+        return desc, 'status-success', '正常'
+    
     def generate_html(self):
         """生成HTML看板"""
         
@@ -149,6 +178,10 @@ class DailyReport:
         token_display = self.data['token_usage']['requests'] if self.data['token_usage']['requests'] else '~50K'
         cost_display = f"${self.data['token_usage']['cost']:.2f}" if self.data['token_usage']['cost'] else '~$1'
         
+        # 重试机制状态
+        retry_desc, retry_class, retry_label = self._retry_status()
+        retry_desc_html = f'<div class="list-desc">{retry_desc}</div>' if retry_desc else ''
+        
         html = f'''<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -457,8 +490,9 @@ class DailyReport:
                     <span class="list-icon">🔄</span>
                     <div class="list-content">
                         <div class="list-title">重试机制</div>
+                        {retry_desc_html}
                     </div>
-                    <span class="status status-success">已启用</span>
+                    <span class="status {retry_class}">{retry_label}</span>
                 </li>
                 <li class="list-item">
                     <span class="list-icon">📊</span>
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Markdown记忆全文索引
+对 memory/ 下的 .md 文件（raw、short-term、long-term...）逐行分词，写入SQLite FTS5倒排索引；
+按 mtime/size 跳过未变化的文件，只重建变化过的文件。查询返回按BM25排序的 文件:行号 片段。
+
+用法:
+  python3 memory_index.py index             # 增量更新索引
+  python3 memory_index.py search 飞书 延迟   # 查询（查询前自动增量更新）
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+from pathlib import Path
+
+# 复用 chinese-memory 的中文分词（安装jieba时用jieba，否则二元组切分）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "skills" / "chinese-memory" / "scripts"))
+from zh_text import tokenize
+from keyword_index import fts_query
+
+MEMORY_DIR = Path("/workspace/projects/workspace/memory")
+INDEX_NAME = ".search-index.db"
+
+# FTS行号 = 文件ID << LINE_BITS | 行号，删除一个文件的所有行只需一次rowid范围删除
+LINE_BITS = 22
+MAX_LINES = (1 << LINE_BITS) - 1
+SNIPPET_WIDTH = 80
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id       INTEGER PRIMARY KEY,
+    path     TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    lines    INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS line_fts USING fts5(tokens);
+"""
+
+
+class MemoryIndex:
+    """memory/ 目录的增量全文索引"""
+
+    def __init__(self, root: Path = MEMORY_DIR, db_path: Path = None):
+        self.root = Path(root)
+        self.db_path = Path(db_path) if db_path else self.root / INDEX_NAME
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _scan(self) -> dict:
+        """一次遍历拿到所有 .md 文件的 (mtime_ns, size)"""
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # 跳过隐藏目录
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.endswith(".md"):
+                    path = Path(dirpath) / name
+                    st = path.stat()
+                    found[path.relative_to(self.root).as_posix()] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def update(self, full: bool = False) -> dict:
+        """增量更新索引
+
+        Args:
+            full: 忽略 mtime/size，全部重建
+
+        Returns:
+            {"indexed": 重建的文件数, "skipped": 未变化的文件数, "removed": 已删除的文件数, "lines", "seconds"}
+        """
+        start = time.perf_counter()
+        current = self._scan()
+        known = {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size
+                 in self.conn.execute("SELECT id, path, mtime_ns, size FROM files")}
+
+        stats = {"indexed": 0, "skipped": 0, "removed": 0, "lines": 0}
+        with self.conn:
+            for path in known.keys() - current.keys():
+                self._drop(known[path][0])
+                stats["removed"] += 1
+
+            for path, (mtime_ns, size) in sorted(current.items()):
+                entry = known.get(path)
+                if entry and not full and entry[1:] == (mtime_ns, size):
+                    stats["skipped"] += 1
+                    continue
+                if entry:
+                    self._drop(entry[0])
+                stats["lines"] += self._index_file(path, mtime_ns, size)
+                stats["indexed"] += 1
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _drop(self, file_id: int):
+        base = file_id << LINE_BITS
+        self.conn.execute("DELETE FROM line_fts WHERE rowid BETWEEN ? AND ?", (base, base + MAX_LINES))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, path: str, mtime_ns: int, size: int) -> int:
+        with open(self.root / path, encoding="utf-8", errors="replace") as f:
+            text_lines = f.read().splitlines()[:MAX_LINES]
+        cursor = self.conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, lines) VALUES (?, ?, ?, ?)",
+            (path, mtime_ns, size, len(text_lines)))
+        base = cursor.lastrowid << LINE_BITS
+        rows = []
+        for line_no, line in enumerate(text_lines, 1):
+            tokens = tokenize(line)
+            if tokens:
+                rows.append((base + line_no, " ".join(tokens)))
+        self.conn.executemany("INSERT INTO line_fts (rowid, tokens) VALUES (?, ?)", rows)
+        return len(rows)
+
+    def search(self, query: str, limit: int = 20, path_prefix: str = None, context: int = 0) -> list:
+        """BM25检索
+
+        Args:
+            query: 查询文本
+            limit: 返回条数
+            path_prefix: 只搜索该前缀下的文件，如 raw/2026-03
+            context: 片段前后附带的行数
+
+        Returns:
+            [{"path", "line", "score", "snippet", "context"}]
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = ("SELECT f.path, line_fts.rowid & ?, -bm25(line_fts) FROM line_fts "
+               f"JOIN files f ON f.id = (line_fts.rowid >> {LINE_BITS}) "
+               "WHERE line_fts MATCH ?")
+        params = [MAX_LINES, match]
+        if path_prefix:
+            sql += " AND f.path LIKE ? ESCAPE '\\'"
+            escaped = path_prefix.strip("/").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(escaped + "%")
+        sql += " ORDER BY bm25(line_fts) LIMIT ?"
+        params.append(limit)
+        rows = self.conn.execute(sql, params).fetchall()
+
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t]
+        file_lines = {}
+        results = []
+        for path, line_no, score in rows:
+            if path not in file_lines:
+                try:
+                    with open(self.root / path, encoding="utf-8", errors="replace") as f:
+                        file_lines[path] = f.read().splitlines()
+                except OSError:
+                    file_lines[path] = []
+            content = file_lines[path]
+            line = content[line_no - 1] if line_no <= len(content) else ""
+            results.append({
+                "path": path,
+                "line": line_no,
+                "score": round(score, 4),
+                "snippet": make_snippet(line, terms),
+                "context": content[max(line_no - 1 - context, 0):line_no + context] if context else [],
+            })
+        return results
+
+    def stats(self) -> dict:
+        files, lines = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(lines), 0) FROM files").fetchone()
+        size = self.db_path.stat().st_size if self.db_path.exists() else 0
+        return {"files": files, "lines": lines, "index_bytes": size}
+
+    def close(self):
+        self.conn.close()
+
+
+def make_snippet(line: str, terms: list, width: int = SNIPPET_WIDTH) -> str:
+    """截取命中词附近的一段文本"""
+    line = line.strip()
+    if len(line) <= width:
+        return line
+    lowered = line.lower()
+    positions = [lowered.find(t) for t in terms if lowered.find(t) >= 0]
+    center = min(positions) if positions else 0
+    start = max(center - width // 3, 0)
+    end = min(start + width, len(line))
+    start = max(end - width, 0)
+    return ("…" if start > 0 else "") + line[start:end] + ("…" if end < len(line) else "")
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Markdown记忆全文索引")
+    parser.add_argument("--root", default=str(MEMORY_DIR), help="memory目录")
+    subparsers = parser.add_subparsers(dest="command", help="子命令")
+
+    index_parser = subparsers.add_parser("index", help="增量更新索引")
+    index_parser.add_argument("--full", action="store_true", help="忽略mtime/size，全部重建")
+
+    search_parser = subparsers.add_parser("search", help="全文检索")
+    search_parser.add_argument("query", nargs="+", help="查询词")
+    search_parser.add_argument("-n", "--limit", type=int, default=20, help="返回条数")
+    search_parser.add_argument("--path", help="只搜索该前缀下的文件，如 raw/2026-03")
+    search_parser.add_argument("-C", "--context", type=int, default=0, help="显示前后N行")
+    search_parser.add_argument("--no-update", action="store_true", help="查询前不增量更新索引")
+    search_parser.add_argument("--json", action="store_true", help="输出JSON")
+
+    subparsers.add_parser("stats", help="索引统计")
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"❌ 目录不存在: {root}")
+        sys.exit(1)
+    index = MemoryIndex(root)
+
+    if args.command == "index":
+        stats = index.update(full=args.full)
+        print(f"✅ 索引更新完成: 重建 {stats['indexed']} 个文件（{stats['lines']} 行），"
+              f"跳过 {stats['skipped']} 个未变化，移除 {stats['removed']} 个，耗时 {stats['seconds']}s")
+
+    elif args.command == "search":
+        if not args.no_update:
+            index.update()
+        query = " ".join(args.query)
+        start = time.perf_counter()
+        results = index.search(query, limit=args.limit, path_prefix=args.path, context=args.context)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        if not results:
+            print("未找到匹配内容")
+        for r in results:
+            if r["context"]:
+                print(f"{r['path']}:{r['line']}")
+                for offset, text in enumerate(r["context"]):
+                    line_no = max(r["line"] - args.context, 1) + offset
+                    marker = ">" if line_no == r["line"] else " "
+                    print(f"  {marker}{line_no:>5}: {text}")
+            else:
+                print(f"{r['path']}:{r['line']}: {r['snippet']}")
+        print(f"\n{len(results)} 条结果，查询耗时 {elapsed:.1f}ms", file=sys.stderr)
+
+    elif args.command == "stats":
+        stats = index.stats()
+        print(f"📚 已索引 {stats['files']} 个文件，{stats['lines']} 行，索引大小 {stats['index_bytes'] / 1024:.1f}KB")
+
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+记忆系统生命周期管理
+一次遍历 stat 全部文件生成执行计划，再按计划执行：
+删除过期工作记忆、归档短期对话和已完成任务、压缩 raw/ 月份目录、清理 vault/ 过期归档。
+raw/ 月份目录在进程池中并行压缩为可随机访问的归档（见 vault_archive.py），
+统计数据由扫描结果和执行计划推算，只改写 index.md 中变化的统计行，日志追加到 .lifecycle-log。
+
+用法:
+  python3 memory_lifecycle.py            # 执行
+  python3 memory_lifecycle.py --dry-run  # 只打印计划
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from vault_archive import pack, ARCHIVE_SUFFIX
+
+WORKSPACE_DIR = Path("/workspace/projects/workspace")
+MEMORY_DIR = WORKSPACE_DIR / "memory"
+LOG_NAME = ".lifecycle-log"
+
+# ==================== 配置 ====================
+
+WORKING_MAX_AGE_DAYS = 1           # 工作记忆保留天数
+CONVERSATION_MAX_AGE_DAYS = 30     # 对话保留天数
+COMPLETED_TASK_MAX_AGE_DAYS = 90   # 已完成任务保留天数
+RAW_MAX_AGE_DAYS = 90              # 原始记录保留天数
+VAULT_MAX_AGE_DAYS = 365           # 归档保留天数
+
+COMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+
+# index.md 中的统计行 → 统计的顶层目录
+INDEX_STATS = {
+    "长期记忆": "long-term",
+    "短期记忆": "short-term",
+    "工作记忆": "working",
+    "原始记录": "raw",
+}
+STAT_DIRS = ("working", "short-term", "long-term", "raw", "vault")
+
+DAY = 86400
+
+
+# ==================== 扫描 ====================
+
+def scan(root: Path) -> dict:
+    """一次遍历 STAT_DIRS 下的所有文件
+
+    Returns:
+        {相对路径: (mtime, size)}，只包含文件
+    """
+    files = {}
+    stack = [root / name for name in STAT_DIRS if (root / name).is_dir()]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    files[Path(entry.path).relative_to(root).as_posix()] = (st.st_mtime, st.st_size)
+    return files
+
+
+# ==================== 计划 ====================
+
+def build_plan(files: dict, now: float = None) -> list:
+    """根据扫描结果生成执行计划
+
+    Returns:
+        [{"action": delete|move|compress, "path", "dest", "age_days", "files", "size"}]
+    """
+    now = now or time.time()
+    plan = []
+
+    def age(mtime):
+        return now - mtime
+
+    raw_months = {}
+    for path, (mtime, size) in sorted(files.items()):
+        parts = path.split("/")
+        top = parts[0]
+
+        # 1. working/ 中超过1天的 .md 文件
+        if top == "working" and path.endswith(".md") and age(mtime) > WORKING_MAX_AGE_DAYS * DAY:
+            plan.append({"action": "delete", "path": path, "age_days": int(age(mtime) // DAY), "size": size})
+
+        # 2. short-term/conversations/ 中超过30天的对话
+        elif (parts[:2] == ["short-term", "conversations"] and path.endswith(".md")
+              and age(mtime) > CONVERSATION_MAX_AGE_DAYS * DAY):
+            plan.append({"action": "move", "path": path, "dest": f"vault/conversations/{parts[-1]}",
+                         "age_days": int(age(mtime) // DAY), "size": size})
+
+        # 3. completed.md 超过90天
+        elif path == "short-term/tasks/completed.md" and age(mtime) > COMPLETED_TASK_MAX_AGE_DAYS * DAY:
+            month = datetime.fromtimestamp(mtime).strftime("%Y-%m")
+            plan.append({"action": "move", "path": path, "dest": f"vault/tasks/completed-{month}.md",
+                         "age_days": int(age(mtime) // DAY), "size": size})
+
+        # 4. raw/ 月份目录：以目录内最新文件的修改时间为准
+        elif top == "raw" and len(parts) > 2:
+            month = raw_months.setdefault(parts[1], {"mtime": 0, "files": 0, "size": 0})
+            month["mtime"] = max(month["mtime"], mtime)
+            month["files"] += 1
+            month["size"] += size
+
+        # 5. vault/ 中超过1年的归档
+        elif top == "vault" and age(mtime) > VAULT_MAX_AGE_DAYS * DAY:
+            plan.append({"action": "delete", "path": path, "age_days": int(age(mtime) // DAY), "size": size})
+
+    for month, info in sorted(raw_months.items()):
+        if age(info["mtime"]) > RAW_MAX_AGE_DAYS * DAY:
+            plan.append({"action": "compress", "path": f"raw/{month}",
+                         "dest": f"vault/raw/{month}{ARCHIVE_SUFFIX}",
+                         "age_days": int(age(info["mtime"]) // DAY),
+                         "files": info["files"], "size": info["size"]})
+    return plan
+
+
+def project_counts(files: dict, plan: list) -> dict:
+    """由扫描结果和计划推算执行后各目录的文件数（无需再次遍历）"""
+    counts = {name: 0 for name in STAT_DIRS}
+    for path in files:
+        counts[path.split("/", 1)[0]] += 1
+    for step in plan:
+        top = step["path"].split("/", 1)[0]
+        if step["action"] == "delete":
+            counts[top] -= 1
+        elif step["action"] == "move":
+            counts[top] -= 1
+            counts["vault"] += 1
+        elif step["action"] == "compress":
+            counts["raw"] -= step["files"]
+            counts["vault"] += 1
+    return counts
+
+
+# ==================== 执行 ====================
+
+def compress_dir(root: str, rel_dir: str, dest: str) -> dict:
+    """把一个 raw/ 月份目录打包为可随机访问的归档（在子进程中执行）"""
+    root = Path(root)
+    started = time.perf_counter()
+    stats = pack(root / rel_dir, root / dest)
+    return {"path": rel_dir, "dest": dest, "bytes": stats["archive_bytes"],
+            "members": stats["members"], "seconds": round(time.perf_counter() - started, 2)}
+
+
+def remove_archived(source: Path, members: list) -> None:
+    """只删除已写入归档的文件，再自底向上删除空目录
+
+    扫描之后新写入的文件不在归档里，保留在原目录中。
+    """
+    for rel in members:
+        (source / rel).unlink(missing_ok=True)
+    dirs = sorted((p for p in source.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True)
+    for path in dirs + [source]:
+        try:
+            path.rmdir()
+        except OSError:
+            pass  # 目录非空：还有未归档的新文件
+
+
+def execute(root: Path, plan: list, workers: int = COMPRESS_WORKERS, log=print) -> dict:
+    """按计划执行，返回 {"done": 成功步数, "failed": [(路径, 错误)]}"""
+    done, failed = 0, []
+
+    for step in plan:
+        if step["action"] == "compress":
+            continue
+        src = root / step["path"]
+        try:
+            if step["action"] == "delete":
+                src.unlink()
+            else:
+                dest = root / step["dest"]
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(src), str(dest))
+            done += 1
+        except OSError as e:
+            failed.append((step["path"], str(e)))
+            log(f"  ❌ {step['path']}: {e}")
+
+    compress = [step for step in plan if step["action"] == "compress"]
+    if compress:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(compress)))) as pool:
+            futures = {pool.submit(compress_dir, str(root), step["path"], step["dest"]): step
+                       for step in compress}
+            for future in as_completed(futures):
+                step = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append((step["path"], f"{type(e).__name__}: {e}"))
+                    log(f"  ❌ 压缩失败: {step['path']}/ ({e})")
+                    continue
+                # 归档写完后才删除，且只删除归档里的文件
+                try:
+                    remove_archived(root / step["path"], result["members"])
+                except OSError as e:
+                    failed.append((step["path"], str(e)))
+                    log(f"  ❌ {step['path']}: {e}")
+                    continue
+                done += 1
+                ratio = result["bytes"] / step["size"] if step["size"] else 0
+                log(f"  ✓ {step['path']}/ → {result['dest']} "
+                    f"({step['size'] / 1024:.1f}KB → {result['bytes'] / 1024:.1f}KB, {ratio:.0%}, {result['seconds']}s)")
+
+    return {"done": done, "failed": failed}
+
+
+# ==================== index.md / 日志 ====================
+
+def update_index(index_path: Path, counts: dict, today: str) -> bool:
+    """只改写 index.md 中变化的统计行，内容不变时不写文件"""
+    if not index_path.exists():
+        return False
+    lines = index_path.read_text(encoding="utf-8").split("\n")
+    changed = False
+    for i, line in enumerate(lines):
+        for label, top in INDEX_STATS.items():
+            prefix = f"- {label}: "
+            if line.startswith(prefix):
+                new_line = f"{prefix}{counts[top]} 文件"
+                if line != new_line:
+                    lines[i] = new_line
+                    changed = True
+    if changed:
+        for i, line in enumerate(lines):
+            if line.startswith("**最后更新**:"):
+                lines[i] = f"**最后更新**: {today}"
+        tmp = index_path.with_name(index_path.name + ".tmp")
+        tmp.write_text("\n".join(lines), encoding="utf-8")
+        os.replace(tmp, index_path)
+    return changed
+
+
+def describe(step: dict) -> str:
+    if step["action"] == "compress":
+        return (f"🗜️  压缩: {step['path']}/ → {step['dest']} "
+                f"({step['files']} 文件, {step['size'] / 1024:.1f}KB, 已存在 {step['age_days']} 天)")
+    if step["action"] == "move":
+        return f"📦 归档: {step['path']} → {step['dest']} (已存在 {step['age_days']} 天)"
+    return f"🗑️  删除: {step['path']} (已存在 {step['age_days']} 天)"
+
+
+SECTIONS = [
+    ("working/", f"[1/5] 清理 working/ 目录 (保留 {WORKING_MAX_AGE_DAYS} 天)"),
+    ("short-term/conversations/", f"[2/5] 归档短期对话 (超过 {CONVERSATION_MAX_AGE_DAYS} 天)"),
+    ("short-term/tasks/", f"[3/5] 归档已完成任务 (超过 {COMPLETED_TASK_MAX_AGE_DAYS} 天)"),
+    ("raw/", f"[4/5] 压缩原始记录 (超过 {RAW_MAX_AGE_DAYS} 天)"),
+    ("vault/", f"[5/5] 清理 vault/ 过期归档 (超过 {VAULT_MAX_AGE_DAYS} 天)"),
+]
+
+
+def run(root: Path = MEMORY_DIR, dry_run: bool = False, workers: int = COMPRESS_WORKERS,
+        now: float = None) -> dict:
+    """执行一次生命周期管理，返回 {"plan", "counts", "result"}"""
+    now = now or time.time()
+    today = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+    output = []
+
+    def log(line=""):
+        print(line)
+        output.append(line)
+
+    title = "🧹 记忆系统生命周期管理" + (" (dry-run)" if dry_run else "")
+    log(f"{title} - {today}")
+    log("================================")
+
+    started = time.perf_counter()
+    files = scan(root)
+    plan = build_plan(files, now)
+    counts = project_counts(files, plan)
+    log(f"🔎 扫描 {len(files)} 个文件，计划 {len(plan)} 项操作 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    for prefix, heading in SECTIONS:
+        log()
+        log(f"📂 {heading}")
+        steps = [s for s in plan if s["path"].startswith(prefix)]
+        if not steps:
+            log("  ✅ 无需处理")
+        for step in steps:
+            log(f"  {describe(step)}")
+
+    result = {"done": 0, "failed": []}
+    if not dry_run and plan:
+        log()
+        log(f"⚙️  执行计划 (压缩进程数 {workers})")
+        result = execute(root, plan, workers=workers, log=log)
+        log(f"  ✓ 完成 {result['done']} 项" + (f"，失败 {len(result['failed'])} 项" if result["failed"] else ""))
+
+    log()
+    log("📊 [统计] " + ("执行后预计" if dry_run else "记忆系统状态"))
+    for name in STAT_DIRS:
+        log(f"  📁 {name}/: {counts[name]} 文件")
+    if not dry_run and not result["failed"] and update_index(root / "index.md", counts, today):
+        log("  ✓ 已更新 index.md 统计")
+
+    log()
+    log("✅ 生命周期管理完成！" if not dry_run else "ℹ️ dry-run 未修改任何文件")
+    log(f"下次运行: {(datetime.fromtimestamp(now) + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')}")
+    log("================================")
+    log()
+
+    if not dry_run:
+        with open(root / LOG_NAME, "a", encoding="utf-8") as f:
+            f.write("\n".join(output) + "\n")
+
+    return {"plan": plan, "counts": counts, "result": result}
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="记忆系统生命周期管理")
+    parser.add_argument("--root", default=str(MEMORY_DIR), help="memory目录")
+    parser.add_argument("--dry-run", action="store_true", help="只打印执行计划，不修改文件")
+    parser.add_argument("--workers", type=int, default=COMPRESS_WORKERS, help="压缩进程数")
+    parser.add_argument("--json", action="store_true", help="以JSON输出执行计划（不执行）")
+
+    args = parser.parse_args()
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"❌ 目录不存在: {root}")
+        sys.exit(1)
+
+    if args.json:
+        files = scan(root)
+        plan = build_plan(files)
+        print(json.dumps({"plan": plan, "counts": project_counts(files, plan)}, ensure_ascii=False, indent=2))
+        return
+
+    outcome = run(root, dry_run=args.dry_run, workers=args.workers)
+    if outcome["result"]["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+结构化重试日志
+每次尝试记录为一行 JSON，先写入内存缓冲区，由后台线程定期批量追加到 memory/logs/retry-log.jsonl；
+文件超过大小上限时轮转为 retry-log.<首条毫秒时间戳>-<末条毫秒时间戳>.jsonl，
+查询时按文件名中的时间范围只读取相关分段。
+
+用法:
+  python3 retry_log.py summary --since 24h
+  python3 retry_log.py tail -n 20
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import atexit
+import threading
+from datetime import datetime
+from pathlib import Path
+
+RETRY_LOG_DIR = Path("/workspace/projects/workspace/memory/logs")
+LOG_NAME = "retry-log.jsonl"
+
+MAX_BYTES = 1024 * 1024      # 单个文件上限，超过后轮转
+MAX_SEGMENTS = 20            # 保留的轮转分段数
+FLUSH_INTERVAL = 2.0         # 后台刷盘间隔（秒）
+FLUSH_SIZE = 200             # 缓冲区达到该条数时立即刷盘
+
+SEGMENT_PATTERN = re.compile(r"^retry-log\.(\d+)-(\d+)\.jsonl$")
+
+# 结束一次任务的事件（用于统计成功率）
+FINAL_EVENTS = ("success", "failed", "gave_up", "circuit_open", "budget_exhausted")
+
+
+class RetryLogger:
+    """带缓冲和轮转的 JSON lines 日志（线程安全；多进程通过文件锁串行刷盘）"""
+
+    def __init__(self, log_dir=RETRY_LOG_DIR, max_bytes=MAX_BYTES, max_segments=MAX_SEGMENTS,
+                 flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE):
+        self.log_dir = Path(log_dir)
+        self.path = self.log_dir / LOG_NAME
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        atexit.register(self.close)
+
+    # ---------- 写入 ----------
+
+    def log(self, task, attempt, max_attempts, event, error=None, delay=None, target=None, message=None):
+        """记录一次尝试（只写入缓冲区）"""
+        now = time.time()
+        record = {
+            "ts": round(now, 3),
+            "time": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+            "task": task,
+            "attempt": attempt,
+            "max_attempts": max_attempts,
+            "event": event,
+        }
+        if delay is not None:
+            record["delay"] = round(delay, 3)
+        if target:
+            record["target"] = target
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {str(error)[:200]}"
+        if message:
+            record["message"] = message
+
+        with self._lock:
+            self._buffer.append(record)
+            pending = len(self._buffer)
+        self._ensure_flusher()
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._run_flusher, name="retry-log-flusher",
+                                                     daemon=True)
+                    self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ 重试日志写入失败: {e}", file=sys.stderr)
+
+    def flush(self):
+        """把缓冲区一次性追加到日志文件，必要时轮转"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return 0
+            data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.log_dir / ".retry-log.lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                    size = os.fstat(fd).st_size
+                finally:
+                    os.close(fd)
+                if size >= self.max_bytes:
+                    self._rotate()
+            return len(records)
+
+    def _rotate(self):
+        """当前文件改名为带时间范围的分段，删除多余的旧分段（调用方持有文件锁）"""
+        first = last = None
+        with open(self.path, "rb") as f:
+            first_line = f.readline()
+            f.seek(max(0, os.fstat(f.fileno()).st_size - 4096))
+            tail = f.read().splitlines()
+        try:
+            first = int(json.loads(first_line)["ts"] * 1000)
+            last = int(json.loads(tail[-1])["ts"] * 1000) + 1
+        except (ValueError, KeyError, IndexError):
+            first = last = int(time.time() * 1000)
+        target = self.log_dir / f"retry-log.{first}-{last}.jsonl"
+        while target.exists():
+            last += 1
+            target = self.log_dir / f"retry-log.{first}-{last}.jsonl"
+        os.replace(self.path, target)
+
+        segments = self.segments()
+        for _, _, path in segments[:max(0, len(segments) - self.max_segments)]:
+            path.unlink(missing_ok=True)
+
+    def close(self):
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    # ---------- 查询 ----------
+
+    def segments(self):
+        """轮转分段 [(起始时间戳, 结束时间戳, 路径)]（秒），按时间排序"""
+        if not self.log_dir.is_dir():
+            return []
+        found = []
+        for path in self.log_dir.iterdir():
+            match = SEGMENT_PATTERN.match(path.name)
+            if match:
+                found.append((int(match.group(1)) / 1000, int(match.group(2)) / 1000, path))
+        return sorted(found)
+
+    def files_for(self, since=None, until=None):
+        """时间窗口涉及的文件（分段按文件名中的时间范围过滤，当前文件按修改时间过滤）"""
+        files = [path for start, end, path in self.segments()
+                 if (since is None or end >= since) and (until is None or start <= until)]
+        if self.path.exists() and (since is None or self.path.stat().st_mtime >= since):
+            files.append(self.path)
+        return files
+
+    def query(self, since=None, until=None, task=None):
+        """按时间窗口和任务名产出记录（包含尚未刷盘的缓冲区）"""
+        with self._lock:
+            pending = list(self._buffer)
+
+        def wanted(record):
+            ts = record.get("ts", 0)
+            return ((since is None or ts >= since) and (until is None or ts <= until)
+                    and (task is None or record.get("task") == task))
+
+        for path in self.files_for(since, until):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if wanted(record):
+                            yield record
+            except FileNotFoundError:
+                # 读取过程中被其他进程轮转
+                continue
+        for record in pending:
+            if wanted(record):
+                yield record
+
+    def summarize(self, since=None, until=None, task=None):
+        """按任务汇总
+
+        Returns:
+            {任务名: {"attempts", "retries", "successes", "failures", "failure_rate", "time_lost", "last_error", "last_time"}}
+            failure_rate 只统计发生过重试的执行（首次即成功的执行不写日志）
+        """
+        summary = {}
+        for record in self.query(since, until, task):
+            stats = summary.setdefault(record["task"], {
+                "attempts": 0, "retries": 0, "successes": 0, "failures": 0,
+                "failure_rate": 0.0, "time_lost": 0.0, "last_error": None, "last_time": None,
+            })
+            stats["attempts"] += 1
+            event = record.get("event")
+            if event == "retry":
+                stats["retries"] += 1
+                stats["time_lost"] += record.get("delay") or 0
+            elif event == "success":
+                stats["successes"] += 1
+            elif event in FINAL_EVENTS:
+                stats["failures"] += 1
+            if record.get("error"):
+                stats["last_error"] = record["error"]
+            stats["last_time"] = record.get("time")
+
+        for stats in summary.values():
+            finished = stats["successes"] + stats["failures"]
+            stats["failure_rate"] = round(stats["failures"] / finished, 3) if finished else 0.0
+            stats["time_lost"] = round(stats["time_lost"], 1)
+        return summary
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_logger():
+    """进程内共享的日志实例"""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = RetryLogger()
+        return _logger
+
+
+def parse_since(value):
+    """解析时间窗口：30m / 24h / 7d，或 YYYY-MM-DD[ HH:MM]；返回时间戳"""
+    if value is None:
+        return None
+    match = re.fullmatch(r"(\d+)([smhd])", value.strip())
+    if match:
+        seconds = int(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return time.time() - seconds
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"无法解析时间: {value}")
+
+
+def format_record(record):
+    """与旧版 markdown 日志相同的单行格式"""
+    line = f"[{record['time']}] {record['task']} - 尝试 {record['attempt']}/{record['max_attempts']} - " \
+           f"{record.get('message') or record['event']}"
+    if record.get("error"):
+        line += f" - 错误: {record['error']}"
+    return line
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重试日志查询")
+    parser.add_argument("--dir", default=str(RETRY_LOG_DIR), help="日志目录")
+    subparsers = parser.add_subparsers(dest="command", help="子命令")
+
+    summary_parser = subparsers.add_parser("summary", help="按任务汇总重试次数、失败率和等待时间")
+    summary_parser.add_argument("--since", default="24h", help="起始时间：24h / 7d / 2026-03-01（默认24h）")
+    summary_parser.add_argument("--until", help="结束时间")
+    summary_parser.add_argument("--task", help="只看该任务")
+    summary_parser.add_argument("--json", action="store_true", help="输出JSON")
+
+    tail_parser = subparsers.add_parser("tail", help="最近的日志")
+    tail_parser.add_argument("-n", type=int, default=20, help="条数")
+    tail_parser.add_argument("--since", default="7d", help="起始时间（默认7d）")
+    tail_parser.add_argument("--task", help="只看该任务")
+
+    args = parser.parse_args()
+    logger = RetryLogger(args.dir)
+
+    try:
+        since = parse_since(args.since) if args.command else None
+        until = parse_since(getattr(args, "until", None))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.command == "summary":
+        summary = logger.summarize(since, until, args.task)
+        if args.json:
+            print(json.dumps(summary, ensure_ascii=False, indent=2))
+            return
+        if not summary:
+            print("暂无重试记录")
+            return
+        print(f"{'任务':<24}{'尝试':>6}{'重试':>6}{'成功':>6}{'失败':>6}{'失败率':>8}{'等待(s)':>9}")
+        print("-" * 65)
+        for name, s in sorted(summary.items(), key=lambda item: -item[1]["attempts"]):
+            print(f"{name:<24}{s['attempts']:>6}{s['retries']:>6}{s['successes']:>6}{s['failures']:>6}"
+                  f"{s['failure_rate']:>8.0%}{s['time_lost']:>9.1f}")
+
+    elif args.command == "tail":
+        records = list(logger.query(since, task=args.task))[-args.n:]
+        if not records:
+            print("暂无重试记录")
+        for record in records:
+            print(format_record(record))
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,243 +1,622 @@
 #!/usr/bin/env python3
 """
 自动重试机制
-为关键任务提供自动重试功能
+为关键任务提供自动重试功能：指数退避 + 抖动（jitter）+ 最大延迟，
+按依赖（SMTP、飞书、Tavily...）熔断和限制重试预算，支持 Retry-After，提供同步和 asyncio 两种版本；
+每次调用的尝试次数、耗时和最终结果导出为 Prometheus 指标（见 retry_metrics.py）
 """
 
 import time
+import random
+import asyncio
+import inspect
 import functools
-from datetime import datetime
-from pathlib import Path
-
-# 重试日志文件
-RETRY_LOG = Path("/workspace/projects/workspace/memory/logs/retry-log.md")
-
-def log_retry(task_name, attempt, max_attempts, error, status):
-    """记录重试日志"""
-    RETRY_LOG.parent.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {task_name} - 尝试 {attempt}/{max_attempts} - {status}"
-    if error:
-        log_entry += f" - 错误: {str(error)[:100]}"
-    log_entry += "\n"
-    
-    with open(RETRY_LOG, "a") as f:
-        f.write(log_entry)
-
-def retry_with_backoff(max_attempts=3, initial_delay=1, backoff_factor=2, 
-                       exceptions=(Exception,), on_failure=None):
+import threading
+from email.utils import parsedate_to_datetime
+
+from retry_log import get_logger, format_record, RETRY_LOG_DIR, LOG_NAME
+from retry_metrics import get_metrics
+
+# 重试日志文件（JSON lines，见 retry_log.py）
+RETRY_LOG = RETRY_LOG_DIR / LOG_NAME
+
+# 抖动策略：none 固定指数退避（默认，与原有行为一致）；full 在 [0, 退避值] 内随机；decorrelated 在 [初始延迟, 上次延迟*3] 内随机
+JITTER_NONE = "none"
+JITTER_FULL = "full"
+JITTER_DECORRELATED = "decorrelated"
+DEFAULT_JITTER = JITTER_NONE
+
+# 单次等待的上限（秒）；服务端要求的 Retry-After 超过该值时直接放弃
+DEFAULT_MAX_DELAY = 60
+
+# 熔断：连续失败 N 次后打开，冷却 reset_timeout 秒后放行一次试探请求
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+
+# 重试预算（令牌桶）：同一 budget（默认取 target）的所有装饰器共享。每次首次调用存入 ratio 个令牌，
+# 每次重试消耗1个，不按时间补充，故障时重试量不超过 capacity + 调用量*ratio，避免把负载放大数倍；
+# 初始为满桶，偶发失败的低流量任务仍可以重试。
+# 令牌桶只在进程内存中，上限按进程计算：定时任务这类短命进程每次都从满桶开始，
+# 只在常驻进程（守护进程、长时间运行的脚本）中才会真正限流
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_CAPACITY = 10
+# 既未指定 budget 也未指定 target 的任务共用的预算
+GLOBAL_BUDGET = "global"
+
+def log_retry(task_name, attempt, max_attempts, error, status, event=None, delay=None, target=None):
+    """记录重试日志（写入缓冲区，由后台线程批量刷盘）
+
+    Args:
+        status: 给人看的状态说明
+        event: 结构化事件 retry / success / failed / gave_up / circuit_open / budget_exhausted，用于统计
+        delay: 下次重试前的等待秒数
+        target: 依赖名
+    """
+    get_logger().log(task_name, attempt, max_attempts, event or "failed", error=error,
+                     delay=delay, target=target, message=status)
+
+# ==================== 熔断器 ====================
+
+class CircuitOpenError(Exception):
+    """熔断打开时快速失败，不再调用下游依赖"""
+
+    def __init__(self, target, retry_after):
+        super().__init__(f"{target} 已熔断，{retry_after:.1f}秒后再试")
+        self.target = target
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """单个依赖的熔断器（线程安全）
+
+    closed: 正常放行，连续失败达到阈值后转为 open
+    open: 直接抛出 CircuitOpenError，冷却时间到后转为 half_open
+    half_open: 只放行一个试探请求，成功则 closed，失败则重新 open
+    """
+
+    def __init__(self, target, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.target = target
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """调用前检查，熔断打开时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.target, max(remaining, 0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """调用因无关异常或取消而结束时，只归还试探名额，不改变熔断状态"""
+        with self._lock:
+            self._probing = False
+
+    @property
+    def is_open(self):
+        return self.state == "open"
+
+    def status(self):
+        return {"target": self.target, "state": self.state, "failures": self.failures}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(target, failure_threshold=None, reset_timeout=None):
+    """按依赖名取得熔断器（同一进程内共享）"""
+    with _breakers_lock:
+        breaker = _breakers.get(target)
+        if breaker is None:
+            breaker = _breakers[target] = CircuitBreaker(
+                target,
+                failure_threshold or CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout or CIRCUIT_RESET_TIMEOUT,
+            )
+        return breaker
+
+def breaker_status():
+    """所有熔断器的状态"""
+    with _breakers_lock:
+        return [b.status() for b in _breakers.values()]
+
+# ==================== 重试预算 ====================
+
+class RetryBudget:
+    """单个依赖的重试预算（令牌桶，线程安全）"""
+
+    def __init__(self, key, ratio=RETRY_BUDGET_RATIO, capacity=RETRY_BUDGET_CAPACITY):
+        self.key = key
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """首次调用时存入令牌"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """重试前消耗1个令牌，预算不足时返回 False"""
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def status(self):
+        with self._lock:
+            return {"key": self.key, "tokens": round(self.tokens, 2), "exhausted": self.exhausted}
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+def get_budget(key, ratio=None, capacity=None):
+    """按预算名取得重试预算（同一进程内共享，不跨进程）"""
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = RetryBudget(
+                key,
+                RETRY_BUDGET_RATIO if ratio is None else ratio,
+                capacity or RETRY_BUDGET_CAPACITY,
+            )
+        return budget
+
+def budget_status():
+    """所有重试预算的状态"""
+    with _budgets_lock:
+        budgets = list(_budgets.values())
+    return [b.status() for b in budgets]
+
+# ==================== 退避计算 ====================
+
+def parse_retry_after(value):
+    """解析 Retry-After：秒数或 HTTP 日期，返回等待秒数；无法解析时返回 None"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def retry_after_from(error):
+    """从异常中取出服务端要求的等待时间
+
+    支持异常自带 retry_after 属性，或 requests.HTTPError 这类带 response.headers 的异常
+    """
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            value = headers.get("Retry-After")
+    return parse_retry_after(value)
+
+def compute_delay(attempt, previous_delay=None, initial_delay=1, backoff_factor=2,
+                  max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER):
+    """第 attempt 次失败后的等待时间（秒）"""
+    if jitter == JITTER_DECORRELATED:
+        previous = previous_delay or initial_delay
+        return min(max_delay, random.uniform(initial_delay, previous * 3))
+    delay = min(max_delay, initial_delay * backoff_factor ** (attempt - 1))
+    if jitter == JITTER_FULL:
+        return random.uniform(0, delay)
+    return delay
+
+class RetryPolicy:
+    """重试策略：决定每次失败后等待多久、何时放弃，并记录日志和指标
+
+    同步重试和 async_retry 共用同一套逻辑，只是等待方式不同
+    """
+
+    def __init__(self, max_attempts=3, initial_delay=1, backoff_factor=2,
+                 max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER,
+                 exceptions=(Exception,), target=None, budget=None):
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        # 兼容传入单个异常类，如 exceptions=ValueError
+        self.exceptions = tuple(exceptions) if isinstance(exceptions, (tuple, list, set)) else (exceptions,)
+        self.target = target
+        self.breaker = get_breaker(target) if target else None
+        self.budget = get_budget(budget or target or GLOBAL_BUDGET)
+
+    def before_attempt(self, task_name, attempt, started):
+        """首次尝试时存入重试预算；熔断打开时记录日志并抛出 CircuitOpenError"""
+        if attempt == 1:
+            self.budget.deposit()
+        if self.breaker is None:
+            return
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            log_retry(task_name, attempt, self.max_attempts, e, "⚡ 熔断，跳过",
+                      event="circuit_open", target=self.target)
+            self.finish(task_name, attempt - 1, started, "circuit_open")
+            raise
+
+    def succeeded(self, task_name, attempt, started):
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if attempt > 1:
+            log_retry(task_name, attempt, self.max_attempts, None, "✅ 成功",
+                      event="success", target=self.target)
+        self.finish(task_name, attempt, started, "success")
+
+    def finish(self, task_name, attempts, started, outcome):
+        """记录一次调用的最终结果指标"""
+        metrics = get_metrics()
+        if self.target:
+            metrics.set("retry_circuit_open", {"target": self.target}, int(self.breaker.is_open))
+        metrics.set("retry_budget_tokens", {"target": self.budget.key}, self.budget.status()["tokens"])
+        metrics.record_call(task_name, self.target, attempts, time.monotonic() - started, outcome)
+
+    def aborted(self, task_name, attempt, started, outcome):
+        """不在重试范围内的异常或任务被取消：释放熔断试探名额，只记录指标"""
+        if self.breaker is not None:
+            self.breaker.release()
+        self.finish(task_name, attempt, started, outcome)
+
+    def failed(self, task_name, attempt, error, previous_delay, started):
+        """记录一次失败，返回下次重试前的等待秒数；返回 None 表示放弃"""
+        delay, outcome = self._next_delay(task_name, attempt, error, previous_delay)
+        if delay is None:
+            self.finish(task_name, attempt, started, outcome)
+        return delay
+
+    def _next_delay(self, task_name, attempt, error, previous_delay):
+        """返回 (等待秒数, None) 或 (None, 最终结果)"""
+        if isinstance(error, CircuitOpenError):
+            return None, "circuit_open"
+        if self.breaker is not None:
+            self.breaker.record_failure()
+            if self.breaker.is_open:
+                log_retry(task_name, attempt, self.max_attempts, error, f"⚡ {self.target} 熔断，停止重试",
+                          event="circuit_open", target=self.target)
+                return None, "circuit_open"
+        if attempt >= self.max_attempts:
+            log_retry(task_name, attempt, self.max_attempts, error, "❌ 最终失败",
+                      event="failed", target=self.target)
+            return None, "failed"
+        if not self.budget.withdraw():
+            log_retry(task_name, attempt, self.max_attempts, error, f"💸 {self.budget.key} 重试预算耗尽，放弃",
+                      event="budget_exhausted", target=self.target)
+            return None, "budget_exhausted"
+
+        delay = compute_delay(attempt, previous_delay, self.initial_delay, self.backoff_factor,
+                              self.max_delay, self.jitter)
+        retry_after = retry_after_from(error)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                log_retry(task_name, attempt, self.max_attempts, error,
+                          f"❌ 服务端要求等待{retry_after:.0f}秒，超过上限，放弃",
+                          event="gave_up", target=self.target)
+                return None, "gave_up"
+            delay = max(delay, retry_after)
+        log_retry(task_name, attempt, self.max_attempts, error, f"⏳ 失败，{delay:.1f}秒后重试",
+                  event="retry", delay=delay, target=self.target)
+        return delay, None
+
+def _run_with_retry(policy, task_name, call):
+    """同步重试循环"""
+    started = time.monotonic()
+    delay = None
+    for attempt in range(1, policy.max_attempts + 1):
+        policy.before_attempt(task_name, attempt, started)
+        try:
+            result = call()
+        except policy.exceptions as e:
+            delay = policy.failed(task_name, attempt, e, delay, started)
+            if delay is None:
+                raise
+            time.sleep(delay)
+        except BaseException:
+            # 不在重试范围内的异常直接抛出
+            policy.aborted(task_name, attempt, started, "error")
+            raise
+        else:
+            policy.succeeded(task_name, attempt, started)
+            return result
+
+async def _run_with_retry_async(policy, task_name, call):
+    """asyncio 重试循环：等待期间不阻塞事件循环"""
+    started = time.monotonic()
+    delay = None
+    for attempt in range(1, policy.max_attempts + 1):
+        policy.before_attempt(task_name, attempt, started)
+        try:
+            result = await call()
+        except policy.exceptions as e:
+            delay = policy.failed(task_name, attempt, e, delay, started)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            policy.aborted(task_name, attempt, started, "cancelled")
+            raise
+        except BaseException:
+            # 不在重试范围内的异常直接抛出
+            policy.aborted(task_name, attempt, started, "error")
+            raise
+        else:
+            policy.succeeded(task_name, attempt, started)
+            return result
+
+# ==================== 对外接口 ====================
+
+def retry_with_backoff(max_attempts=3, initial_delay=1, backoff_factor=2,
+                       exceptions=(Exception,), on_failure=None,
+                       max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER, target=None, budget=None):
     """
     自动重试装饰器
-    
+
     Args:
         max_attempts: 最大重试次数（默认3次）
         initial_delay: 初始延迟（秒，默认1秒）
         backoff_factor: 退避因子（默认2，即1s, 2s, 4s）
         exceptions: 需要捕获的异常类型
         on_failure: 最终失败时的回调函数
-    
+        max_delay: 单次等待上限（秒）
+        jitter: 抖动策略 none（默认）/ full / decorrelated
+        target: 依赖名（如 "smtp"、"feishu"），同名依赖共享熔断器
+        budget: 重试预算名，默认与 target 相同；两者都未指定时共用 global 预算
+
     Returns:
         装饰器函数
     """
+    policy = RetryPolicy(max_attempts, initial_delay, backoff_factor, max_delay, jitter, exceptions,
+                         target, budget)
+
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            task_name = func.__name__
-            delay = initial_delay
-            
-            for attempt in range(1, max_attempts + 1):
-                try:
-                    result = func(*args, **kwargs)
-                    if attempt > 1:
-                        log_retry(task_name, attempt, max_attempts, None, "✅ 成功")
-                    return result
-                    
-                except exceptions as e:
-                    error_msg = str(e)
-                    
-                    if attempt < max_attempts:
-                        log_retry(task_name, attempt, max_attempts, e, f"⏳ 失败，{delay}秒后重试")
-                        time.sleep(delay)
-                        delay *= backoff_factor
-                    else:
-                        log_retry(task_name, attempt, max_attempts, e, "❌ 最终失败")
-                        
-                        # 调用失败回调
-                        if on_failure:
-                            on_failure(task_name, e, args, kwargs)
-                        
-                        # 抛出最终异常
-                        raise
-            
-            return None
-        
+            try:
+                return _run_with_retry(policy, func.__name__, lambda: func(*args, **kwargs))
+            except (CircuitOpenError,) + policy.exceptions as e:
+                # 调用失败回调
+                if on_failure:
+                    on_failure(func.__name__, e, args, kwargs)
+                # 抛出最终异常
+                raise
+
         return wrapper
     return decorator
 
-def retry_task(task_func, task_name="任务", max_attempts=3, 
-               initial_delay=1, backoff_factor=2):
+def async_retry(max_attempts=3, initial_delay=1, backoff_factor=2,
+                exceptions=(Exception,), on_failure=None,
+                max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER, target=None, budget=None):
+    """
+    asyncio 版重试装饰器，参数同 retry_with_backoff
+
+    用 asyncio.sleep 等待，重试期间事件循环可以继续处理其他任务；
+    on_failure 可以是普通函数或协程函数
+    """
+    policy = RetryPolicy(max_attempts, initial_delay, backoff_factor, max_delay, jitter, exceptions,
+                         target, budget)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await _run_with_retry_async(policy, func.__name__, lambda: func(*args, **kwargs))
+            except (CircuitOpenError,) + policy.exceptions as e:
+                if on_failure:
+                    outcome = on_failure(func.__name__, e, args, kwargs)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                raise
+
+        return wrapper
+    return decorator
+
+def retry_task(task_func, task_name="任务", max_attempts=3,
+               initial_delay=1, backoff_factor=2,
+               max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER, target=None, budget=None):
     """
     对单个任务执行重试
-    
+
     Args:
         task_func: 要执行的任务函数（无参数lambda）
         task_name: 任务名称（用于日志）
         max_attempts: 最大重试次数
         initial_delay: 初始延迟
         backoff_factor: 退避因子
-    
+        max_delay: 单次等待上限（秒）
+        jitter: 抖动策略
+        target: 依赖名（熔断用）
+        budget: 重试预算名，默认与 target 相同
+
     Returns:
         (success: bool, result: any, error: Exception)
     """
-    delay = initial_delay
-    
-    for attempt in range(1, max_attempts + 1):
-        try:
-            result = task_func()
-            if attempt > 1:
-                log_retry(task_name, attempt, max_attempts, None, "✅ 成功")
-            return (True, result, None)
-            
-        except Exception as e:
-            if attempt < max_attempts:
-                log_retry(task_name, attempt, max_attempts, e, f"⏳ 失败，{delay}秒后重试")
-                time.sleep(delay)
-                delay *= backoff_factor
-            else:
-                log_retry(task_name, attempt, max_attempts, e, "❌ 最终失败")
-                return (False, None, e)
-    
-    return (False, None, None)
+    policy = RetryPolicy(max_attempts, initial_delay, backoff_factor, max_delay, jitter, (Exception,),
+                         target, budget)
+    try:
+        return (True, _run_with_retry(policy, task_name, task_func), None)
+    except Exception as e:
+        return (False, None, e)
 
 class TaskWithRetry:
     """带重试机制的任务类"""
-    
-    def __init__(self, task_func, task_name, max_attempts=3, 
-                 initial_delay=1, backoff_factor=2):
+
+    def __init__(self, task_func, task_name, max_attempts=3,
+                 initial_delay=1, backoff_factor=2,
+                 max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER, target=None, budget=None):
         self.task_func = task_func
         self.task_name = task_name
         self.max_attempts = max_attempts
         self.initial_delay = initial_delay
         self.backoff_factor = backoff_factor
+        self.policy = RetryPolicy(max_attempts, initial_delay, backoff_factor, max_delay, jitter,
+                                  (Exception,), target, budget)
         self.attempt_count = 0
         self.last_error = None
-    
+
     def execute(self):
         """执行任务，带重试"""
-        delay = self.initial_delay
-        
-        for attempt in range(1, self.max_attempts + 1):
-            self.attempt_count = attempt
-            
-            try:
-                result = self.task_func()
-                
-                if attempt > 1:
-                    log_retry(self.task_name, attempt, self.max_attempts, None, "✅ 成功")
-                
-                return {
-                    "success": True,
-                    "result": result,
-                    "attempts": attempt,
-                    "error": None
-                }
-                
-            except Exception as e:
-                self.last_error = e
-                
-                if attempt < self.max_attempts:
-                    log_retry(self.task_name, attempt, self.max_attempts, e, 
-                             f"⏳ 失败，{delay}秒后重试")
-                    time.sleep(delay)
-                    delay *= self.backoff_factor
-                else:
-                    log_retry(self.task_name, attempt, self.max_attempts, e, "❌ 最终失败")
-        
+        self.attempt_count = 0
+
+        def call():
+            self.attempt_count += 1
+            return self.task_func()
+
+        try:
+            result = _run_with_retry(self.policy, self.task_name, call)
+        except Exception as e:
+            self.last_error = e
+            return {
+                "success": False,
+                "result": None,
+                "attempts": self.attempt_count,
+                "error": self.last_error
+            }
+
         return {
-            "success": False,
-            "result": None,
+            "success": True,
+            "result": result,
             "attempts": self.attempt_count,
-            "error": self.last_error
+            "error": None
         }
 
-def get_retry_log():
-    """获取重试日志内容"""
-    if RETRY_LOG.exists():
-        with open(RETRY_LOG) as f:
-            return f.read()
-    return "暂无重试记录"
+def get_retry_log(limit=50, since_days=7):
+    """获取最近的重试日志（只读取时间窗口内的日志分段）"""
+    records = list(get_logger().query(since=time.time() - since_days * 86400))[-limit:]
+    if not records:
+        return "暂无重试记录"
+    return "\n".join(format_record(r) for r in records)
 
-# 常用任务的预配置重试
-retry_3_times = retry_with_backoff(max_attempts=3, initial_delay=1)
-retry_5_times = retry_with_backoff(max_attempts=5, initial_delay=1)
+# 常用任务的预配置重试（各自使用独立的重试预算，不与其他未指定 target 的任务抢令牌）
+retry_3_times = retry_with_backoff(max_attempts=3, initial_delay=1, budget="retry_3_times")
+retry_5_times = retry_with_backoff(max_attempts=5, initial_delay=1, budget="retry_5_times")
 
-# 网络请求专用（更长延迟）
+# 网络请求专用（更长延迟，全抖动避免多个任务同时重试；共享 network 熔断器和预算）
 retry_network = retry_with_backoff(
-    max_attempts=3, 
-    initial_delay=2, 
-    backoff_factor=2
+    max_attempts=3,
+    initial_delay=2,
+    backoff_factor=2,
+    jitter=JITTER_FULL,
+    target="network"
 )
 
 # 文件操作专用
 def retry_edit_file(file_path, edit_func, max_attempts=3):
     """
     带重试的文件编辑
-    
+
     Args:
         file_path: 文件路径
         edit_func: 编辑函数，接收文件内容，返回修改后的内容
         max_attempts: 最大重试次数
-    
+
     Returns:
         (success, result)
     """
     def task():
         with open(file_path, 'r') as f:
             content = f.read()
-        
+
         new_content = edit_func(content)
-        
+
         with open(file_path, 'w') as f:
             f.write(new_content)
-        
+
         return True
-    
-    return retry_task(task, f"编辑文件 {file_path}", max_attempts)
+
+    return retry_task(task, f"编辑文件 {file_path}", max_attempts, budget="file")
 
 if __name__ == "__main__":
     # 测试重试机制
     print("🔄 测试自动重试机制\n")
-    
+
     # 测试1: 装饰器方式
     @retry_with_backoff(max_attempts=3, initial_delay=0.5)
     def test_task_success():
         """测试成功任务"""
         return "任务成功"
-    
+
     @retry_with_backoff(max_attempts=3, initial_delay=0.5)
     def test_task_fail():
         """测试失败任务"""
         raise Exception("模拟错误")
-    
+
     print("测试1: 成功任务")
     result = test_task_success()
     print(f"结果: {result}\n")
-    
+
     print("测试2: 失败任务（会重试3次）")
     try:
         test_task_fail()
     except Exception as e:
         print(f"最终失败: {e}\n")
-    
+
     # 测试3: 函数方式
     print("测试3: 使用retry_task函数")
     def my_task():
         return "任务完成"
-    
+
     success, result, error = retry_task(my_task, "我的任务", max_attempts=2, initial_delay=0.5)
     print(f"成功: {success}, 结果: {result}, 错误: {error}\n")
-    
+
+    # 测试4: asyncio 版本
+    print("测试4: async_retry")
+    calls = {"n": 0}
+
+    @async_retry(max_attempts=3, initial_delay=0.2)
+    async def test_async_task():
+        calls["n"] += 1
+        if calls["n"] < 2:
+            raise Exception("模拟错误")
+        return "异步任务成功"
+
+    print(f"结果: {asyncio.run(test_async_task())}（尝试 {calls['n']} 次）\n")
+
+    # 测试5: 熔断
+    print("测试5: 熔断（连续失败后快速失败）")
+    get_breaker("demo", failure_threshold=2, reset_timeout=30)
+
+    @retry_with_backoff(max_attempts=5, initial_delay=0.1, target="demo", jitter="full")
+    def test_down_service():
+        raise ConnectionError("服务不可用")
+
+    for _ in range(2):
+        try:
+            test_down_service()
+        except Exception as e:
+            print(f"  {type(e).__name__}: {e}")
+    print(f"  熔断器状态: {breaker_status()}\n")
+
     # 查看日志
     print("📋 重试日志:")
     print(get_retry_log())
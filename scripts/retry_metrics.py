@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+重试指标（Prometheus 文本格式）
+进程内先累加计数器/直方图，定期（以及进程退出时）在文件锁下合并到共享状态文件，
+再渲染为 memory/logs/retry-metrics.prom，供日报、健康检查或 node_exporter textfile 采集读取。
+
+用法:
+  python3 retry_metrics.py show
+  python3 retry_metrics.py check --max-failure-rate 0.2   # 健康检查，异常时退出码为1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import atexit
+import threading
+from pathlib import Path
+
+METRICS_DIR = Path("/workspace/projects/workspace/memory/logs")
+METRICS_FILE = METRICS_DIR / "retry-metrics.prom"
+STATE_NAME = ".retry-metrics.json"
+
+FLUSH_INTERVAL = 10.0   # 两次写文件的最小间隔（秒）
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 10)
+
+HELP = {
+    "retry_calls_total": ("counter", "带重试的调用次数（按最终结果）"),
+    "retry_attempts_total": ("counter", "实际执行的尝试次数（含首次）"),
+    "retry_call_duration_seconds": ("histogram", "一次调用从首次尝试到最终结果的耗时（含重试等待）"),
+    "retry_call_attempts": ("histogram", "一次调用的尝试次数"),
+    "retry_budget_tokens": ("gauge", "依赖的剩余重试预算"),
+    "retry_circuit_open": ("gauge", "依赖的熔断器是否打开（1=打开）"),
+}
+
+SAMPLE_PATTERN = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$")
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _key(labels: dict) -> str:
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class RetryMetrics:
+    """进程内指标缓冲 + 共享状态文件合并"""
+
+    def __init__(self, metrics_file=METRICS_FILE, flush_interval=FLUSH_INTERVAL):
+        self.metrics_file = Path(metrics_file)
+        self.state_file = self.metrics_file.with_name(STATE_NAME)
+        self.flush_interval = flush_interval
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.close)
+
+    # ---------- 记录 ----------
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.setdefault(_key(labels), {"le": list(buckets), "buckets": [0] * len(buckets),
+                                                    "sum": 0.0, "count": 0})
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_key(labels)] = value
+
+    def record_call(self, task, target, attempts, seconds, outcome):
+        """记录一次带重试的调用的最终结果"""
+        target = target or ""
+        self.inc("retry_calls_total", {"task": task, "target": target, "outcome": outcome})
+        self.inc("retry_attempts_total", {"task": task, "target": target}, attempts)
+        self.observe("retry_call_duration_seconds", {"task": task}, seconds, DURATION_BUCKETS)
+        self.observe("retry_call_attempts", {"task": task}, attempts, ATTEMPT_BUCKETS)
+        self.maybe_flush()
+
+    # ---------- 落盘 ----------
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ 重试指标写入失败: {e}", file=sys.stderr)
+
+    def flush(self):
+        """在文件锁下把本进程的增量合并进共享状态，并重新渲染 .prom 文件"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+            gauges, self._gauges = self._gauges, {}
+            self._last_flush = time.monotonic()
+        if not (counters or histograms or gauges):
+            return
+
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_file.with_name(".retry-metrics.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self._load_state()
+            for name, series in counters.items():
+                merged = state["counters"].setdefault(name, {})
+                for key, value in series.items():
+                    merged[key] = merged.get(key, 0) + value
+            for name, series in histograms.items():
+                merged = state["histograms"].setdefault(name, {})
+                for key, hist in series.items():
+                    if key not in merged or merged[key]["le"] != hist["le"]:
+                        merged[key] = {"le": hist["le"], "buckets": [0] * len(hist["le"]), "sum": 0.0, "count": 0}
+                    target = merged[key]
+                    target["buckets"] = [a + b for a, b in zip(target["buckets"], hist["buckets"])]
+                    target["sum"] += hist["sum"]
+                    target["count"] += hist["count"]
+            for name, series in gauges.items():
+                state["gauges"].setdefault(name, {}).update(series)
+
+            self._write_atomic(self.state_file, json.dumps(state, ensure_ascii=False))
+            self._write_atomic(self.metrics_file, render(state))
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        for section in ("counters", "histograms", "gauges"):
+            state.setdefault(section, {})
+        return state
+
+    @staticmethod
+    def _write_atomic(path, text):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def close(self):
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+
+def render(state: dict) -> str:
+    """把状态渲染为 Prometheus 文本格式"""
+    lines = []
+
+    def header(name):
+        kind, text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for section in ("counters", "gauges"):
+        for name in sorted(state[section]):
+            header(name)
+            for key, value in sorted(state[section][name].items()):
+                lines.append(f"{name}{_format_labels(json.loads(key))} {_format_value(value)}")
+    for name in sorted(state["histograms"]):
+        header(name)
+        for key, hist in sorted(state["histograms"][name].items()):
+            labels = json.loads(key)
+            for bound, count in zip(hist["le"], hist["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels + [['le', bound]])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + [['le', '+Inf']])} {hist['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(round(hist['sum'], 3))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def read_metrics(path=METRICS_FILE) -> list:
+    """解析 .prom 文件，返回 [(指标名, 标签dict, 数值)]；文件不存在时返回空列表"""
+    samples = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                match = SAMPLE_PATTERN.match(line)
+                if not match:
+                    continue
+                labels = {k: v.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+                          for k, v in LABEL_PATTERN.findall(match.group(2) or "")}
+                samples.append((match.group(1), labels, float(match.group(3))))
+    except FileNotFoundError:
+        pass
+    return samples
+
+
+def summarize(samples: list) -> dict:
+    """按任务和依赖汇总（日报和健康检查使用）
+
+    Returns:
+        {"tasks": {任务: {"calls", "success", "failed", "attempts", "failure_rate", "avg_seconds", "outcomes"}},
+         "targets": {依赖: {"budget_tokens", "circuit_open"}}}
+    """
+    tasks, targets = {}, {}
+    durations = {}
+    for name, labels, value in samples:
+        if name == "retry_calls_total":
+            stats = tasks.setdefault(labels["task"], {"calls": 0, "success": 0, "failed": 0, "attempts": 0,
+                                                       "outcomes": {}})
+            stats["calls"] += value
+            stats["outcomes"][labels["outcome"]] = stats["outcomes"].get(labels["outcome"], 0) + value
+            stats["success" if labels["outcome"] == "success" else "failed"] += value
+        elif name == "retry_attempts_total":
+            tasks.setdefault(labels["task"], {"calls": 0, "success": 0, "failed": 0, "attempts": 0,
+                                              "outcomes": {}})["attempts"] += value
+        elif name in ("retry_call_duration_seconds_sum", "retry_call_duration_seconds_count"):
+            durations.setdefault(labels["task"], {})[name.rsplit("_", 1)[1]] = value
+        elif name == "retry_budget_tokens" and labels.get("target"):
+            targets.setdefault(labels["target"], {})["budget_tokens"] = value
+        elif name == "retry_circuit_open" and labels.get("target"):
+            targets.setdefault(labels["target"], {})["circuit_open"] = bool(value)
+
+    for task, stats in tasks.items():
+        stats["failure_rate"] = round(stats["failed"] / stats["calls"], 3) if stats["calls"] else 0.0
+        d = durations.get(task, {})
+        stats["avg_seconds"] = round(d["sum"] / d["count"], 3) if d.get("count") else 0.0
+    return {"tasks": tasks, "targets": targets}
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """进程内共享的指标实例"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RetryMetrics()
+        return _metrics
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重试指标")
+    parser.add_argument("--file", default=str(METRICS_FILE), help=".prom 文件路径")
+    subparsers = parser.add_subparsers(dest="command", help="子命令")
+
+    subparsers.add_parser("show", help="按任务汇总显示")
+
+    check_parser = subparsers.add_parser("check", help="健康检查：失败率过高或熔断打开时退出码为1")
+    check_parser.add_argument("--max-failure-rate", type=float, default=0.2, help="允许的最大失败率")
+    check_parser.add_argument("--min-calls", type=int, default=5, help="调用次数少于该值的任务不检查失败率")
+    check_parser.add_argument("--json", action="store_true", help="输出JSON")
+
+    args = parser.parse_args()
+    summary = summarize(read_metrics(args.file))
+
+    if args.command == "show":
+        if not summary["tasks"]:
+            print("暂无重试指标")
+            return
+        print(f"{'任务':<24}{'调用':>7}{'尝试':>7}{'失败':>6}{'失败率':>8}{'平均耗时(s)':>12}")
+        print("-" * 64)
+        for name, s in sorted(summary["tasks"].items(), key=lambda item: -item[1]["calls"]):
+            print(f"{name:<24}{s['calls']:>7.0f}{s['attempts']:>7.0f}{s['failed']:>6.0f}"
+                  f"{s['failure_rate']:>8.0%}{s['avg_seconds']:>12.2f}")
+        for target, t in sorted(summary["targets"].items()):
+            state = "⚡ 熔断" if t.get("circuit_open") else "正常"
+            print(f"  依赖 {target}: {state}，剩余重试预算 {t.get('budget_tokens', 0):.1f}")
+
+    elif args.command == "check":
+        problems = []
+        for name, s in summary["tasks"].items():
+            if s["calls"] >= args.min_calls and s["failure_rate"] > args.max_failure_rate:
+                problems.append(f"任务 {name} 失败率 {s['failure_rate']:.0%}（{s['failed']:.0f}/{s['calls']:.0f}）")
+        for target, t in summary["targets"].items():
+            if t.get("circuit_open"):
+                problems.append(f"依赖 {target} 已熔断")
+        if args.json:
+            print(json.dumps({"healthy": not problems, "problems": problems}, ensure_ascii=False, indent=2))
+        elif problems:
+            for problem in problems:
+                print(f"❌ {problem}")
+        else:
+            print("✅ 重试指标正常")
+        if problems:
+            sys.exit(1)
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
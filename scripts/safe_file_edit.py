@@ -44,7 +44,8 @@ def safe_write_file(file_path, content, max_attempts=3):
     success, result, error = retry_task(
         task, 
         f"写入文件 {file_path}", 
-        max_attempts=max_attempts
+        max_attempts=max_attempts,
+        budget="file"
     )
     
     if success:
@@ -63,7 +64,8 @@ def safe_read_file(file_path, max_attempts=3):
     success, result, error = retry_task(
         task,
         f"读取文件 {file_path}",
-        max_attempts=max_attempts
+        max_attempts=max_attempts,
+        budget="file"
     )
     
     if success:
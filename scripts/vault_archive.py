@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+vault/raw 可随机访问的归档
+每个文件单独压缩为一个成员，归档末尾是成员索引（ZIP格式：本地成员 + 中央目录），
+读取某一天的 *-full.md 只需按索引定位并解压这一个成员，不必解压整个月。
+旧的 .tar.gz / .tar.zst 归档仍可读取（顺序扫描），可用 convert 子命令转换。
+
+用法:
+  python3 vault_archive.py list 2026-03
+  python3 vault_archive.py cat 2026-03 2026-03-01-full.md
+  python3 vault_archive.py grep 飞书 --month 2026-03 --name "*-01-full.md"
+  python3 vault_archive.py pack memory/raw/2026-03
+"""
+
+import os
+import re
+import sys
+import tarfile
+import zipfile
+import fnmatch
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MEMORY_DIR = Path("/workspace/projects/workspace/memory")
+VAULT_RAW_DIR = MEMORY_DIR / "vault" / "raw"
+
+ARCHIVE_SUFFIX = ".zip"
+LEGACY_SUFFIXES = (".tar.gz", ".tar.zst")
+COMPRESS_LEVEL = 6
+
+
+def pack(source: Path, target: Path) -> dict:
+    """把目录打包为可随机访问的归档（每个文件一个压缩成员）
+
+    先写临时文件再改名，中途失败不会留下半个归档。
+
+    Returns:
+        {"files": 成员数, "bytes": 原始大小, "archive_bytes": 归档大小,
+         "members": 已打包文件相对 source 的路径}
+    """
+    source, target = Path(source), Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    members = []
+    files = size = 0
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+            for path in sorted(p for p in source.rglob("*") if p.is_file()):
+                rel = path.relative_to(source).as_posix()
+                zf.write(path, arcname=f"{source.name}/{rel}")
+                members.append(rel)
+                files += 1
+                size += path.stat().st_size
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return {"files": files, "bytes": size, "archive_bytes": target.stat().st_size, "members": members}
+
+
+def resolve(archive: str, vault_dir: Path = VAULT_RAW_DIR) -> Path:
+    """把 "2026-03" 这样的月份解析为 vault/raw 下的归档文件（优先新格式）"""
+    path = Path(archive)
+    if path.exists():
+        return path
+    for suffix in (ARCHIVE_SUFFIX,) + LEGACY_SUFFIXES:
+        candidate = Path(vault_dir) / f"{archive}{suffix}"
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(f"找不到归档: {archive}")
+
+
+class VaultArchive:
+    """归档读取器
+
+    新格式（.zip）按成员索引随机访问；旧格式（.tar.gz/.tar.zst）只能顺序扫描，
+    接口相同，调用方无需区分。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.seekable = self.path.suffix == ARCHIVE_SUFFIX
+        self._zip = zipfile.ZipFile(self.path) if self.seekable else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    # ---------- 旧格式 ----------
+
+    def _open_tar(self):
+        if self.path.name.endswith(".tar.zst"):
+            if zstandard is None:
+                raise RuntimeError("读取 .tar.zst 需要安装 zstandard")
+            stream = zstandard.ZstdDecompressor().stream_reader(open(self.path, "rb"), closefd=True)
+            return tarfile.open(fileobj=stream, mode="r|")
+        return tarfile.open(self.path, mode="r|gz")
+
+    # ---------- 成员 ----------
+
+    def members(self) -> list:
+        """[{"name", "size", "compressed"}]"""
+        if self.seekable:
+            return [{"name": i.filename, "size": i.file_size, "compressed": i.compress_size}
+                    for i in self._zip.infolist() if not i.is_dir()]
+        with self._open_tar() as tar:
+            return [{"name": m.name, "size": m.size, "compressed": None} for m in tar if m.isfile()]
+
+    def names(self, pattern: str = None) -> list:
+        """成员名；pattern 为通配符，匹配完整路径或文件名"""
+        names = [m["name"] for m in self.members()]
+        if pattern:
+            names = [n for n in names if fnmatch.fnmatch(n, pattern) or fnmatch.fnmatch(n.rsplit("/", 1)[-1], pattern)]
+        return names
+
+    def _resolve_name(self, name: str) -> str:
+        matches = self.names(name)
+        if not matches:
+            raise KeyError(f"归档中没有 {name}")
+        if len(matches) > 1 and name not in matches:
+            raise KeyError(f"{name} 匹配到多个成员: {', '.join(matches[:5])}")
+        return name if name in matches else matches[0]
+
+    def read(self, name: str) -> bytes:
+        """读取一个成员（新格式只解压这一个成员）"""
+        name = self._resolve_name(name)
+        if self.seekable:
+            return self._zip.read(name)
+        with self._open_tar() as tar:
+            for member in tar:
+                if member.name == name:
+                    return tar.extractfile(member).read()
+        raise KeyError(name)
+
+    def read_text(self, name: str) -> str:
+        return self.read(name).decode("utf-8", errors="replace")
+
+    def extract(self, name: str, dest_dir) -> Path:
+        """把一个成员解压到 dest_dir（只写文件名，不保留归档内目录）"""
+        name = self._resolve_name(name)
+        target = Path(dest_dir) / name.rsplit("/", 1)[-1]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(self.read(name))
+        return target
+
+    def _iter_streams(self, names: list):
+        """依次产出 (成员名, 二进制流)"""
+        wanted = set(names)
+        if self.seekable:
+            for name in names:
+                with self._zip.open(name) as stream:
+                    yield name, stream
+            return
+        with self._open_tar() as tar:
+            for member in tar:
+                if member.name in wanted:
+                    yield member.name, tar.extractfile(member)
+
+    def grep(self, pattern: str, name: str = None, ignore_case: bool = False, max_count: int = None):
+        """逐行检索，产出 (成员名, 行号, 行内容)
+
+        Args:
+            pattern: 正则表达式
+            name: 只检索匹配该通配符的成员，如 "*-01-full.md"
+            max_count: 最多返回的匹配行数
+        """
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        found = 0
+        for member, stream in self._iter_streams(self.names(name)):
+            for line_no, raw in enumerate(stream, 1):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if regex.search(line):
+                    yield member, line_no, line
+                    found += 1
+                    if max_count and found >= max_count:
+                        return
+
+
+def list_archives(vault_dir: Path = VAULT_RAW_DIR) -> list:
+    """vault/raw 下的全部归档，按文件名排序"""
+    vault_dir = Path(vault_dir)
+    if not vault_dir.is_dir():
+        return []
+    return sorted(p for p in vault_dir.iterdir()
+                  if p.name.endswith(ARCHIVE_SUFFIX) or p.name.endswith(LEGACY_SUFFIXES))
+
+
+def convert(path: Path) -> Path:
+    """把旧的 .tar.gz/.tar.zst 归档转换为新格式，成功后删除旧文件"""
+    path = Path(path)
+    stem = path.name
+    for suffix in LEGACY_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+    target = path.with_name(stem + ARCHIVE_SUFFIX)
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with VaultArchive(path) as old, zipfile.ZipFile(
+                tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+            with old._open_tar() as tar:
+                for member in tar:
+                    if member.isfile():
+                        zf.writestr(member.name, tar.extractfile(member).read())
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    path.unlink()
+    return target
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="vault/raw 归档读取")
+    parser.add_argument("--vault", default=str(VAULT_RAW_DIR), help="归档目录")
+    subparsers = parser.add_subparsers(dest="command", help="子命令")
+
+    list_parser = subparsers.add_parser("list", help="列出归档或归档内的文件")
+    list_parser.add_argument("archive", nargs="?", help="月份（如 2026-03）或归档路径；省略时列出全部归档")
+
+    cat_parser = subparsers.add_parser("cat", help="输出归档内的一个文件")
+    cat_parser.add_argument("archive", help="月份或归档路径")
+    cat_parser.add_argument("name", help="文件名（可用通配符）")
+
+    extract_parser = subparsers.add_parser("extract", help="解压归档内的一个文件")
+    extract_parser.add_argument("archive", help="月份或归档路径")
+    extract_parser.add_argument("name", help="文件名（可用通配符）")
+    extract_parser.add_argument("-o", "--output", default=".", help="输出目录")
+
+    grep_parser = subparsers.add_parser("grep", help="在归档中逐行检索")
+    grep_parser.add_argument("pattern", help="正则表达式")
+    grep_parser.add_argument("--month", action="append", help="只检索这些月份（可多次指定）；省略时检索全部归档")
+    grep_parser.add_argument("--name", help="只检索匹配的文件，如 \"*-01-full.md\"")
+    grep_parser.add_argument("-i", "--ignore-case", action="store_true", help="忽略大小写")
+    grep_parser.add_argument("-m", "--max-count", type=int, help="最多输出的匹配行数")
+
+    pack_parser = subparsers.add_parser("pack", help="把目录打包为归档")
+    pack_parser.add_argument("source", help="目录，如 memory/raw/2026-03")
+    pack_parser.add_argument("-o", "--output", help="归档路径（默认 vault/raw/<目录名>.zip）")
+
+    convert_parser = subparsers.add_parser("convert", help="把旧的 tar.gz/tar.zst 归档转换为新格式")
+    convert_parser.add_argument("archives", nargs="*", help="归档路径；省略时转换 vault/raw 下全部旧归档")
+
+    args = parser.parse_args()
+    vault_dir = Path(args.vault)
+
+    try:
+        if args.command == "list":
+            if not args.archive:
+                for path in list_archives(vault_dir):
+                    kind = "随机访问" if path.suffix == ARCHIVE_SUFFIX else "顺序读取"
+                    print(f"{path.name}\t{path.stat().st_size / 1024:.1f}KB\t{kind}")
+                return
+            with VaultArchive(resolve(args.archive, vault_dir)) as archive:
+                for m in archive.members():
+                    print(f"{m['name']}\t{m['size']}")
+
+        elif args.command == "cat":
+            with VaultArchive(resolve(args.archive, vault_dir)) as archive:
+                sys.stdout.write(archive.read_text(args.name))
+
+        elif args.command == "extract":
+            with VaultArchive(resolve(args.archive, vault_dir)) as archive:
+                print(f"✅ 已解压: {archive.extract(args.name, args.output)}")
+
+        elif args.command == "grep":
+            paths = [resolve(m, vault_dir) for m in args.month] if args.month else list_archives(vault_dir)
+            remaining = args.max_count
+            for path in paths:
+                with VaultArchive(path) as archive:
+                    for member, line_no, line in archive.grep(args.pattern, name=args.name,
+                                                              ignore_case=args.ignore_case,
+                                                              max_count=remaining):
+                        print(f"{path.name}:{member}:{line_no}: {line}")
+                        if remaining:
+                            remaining -= 1
+                if args.max_count and not remaining:
+                    break
+
+        elif args.command == "pack":
+            source = Path(args.source)
+            target = Path(args.output) if args.output else vault_dir / f"{source.name}{ARCHIVE_SUFFIX}"
+            stats = pack(source, target)
+            print(f"✅ 已打包 {stats['files']} 个文件 → {target} "
+                  f"({stats['bytes'] / 1024:.1f}KB → {stats['archive_bytes'] / 1024:.1f}KB)")
+
+        elif args.command == "convert":
+            paths = [Path(p) for p in args.archives] or [
+                p for p in list_archives(vault_dir) if p.suffix != ARCHIVE_SUFFIX]
+            for path in paths:
+                print(f"✅ {path.name} → {convert(path).name}")
+
+        else:
+            parser.print_help()
+    except (FileNotFoundError, KeyError, RuntimeError) as e:
+        print(f"❌ {e.args[0] if e.args else e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
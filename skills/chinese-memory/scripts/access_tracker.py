@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+访问计数模块
+search() 命中的记忆先在内存中计数，由后台线程按时间间隔或累计数量批量写回LanceDB，
+查询路径上不产生任何写操作
+"""
+
+import atexit
+import threading
+from collections import Counter
+
+DEFAULT_FLUSH_INTERVAL = 30      # 秒
+DEFAULT_FLUSH_THRESHOLD = 100    # 累计命中次数
+
+
+class AccessTracker:
+    """批量写回 access_count 的内存计数器
+
+    写回时按增量分组，每种增量只执行一次
+    UPDATE memories SET access_count = access_count + n WHERE id IN (...)，
+    一次刷新通常只有寥寥几条更新语句。
+    """
+
+    def __init__(self, get_table, interval: float = DEFAULT_FLUSH_INTERVAL,
+                 threshold: int = DEFAULT_FLUSH_THRESHOLD):
+        # 传入获取表的函数而不是表本身，表可能在首次使用时才创建
+        self._get_table = get_table
+        self.interval = interval
+        self.threshold = threshold
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        atexit.register(self.close)
+
+    def record(self, memory_ids):
+        """记录一次搜索命中的记忆ID"""
+        memory_ids = list(memory_ids)
+        if not memory_ids:
+            return
+        with self._lock:
+            self._pending.update(memory_ids)
+            total = sum(self._pending.values())
+        self._ensure_timer()
+        if total >= self.threshold:
+            # 只唤醒后台线程，不在调用方（查询路径、daemon 的服务锁内）写表
+            self._wakeup.set()
+
+    def pending(self, memory_id: str) -> int:
+        """尚未写回的访问次数"""
+        with self._lock:
+            return self._pending.get(memory_id, 0)
+
+    def flush(self) -> int:
+        """把累计的访问次数写回LanceDB，返回更新的记忆条数"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+            if not pending:
+                return 0
+
+            groups = {}
+            for memory_id, count in pending.items():
+                groups.setdefault(count, []).append(memory_id)
+            table = self._get_table()
+            try:
+                for count, ids in groups.items():
+                    id_list = ", ".join("'{}'".format(i.replace("'", "''")) for i in ids)
+                    table.update(where=f"id IN ({id_list})",
+                                 values_sql={"access_count": f"access_count + {count}"})
+            except Exception:
+                # 写回失败时放回计数，下次再试
+                with self._lock:
+                    self._pending.update(pending)
+                raise
+            return len(pending)
+
+    def _ensure_timer(self):
+        if self._timer is None and not self._stopped.is_set():
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Thread(target=self._run, name="access-flush", daemon=True)
+                    self._timer.start()
+
+    def _run(self):
+        # interval 为 0 时只按累计数量写回
+        while True:
+            self._wakeup.wait(self.interval or None)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ 访问计数写回失败: {e}")
+
+    def close(self):
+        """停止定时器并写回剩余计数"""
+        self._stopped.set()
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ 访问计数写回失败: {e}")
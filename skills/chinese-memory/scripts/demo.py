@@ -69,8 +69,8 @@ def demo_knowledge_graph():
         
         kg = FeishuKnowledgeGraph()
         
-        # 检查是否配置了Bitable
-        if not kg.app_token:
+        # 检查是否配置了Bitable（bitable 和 sync 后端都要写入Bitable；本地SQLite后端无需配置）
+        if kg.backend_name in ("bitable", "sync") and not kg.app_token:
             print("\n⚠️ 未配置飞书Bitable，跳过知识图谱演示")
             print("   请运行: python3 init_bitable.py --app-id xxx --app-secret xxx")
             return
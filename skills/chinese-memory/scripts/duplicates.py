@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+近重复检测模块
+分块读取memories表的向量，用分块矩阵乘法计算相似度；
+store_many() 的批量去重检查和离线 dedupe 任务使用这条路径（单条 store() 走ANN查询）
+"""
+
+import numpy as np
+
+# 每次从LanceDB读取的行数
+SCAN_BLOCK = 4096
+# 分块矩阵乘法的块大小（块内相似度矩阵为 BLOCK x N）
+MATMUL_BLOCK = 1024
+
+
+def iter_vectors(table, columns=(), block_size: int = SCAN_BLOCK):
+    """逐块读取表的向量，内存中同时只有一块
+
+    Yields:
+        (向量矩阵 float32 (<=block_size, dim), {列名: 列表})
+    """
+    columns = list(columns)
+    dim = table.schema.field("vector").type.list_size
+    dataset = table.to_lance()
+    for batch in dataset.to_batches(columns=["vector"] + columns, batch_size=block_size):
+        if batch.num_rows == 0:
+            continue
+        vectors = batch.column("vector").flatten().to_numpy(zero_copy_only=False)
+        yield (vectors.reshape(batch.num_rows, dim).astype(np.float32, copy=False),
+               {c: batch.column(c).to_pylist() for c in columns})
+
+
+def load_vectors(table, columns=("id",), block_size: int = SCAN_BLOCK):
+    """读取整张表的向量（离线任务用）
+
+    Args:
+        table: LanceDB表
+        columns: 除vector外一并读取的列
+
+    Returns:
+        (向量矩阵 float32 (N, dim), {列名: 列表})
+    """
+    columns = list(columns)
+    dim = table.schema.field("vector").type.list_size
+    blocks = []
+    values = {c: [] for c in columns}
+    for block, block_values in iter_vectors(table, columns, block_size):
+        blocks.append(block)
+        for c in columns:
+            values[c].extend(block_values[c])
+    matrix = np.concatenate(blocks) if blocks else np.empty((0, dim), dtype=np.float32)
+    return matrix, values
+
+
+def max_similarity(queries: np.ndarray, matrix: np.ndarray, block_size: int = MATMUL_BLOCK) -> np.ndarray:
+    """每个查询向量与矩阵中所有向量的最大点积（归一化向量即余弦相似度）"""
+    best = np.full(len(queries), -1.0, dtype=np.float32)
+    for start in range(0, len(matrix), block_size * 8):
+        block = matrix[start:start + block_size * 8]
+        best = np.maximum(best, (queries @ block.T).max(axis=1))
+    return best
+
+
+def find_clusters(matrix: np.ndarray, threshold: float, block_size: int = MATMUL_BLOCK) -> list:
+    """找出余弦相似度超过阈值的向量簇
+
+    分块计算上三角相似度，只保留超过阈值的下标对，再用并查集合并成簇，
+    内存占用为 O(block_size * N)。
+
+    Returns:
+        簇列表，每个簇是行号列表（只返回大小>=2的簇）
+    """
+    n = len(matrix)
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for start in range(0, n, block_size):
+        sims = matrix[start:start + block_size] @ matrix[start:].T
+        rows, cols = np.nonzero(sims > threshold)
+        for r, c in zip(rows + start, cols + start):
+            if c <= r:
+                continue
+            root_r, root_c = find(r), find(c)
+            if root_r != root_c:
+                parent[max(root_r, root_c)] = min(root_r, root_c)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Embedding缓存模块
+以 (模型名 + 前缀 + 文本) 的哈希为键，把float32向量存入内存映射文件，
+重复出现的文本和查询无需再次调用BGE模型
+"""
+
+import json
+import atexit
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 20000
+
+_STAT_FIELDS = ("hits", "misses", "encoded", "encode_seconds", "saved_seconds")
+
+
+class EmbeddingCache:
+    """基于内存映射文件的LRU Embedding缓存
+
+    每个槽位保存 (key, tick, vector)：key是哈希，tick是最近使用时间戳，
+    打开时扫描一遍槽位即可重建索引和LRU顺序，不需要额外的索引文件。
+    槽位里的key会在读取时校验，多个进程同时写入也不会读到错配的向量。
+    """
+
+    def __init__(self, cache_dir, capacity: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.capacity = capacity
+        self.data_path = self.cache_dir / "vectors.mmap"
+        self.meta_path = self.cache_dir / "meta.json"
+
+        self.dim = None
+        self._data = None           # np.memmap，首次写入时按向量维度创建
+        self._slots = OrderedDict()  # key -> 槽位，按最近使用排序
+        self._free = []
+        self._tick = 0
+        self._dirty = False
+
+        # 本进程统计，以及尚未写入meta.json的增量
+        self.session = dict.fromkeys(_STAT_FIELDS, 0)
+        self._pending = dict.fromkeys(_STAT_FIELDS, 0)
+        self.totals = dict.fromkeys(_STAT_FIELDS, 0)
+
+        self._load()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(model_name: str, prefix: str, text: str) -> bytes:
+        """生成缓存键"""
+        digest = hashlib.sha1(f"{model_name}\0{prefix}\0{text}".encode("utf-8"))
+        return digest.hexdigest().encode("ascii")
+
+    def _dtype(self, dim: int) -> np.dtype:
+        return np.dtype([("key", "S40"), ("tick", "<i8"), ("vector", "<f4", (dim,))])
+
+    def _load(self):
+        """打开已有缓存并重建索引"""
+        if not self.meta_path.exists():
+            return
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        for field in _STAT_FIELDS:
+            self.totals[field] = meta.get("stats", {}).get(field, 0)
+
+        dim = meta.get("dim")
+        if not dim or meta.get("capacity") != self.capacity or not self.data_path.exists():
+            # 容量变更或数据缺失，丢弃旧向量
+            return
+        self._open(dim, mode="r+")
+
+        keys = self._data["key"]
+        ticks = self._data["tick"]
+        used = np.flatnonzero(keys != b"")
+        for slot in used[np.argsort(ticks[used], kind="stable")]:
+            self._slots[bytes(keys[slot])] = int(slot)
+        self._free = sorted(set(range(self.capacity)) - set(self._slots.values()), reverse=True)
+        self._tick = int(ticks.max()) if len(used) else 0
+
+    def _open(self, dim: int, mode: str):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self._data = np.memmap(self.data_path, dtype=self._dtype(dim), mode=mode,
+                               shape=(self.capacity,))
+        if mode == "w+":
+            self._slots.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+            self._tick = 0
+            self._dirty = True
+
+    def _count(self, field: str, value=1):
+        self.session[field] += value
+        self._pending[field] += value
+
+    def _avg_encode_seconds(self) -> float:
+        encoded = self.totals["encoded"] + self._pending["encoded"]
+        if not encoded:
+            return 0.0
+        return (self.totals["encode_seconds"] + self._pending["encode_seconds"]) / encoded
+
+    def get(self, key: bytes):
+        """查询缓存，命中返回向量副本，否则返回None"""
+        slot = self._slots.get(key)
+        if slot is None or self._data["key"][slot] != key:
+            if slot is not None:
+                # 槽位已被其他进程覆盖
+                del self._slots[key]
+            self._count("misses")
+            return None
+
+        self._tick += 1
+        self._data["tick"][slot] = self._tick
+        self._slots.move_to_end(key)
+        self._dirty = True
+        self._count("hits")
+        self._count("saved_seconds", self._avg_encode_seconds())
+        return np.array(self._data["vector"][slot])
+
+    def put(self, key: bytes, vector: np.ndarray):
+        """写入缓存，满时淘汰最久未使用的槽位"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if self._data is None or vector.shape[0] != self.dim:
+            # 首次写入或向量维度变化（换了模型），按新维度重建
+            self._open(vector.shape[0], mode="w+")
+
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                _, slot = self._slots.popitem(last=False)
+
+        self._tick += 1
+        self._data[slot] = (key, self._tick, vector)
+        self._slots[key] = slot
+        self._slots.move_to_end(key)
+        self._dirty = True
+
+    def record_encode(self, count: int, seconds: float):
+        """记录一次模型编码的耗时，用于估算命中节省的时间"""
+        self._count("encoded", count)
+        self._count("encode_seconds", seconds)
+
+    def stats(self) -> dict:
+        """缓存统计：本进程与累计的命中率、节省的编码时间"""
+        def summarize(stats):
+            lookups = stats["hits"] + stats["misses"]
+            return {
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                "saved_seconds": round(stats["saved_seconds"], 3),
+            }
+
+        totals = {k: self.totals[k] + self._pending[k] for k in _STAT_FIELDS}
+        return {
+            "size": len(self._slots),
+            "capacity": self.capacity,
+            "avg_encode_ms": round(self._avg_encode_seconds() * 1000, 2),
+            "session": summarize(self.session),
+            "total": summarize(totals),
+        }
+
+    def flush(self):
+        """把向量和统计写回磁盘"""
+        if self._data is not None and self._dirty:
+            self._data.flush()
+            self._dirty = False
+        if not any(self._pending.values()) and self.meta_path.exists():
+            return
+
+        # 重新读取meta.json再累加，避免覆盖其他进程的统计
+        totals = dict.fromkeys(_STAT_FIELDS, 0)
+        if self.meta_path.exists():
+            try:
+                with open(self.meta_path) as f:
+                    totals.update(json.load(f).get("stats", {}))
+            except (OSError, ValueError):
+                pass
+        for field in _STAT_FIELDS:
+            totals[field] += self._pending[field]
+        self.totals = totals
+        self._pending = dict.fromkeys(_STAT_FIELDS, 0)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "stats": totals}, f)
+        tmp_path.replace(self.meta_path)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+实体倒排索引：实体 → 记忆ID
+实体来自分词结果和知识图谱中的已知主语/宾语，store() 时增量更新，
+"关于老板的所有记忆"只需一次索引查找，无需扫描记忆文本
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List
+
+from zh_text import candidate_entities, match_entities, add_words, substrings
+
+# SQLite单条语句的参数个数上限（保守取值）
+MAX_PARAMS = 500
+
+
+class EntityIndex:
+    """基于SQLite的实体倒排索引
+
+    entity_memories 以 (entity, memory_id) 为主键，按实体查找是一次索引范围扫描；
+    memory_id 上另建索引，删除记忆时同样走索引。
+    kg_entities 保存知识图谱中的已知实体，用于在文本中匹配多字实体名。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entity_memories (
+        entity    TEXT NOT NULL,
+        memory_id TEXT NOT NULL,
+        PRIMARY KEY (entity, memory_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_entity_memory ON entity_memories (memory_id);
+    CREATE TABLE IF NOT EXISTS kg_entities (
+        entity TEXT PRIMARY KEY
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._kg_entities = None
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（守护进程多线程处理请求）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- 已知实体 ----------
+
+    @property
+    def kg_entities(self) -> set:
+        """知识图谱中的已知实体（首次使用时读入内存）"""
+        if self._kg_entities is None:
+            self._kg_entities = {row[0] for row in self.conn.execute("SELECT entity FROM kg_entities")}
+            add_words(self._kg_entities)
+        return self._kg_entities
+
+    def set_kg_entities(self, entities: Iterable[str]) -> int:
+        """替换已知实体集合（从知识图谱全量刷新）"""
+        entities = {e.strip() for e in entities if e and e.strip()}
+        with self.conn:
+            self.conn.execute("DELETE FROM kg_entities")
+            self.conn.executemany("INSERT INTO kg_entities VALUES (?)", [(e,) for e in entities])
+        self._kg_entities = entities
+        add_words(entities)
+        return len(entities)
+
+    def extract(self, text: str) -> set:
+        """文本中的实体：分词得到的候选词 + 文本中出现的已知实体"""
+        return candidate_entities(text) | set(match_entities(text, self.kg_entities))
+
+    # ---------- 增量维护 ----------
+
+    def add(self, memory_id: str, text: str) -> set:
+        """索引一条记忆，返回识别出的实体"""
+        entities = self.extract(text)
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO entity_memories VALUES (?, ?)",
+                                  [(e, memory_id) for e in entities])
+        return entities
+
+    def add_many(self, items: Iterable[tuple]) -> int:
+        """批量索引 [(memory_id, text)]，一个事务完成，返回写入的实体-记忆对数"""
+        rows = [(e, memory_id) for memory_id, text in items for e in self.extract(text)]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO entity_memories VALUES (?, ?)", rows)
+        return len(rows)
+
+    def remove(self, memory_ids: Iterable[str]):
+        """删除记忆时同步移除"""
+        memory_ids = list(memory_ids)
+        with self.conn:
+            for start in range(0, len(memory_ids), MAX_PARAMS):
+                chunk = memory_ids[start:start + MAX_PARAMS]
+                self.conn.execute(
+                    f"DELETE FROM entity_memories WHERE memory_id IN ({','.join('?' * len(chunk))})", chunk)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM entity_memories")
+
+    # ---------- 查询 ----------
+
+    def memory_ids(self, entity: str, limit: int = None) -> List[str]:
+        """提到该实体的记忆ID"""
+        sql = "SELECT memory_id FROM entity_memories WHERE entity = ?"
+        params = [entity]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    def entities_in(self, text: str) -> list:
+        """查询文本中出现的、索引里已有的实体（长词优先、互不重叠）"""
+        candidates = list(set(substrings(text)))
+        known = set()
+        for start in range(0, len(candidates), MAX_PARAMS):
+            chunk = candidates[start:start + MAX_PARAMS]
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT DISTINCT entity FROM entity_memories WHERE entity IN ({','.join('?' * len(chunk))})",
+                chunk))
+        return match_entities(text, known | self.kg_entities)
+
+    def stats(self) -> dict:
+        row = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT entity), COUNT(DISTINCT memory_id) FROM entity_memories").fetchone()
+        return {"pairs": row[0], "entities": row[1], "memories": row[2],
+                "kg_entities": len(self.kg_entities)}
+
+    def top_entities(self, limit: int = 20) -> list:
+        """提及次数最多的实体"""
+        return self.conn.execute(
+            "SELECT entity, COUNT(*) AS n FROM entity_memories GROUP BY entity ORDER BY n DESC LIMIT ?",
+            (limit,)).fetchall()
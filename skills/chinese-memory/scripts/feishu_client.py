@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+飞书开放平台客户端
+- 进程内共享一个带连接池的 requests.Session（keep-alive，复用TCP/TLS连接）
+- tenant_access_token 缓存到 ~/.openclaw，记录过期时间，临近过期前主动刷新
+knowledge_graph.py、init_bitable.py 共用
+"""
+
+import os
+import json
+import time
+import fcntl
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FEISHU_API = "https://open.feishu.cn/open-apis"
+TOKEN_URL = f"{FEISHU_API}/auth/v3/tenant_access_token/internal"
+TOKEN_CACHE_PATH = Path.home() / ".openclaw" / "feishu_token_cache.json"
+
+# 距过期不足该秒数时主动刷新（token有效期2小时）
+REFRESH_MARGIN = 300
+DEFAULT_TIMEOUT = 30
+POOL_SIZE = 16
+
+# token无效或过期的错误码，遇到时强制刷新后重试一次
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991664, 99991668}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """进程内共享的连接池Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class TokenCache:
+    """按app_id保存token及过期时间的JSON文件（权限0600）"""
+
+    def __init__(self, path=TOKEN_CACHE_PATH):
+        self.path = Path(path).expanduser()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, app_id: str):
+        """返回 (token, 过期时间戳)，没有缓存时返回None"""
+        entry = self._load().get(app_id)
+        if not entry:
+            return None
+        return entry["token"], entry["expires_at"]
+
+    def put(self, app_id: str, token: str, expires_at: float):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 读-改-写在文件锁内完成，避免并发进程互相覆盖对方的条目
+        lock_path = self.path.with_suffix(".lock")
+        with open(os.open(lock_path, os.O_WRONLY | os.O_CREAT, 0o600), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._load()
+            data[app_id] = {"token": token, "expires_at": expires_at}
+            # 先写临时文件再替换，避免并发进程读到半个文件
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+
+class FeishuClient:
+    """飞书API客户端
+
+    提供 tenant_token 时直接使用（不刷新）；否则用 app_id/app_secret 换取并缓存。
+    """
+
+    def __init__(self, app_id: str = None, app_secret: str = None, tenant_token: str = None,
+                 cache_path=TOKEN_CACHE_PATH, session: requests.Session = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.static_token = tenant_token
+        self.cache = TokenCache(cache_path)
+        self.session = session or get_session()
+        self.timeout = timeout
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FeishuClient":
+        """从环境变量或配置文件读取凭证"""
+        return cls(
+            app_id=os.environ.get("FEISHU_APP_ID") or config.get("feishu_app_id"),
+            app_secret=os.environ.get("FEISHU_APP_SECRET") or config.get("feishu_app_secret"),
+            tenant_token=os.environ.get("FEISHU_TENANT_TOKEN") or config.get("feishu_tenant_token"),
+            cache_path=config.get("feishu_token_cache", TOKEN_CACHE_PATH),
+        )
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.static_token or (self.app_id and self.app_secret))
+
+    def get_token(self, force_refresh: bool = False) -> str:
+        """返回有效的tenant_access_token
+
+        依次使用内存中的token、磁盘缓存，距过期不足 REFRESH_MARGIN 秒时重新获取。
+        """
+        if self.static_token:
+            return self.static_token
+        if not (self.app_id and self.app_secret):
+            return None
+        with self._lock:
+            now = time.time()
+            if not force_refresh:
+                if self._token and self._expires_at - now > REFRESH_MARGIN:
+                    return self._token
+                cached = self.cache.get(self.app_id)
+                if cached and cached[1] - now > REFRESH_MARGIN:
+                    self._token, self._expires_at = cached
+                    return self._token
+            self._token, self._expires_at = self._fetch_token()
+            self.cache.put(self.app_id, self._token, self._expires_at)
+            return self._token
+
+    def _fetch_token(self) -> tuple:
+        """通过AppID和AppSecret获取TenantToken"""
+        requested_at = time.time()
+        resp = self.session.post(TOKEN_URL, json={"app_id": self.app_id, "app_secret": self.app_secret},
+                                 timeout=self.timeout)
+        resp.raise_for_status()
+        body = resp.json()
+        if body.get("code"):
+            raise requests.HTTPError(f"获取tenant_access_token失败: [{body.get('code')}] {body.get('msg')}",
+                                     response=resp)
+        # 过期时间按发请求的时刻计算，偏保守
+        return body["tenant_access_token"], requested_at + body.get("expire", 7200)
+
+    def headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.get_token()}",
+            "Content-Type": "application/json"
+        }
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求；url 可以是完整地址或以 / 开头的API路径
+
+        返回token失效错误码时强制刷新token并重试一次。
+        """
+        if url.startswith("/"):
+            url = FEISHU_API + url
+        kwargs.setdefault("timeout", self.timeout)
+        extra_headers = kwargs.pop("headers", None) or {}
+        resp = self.session.request(method, url, headers={**self.headers(), **extra_headers}, **kwargs)
+        if not self.static_token and self._token_invalid(resp):
+            self.get_token(force_refresh=True)
+            resp = self.session.request(method, url, headers={**self.headers(), **extra_headers}, **kwargs)
+        return resp
+
+    @staticmethod
+    def _token_invalid(resp: requests.Response) -> bool:
+        if resp.status_code not in (200, 400, 401):
+            return False
+        try:
+            return resp.json().get("code") in TOKEN_INVALID_CODES
+        except ValueError:
+            return False
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
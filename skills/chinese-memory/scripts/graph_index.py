@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+知识图谱内存邻接索引
+一次性从三元组存储读出全部三元组，建立 出边/入边 两张邻接表，
+多跳遍历和传递推理都在内存中完成，不再为每个前沿节点发一次查询
+"""
+
+import heapq
+from collections import deque
+from typing import List, Dict, Iterable
+
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_FAN_OUT = 20          # 每个节点最多展开的边数（按置信度取前N条）
+DEFAULT_MAX_RESULTS = 200
+
+# 具有传递性的关系：A-[是]->B 且 B-[是]->C 可推出 A-[是]->C
+TRANSITIVE_PREDICATES = ("是", "属于", "位于", "包含", "隶属于", "子类", "上级")
+
+
+class AdjacencyIndex:
+    """三元组的出边/入边邻接表"""
+
+    def __init__(self, triples: Iterable[Dict] = ()):
+        self.outgoing = {}    # subject -> [triple]
+        self.incoming = {}    # object -> [triple]
+        self.entities = set() # 所有出现过的主语和宾语
+        self._ids = set()
+        self._unsorted = set()
+        self.size = 0
+        for triple in triples:
+            self.add(triple)
+
+    def add(self, triple: Dict):
+        """加入一条三元组（按record_id去重）"""
+        record_id = triple.get("record_id")
+        if record_id in self._ids:
+            return
+        if record_id:
+            self._ids.add(record_id)
+        for table, key in ((self.outgoing, triple["subject"]), (self.incoming, triple["object"])):
+            table.setdefault(key, []).append(triple)
+            self._unsorted.add((id(table), key))
+            self.entities.add(key)
+        self.size += 1
+
+    def _sorted(self, table: dict, key: str) -> list:
+        """节点的边按置信度降序，首次访问时才排序"""
+        edges = table.get(key, [])
+        if (id(table), key) in self._unsorted:
+            edges.sort(key=lambda t: -(t.get("confidence") or 0))
+            self._unsorted.discard((id(table), key))
+        return edges
+
+    def edges(self, entity: str, direction: str = "both", predicate: str = None) -> List[tuple]:
+        """实体的相邻边，按置信度降序（both 时出边和入边合并排序）
+
+        Returns:
+            [(邻居实体, 三元组)]
+        """
+        out_edges, in_edges = [], []
+        if direction in ("out", "both"):
+            out_edges = [(t["object"], t) for t in self._sorted(self.outgoing, entity)
+                         if predicate is None or t["predicate"] == predicate]
+        if direction in ("in", "both"):
+            in_edges = [(t["subject"], t) for t in self._sorted(self.incoming, entity)
+                        if predicate is None or t["predicate"] == predicate]
+        if not (out_edges and in_edges):
+            return out_edges or in_edges
+        # 两个列表各自已按置信度降序，归并即可
+        return list(heapq.merge(out_edges, in_edges, key=lambda edge: -(edge[1].get("confidence") or 0)))
+
+    def traverse(self, start: str, depth: int = 1, fan_out: int = DEFAULT_FAN_OUT,
+                 direction: str = "both", predicate: str = None,
+                 max_results: int = DEFAULT_MAX_RESULTS) -> List[Dict]:
+        """广度优先多跳遍历
+
+        每个实体只在最短路径上出现一次；每个节点最多展开 fan_out 条边。
+
+        Returns:
+            [{"entity", "depth", "path": [三元组...]}]，按深度排序
+        """
+        visited = {start}
+        queue = deque([(start, [])])
+        results = []
+        while queue:
+            entity, path = queue.popleft()
+            if len(path) >= depth:
+                continue
+            for neighbor, triple in self.edges(entity, direction, predicate)[:fan_out]:
+                if neighbor in visited:
+                    continue
+                visited.add(neighbor)
+                new_path = path + [triple]
+                results.append({"entity": neighbor, "depth": len(new_path), "path": new_path})
+                if len(results) >= max_results:
+                    return results
+                queue.append((neighbor, new_path))
+        return results
+
+    def transitive(self, subject: str, predicate: str,
+                   max_depth: int = DEFAULT_MAX_DEPTH, fan_out: int = DEFAULT_FAN_OUT) -> List[Dict]:
+        """沿同一传递关系推理，返回推出的（非直接存在的）三元组
+
+        置信度取路径上各边置信度之积，path 保留推理依据。
+        """
+        inferred = []
+        for hop in self.traverse(subject, depth=max_depth, fan_out=fan_out,
+                                 direction="out", predicate=predicate):
+            if hop["depth"] < 2:
+                continue
+            confidence = 1.0
+            for triple in hop["path"]:
+                confidence *= triple.get("confidence") or 0
+            inferred.append({
+                "subject": subject,
+                "predicate": predicate,
+                "object": hop["entity"],
+                "confidence": round(confidence, 4),
+                "source": "推理",
+                "inferred": True,
+                "path": hop["path"],
+            })
+        return inferred
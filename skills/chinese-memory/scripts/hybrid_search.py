@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+混合检索：向量记忆 + 知识图谱
+两路检索并发执行，用RRF（Reciprocal Rank Fusion）融合为一个排序列表，
+同时返回各路耗时，便于一次调用拿到完整上下文
+"""
+
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from memory_client import open_memory
+from zh_text import match_entities
+
+# RRF常数：score = Σ 1 / (k + rank)，k越大各路排名差异的影响越平缓
+DEFAULT_RRF_K = 60
+# 图谱一路需要全部实体，只在本地有三元组的后端上检索（bitable 后端每个进程都要下载整张表）
+GRAPH_BACKENDS = ("sqlite", "sync")
+
+
+def triple_text(triple: dict) -> str:
+    return f"{triple['subject']} {triple['predicate']} {triple['object']}"
+
+
+def rrf_fuse(ranked_lists: dict, k: int = DEFAULT_RRF_K) -> list:
+    """RRF融合
+
+    Args:
+        ranked_lists: {来源: [(唯一键, 条目), ...]}，每个列表已按该来源的相关度排序
+
+    Returns:
+        条目列表（附加 rrf_score 和 ranks），按融合得分降序
+    """
+    fused = {}
+    for source, items in ranked_lists.items():
+        for rank, (key, item) in enumerate(items, 1):
+            entry = fused.setdefault(key, {**item, "rrf_score": 0.0, "ranks": {}})
+            entry["rrf_score"] += 1.0 / (k + rank)
+            entry["ranks"][source] = rank
+    results = sorted(fused.values(), key=lambda e: e["rrf_score"], reverse=True)
+    for entry in results:
+        entry["rrf_score"] = round(entry["rrf_score"], 6)
+    return results
+
+
+class HybridRetriever:
+    """并发检索向量记忆和知识图谱并融合结果"""
+
+    def __init__(self, memory=None, kg=None, local: bool = False, use_graph: bool = True):
+        self._memory = memory
+        self._kg = kg
+        self.local = local
+        self.use_graph = use_graph
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            self._memory = open_memory(local=self.local)
+        return self._memory
+
+    @property
+    def kg(self):
+        if self._kg is None:
+            from knowledge_graph import FeishuKnowledgeGraph
+            self._kg = FeishuKnowledgeGraph()
+        return self._kg
+
+    def search_memory(self, query: str, limit: int, min_score: float, **options) -> list:
+        results = self.memory.search(query, limit=limit, min_score=min_score, **options)
+        return [(f"memory:{r['id']}", {"source": "memory", "text": r["text"], "memory": r})
+                for r in results]
+
+    def search_graph(self, query: str, limit: int) -> list:
+        """按查询中出现的实体查找三元组
+
+        查询里同时出现的谓语（如"喜欢吃"）对应的三元组排在前面，其余按置信度排序。
+        邻接索引缓存在知识图谱实例上，只需在本地后端上构建一次。
+        """
+        if self.kg.backend_name not in GRAPH_BACKENDS:
+            raise RuntimeError(f"图谱检索需要本地三元组，{self.kg.backend_name} 后端每次都会下载整张表，"
+                               f"请配置 kg_backend 为 {' / '.join(GRAPH_BACKENDS)}")
+        graph = self.kg.graph
+        entities = match_entities(query, graph.entities)
+        candidates = {}
+        for entity in entities:
+            for _, triple in graph.edges(entity):
+                candidates.setdefault(triple.get("record_id") or triple_text(triple), triple)
+        ranked = sorted(candidates.values(),
+                        key=lambda t: (t["predicate"] not in query, -(t.get("confidence") or 0)))
+        return [(f"graph:{key}", {"source": "graph", "text": triple_text(t), "triple": t,
+                                  "entities": entities})
+                for key, t in ((t.get("record_id") or triple_text(t), t) for t in ranked[:limit])]
+
+    def retrieve(self, query: str, limit: int = 5, min_score: float = 0.5,
+                 rrf_k: int = DEFAULT_RRF_K, **search_options) -> dict:
+        """混合检索
+
+        Args:
+            query: 查询文本
+            limit: 返回条数（每路各取 limit*2 条候选参与融合）
+            min_score: 向量检索最小相似度
+            rrf_k: RRF常数
+            search_options: 透传给向量检索（category、since、rerank等）
+
+        Returns:
+            {"query", "results": [...], "latency_ms": {"memory", "graph", "total"}, "errors": {...}}
+        """
+        started = time.perf_counter()
+        tasks = {"memory": lambda: self.search_memory(query, limit * 2, min_score, **search_options)}
+        if self.use_graph:
+            tasks["graph"] = lambda: self.search_graph(query, limit * 2)
+
+        def timed(fn):
+            t0 = time.perf_counter()
+            try:
+                return fn(), None, time.perf_counter() - t0
+            except Exception as e:
+                return [], e, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            futures = {name: pool.submit(timed, fn) for name, fn in tasks.items()}
+            outcomes = {name: f.result() for name, f in futures.items()}
+
+        ranked_lists, latency, errors = {}, {}, {}
+        for name, (items, error, elapsed) in outcomes.items():
+            ranked_lists[name] = items
+            latency[name] = round(elapsed * 1000, 1)
+            if error is not None:
+                errors[name] = f"{type(error).__name__}: {error}"
+        latency["total"] = round((time.perf_counter() - started) * 1000, 1)
+
+        return {
+            "query": query,
+            "results": rrf_fuse(ranked_lists, k=rrf_k)[:limit],
+            "latency_ms": latency,
+            "errors": errors,
+        }
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="混合检索向量记忆和知识图谱")
+    parser.add_argument("query", help="查询文本")
+    parser.add_argument("--limit", type=int, default=5, help="返回结果数量")
+    parser.add_argument("--min-score", type=float, default=0.5, help="向量检索最小相似度")
+    parser.add_argument("--rrf-k", type=int, default=DEFAULT_RRF_K, help="RRF融合常数")
+    parser.add_argument("--rerank", action="store_true", help="向量检索结果先做混合排序")
+    parser.add_argument("--no-graph", action="store_true", help="只检索向量记忆")
+    parser.add_argument("--format", choices=["json", "text"], default="text", help="输出格式")
+    parser.add_argument("--local", action="store_true", help="不连接守护进程，直接在本进程加载模型")
+
+    args = parser.parse_args()
+
+    retriever = HybridRetriever(local=args.local, use_graph=not args.no_graph)
+    bundle = retriever.retrieve(args.query, limit=args.limit, min_score=args.min_score,
+                                rrf_k=args.rrf_k, rerank=args.rerank)
+
+    if args.format == "json":
+        print(json.dumps(bundle, ensure_ascii=False, indent=2))
+        return
+
+    latency = bundle["latency_ms"]
+    timing = " | ".join(f"{name} {ms}ms" for name, ms in latency.items())
+    if not bundle["results"]:
+        print("未找到相关记忆")
+    else:
+        print(f"找到 {len(bundle['results'])} 条相关上下文：")
+        print("-" * 50)
+        for i, r in enumerate(bundle["results"], 1):
+            if r["source"] == "memory":
+                m = r["memory"]
+                print(f"{i}. [记忆/{m['category']}] {r['text']}")
+                print(f"   相似度: {m['score']:.1%} | 融合得分: {r['rrf_score']:.4f}")
+            else:
+                t = r["triple"]
+                print(f"{i}. [图谱] {t['subject']} --[{t['predicate']}]--> {t['object']}")
+                print(f"   置信度: {t.get('confidence')} | 融合得分: {r['rrf_score']:.4f}")
+            print()
+    print(f"耗时: {timing}")
+    for name, error in bundle["errors"].items():
+        print(f"⚠️ {name} 检索失败: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
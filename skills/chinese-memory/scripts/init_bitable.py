@@ -4,14 +4,22 @@
 创建必要的表结构
 """
 
-import os
 import sys
 import json
-import requests
 from pathlib import Path
 
+from feishu_client import FeishuClient, TOKEN_CACHE_PATH
+from triple_store import check_response, response_body
+
 CONFIG_PATH = Path.home() / ".openclaw" / "config.json"
 
+# 写入时由客户端填写，增量同步（kg_sync.py）按它做水位线
+UPLOADED_FIELD = {
+    "field_name": "上传时间",
+    "type": 5,  # DateTime
+    "property": {"date_formatter": "yyyy-MM-dd HH:mm"}
+}
+
 def load_config():
     if CONFIG_PATH.exists():
         with open(CONFIG_PATH) as f:
@@ -19,32 +27,31 @@ def load_config():
     return {}
 
 
+def make_client(app_id: str, app_secret: str) -> FeishuClient:
+    """与知识图谱共用配置中的 feishu_token_cache"""
+    cache_path = load_config().get("feishu_token_cache", TOKEN_CACHE_PATH)
+    return FeishuClient(app_id, app_secret, cache_path=cache_path)
+
+
 def init_bitable(app_id: str, app_secret: str, app_name: str = "龙虾记忆系统"):
     """初始化Bitable应用
     
     创建一个新的Bitable应用，包含知识图谱所需的表结构
     """
     
-    # 1. 获取tenant_token
-    token_url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    resp = requests.post(token_url, json={"app_id": app_id, "app_secret": app_secret})
-    resp.raise_for_status()
-    tenant_token = resp.json()["tenant_access_token"]
-    
-    headers = {
-        "Authorization": f"Bearer {tenant_token}",
-        "Content-Type": "application/json"
-    }
+    # 1. 获取tenant_token（缓存在配置的 feishu_token_cache，与知识图谱共用）
+    client = make_client(app_id, app_secret)
+    client.get_token()
     
     # 2. 创建Bitable应用
     print("正在创建Bitable应用...")
-    create_app_url = "https://open.feishu.cn/open-apis/bitable/v1/apps"
+    create_app_url = "/bitable/v1/apps"
     app_data = {
         "name": app_name,
         "description": "龙虾记忆系统 - 知识图谱存储",
         "folder_token": ""
     }
-    resp = requests.post(create_app_url, headers=headers, json=app_data)
+    resp = client.post(create_app_url, json=app_data)
     resp.raise_for_status()
     app_info = resp.json().get("data", {})
     app_token = app_info.get("app_token")
@@ -53,7 +60,7 @@ def init_bitable(app_id: str, app_secret: str, app_name: str = "龙虾记忆系
     
     # 3. 创建知识图谱表
     print("正在创建知识图谱表...")
-    create_table_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables"
+    create_table_url = f"/bitable/v1/apps/{app_token}/tables"
     
     table_data = {
         "table": {
@@ -90,11 +97,12 @@ def init_bitable(app_id: str, app_secret: str, app_name: str = "龙虾记忆系
                 "field_name": "创建时间",
                 "type": 5,  # DateTime
                 "property": {"date_formatter": "yyyy-MM-dd HH:mm", "auto_fill": True}
-            }
+            },
+            UPLOADED_FIELD,
         ]
     }
     
-    resp = requests.post(create_table_url, headers=headers, json=table_data)
+    resp = client.post(create_table_url, json=table_data)
     resp.raise_for_status()
     table_info = resp.json().get("data", {})
     table_id = table_info.get("table_id")
@@ -115,6 +123,28 @@ def init_bitable(app_id: str, app_secret: str, app_name: str = "龙虾记忆系
     return app_token, table_id
 
 
+def upgrade_table(app_id: str, app_secret: str, app_token: str, table_id: str):
+    """为已有的知识图谱表补齐新版本需要的字段（目前是 上传时间）"""
+    client = make_client(app_id, app_secret)
+    fields_url = f"/bitable/v1/apps/{app_token}/tables/{table_id}/fields"
+    
+    existing, page_token = set(), None
+    while True:
+        resp = client.get(fields_url, params={"page_size": 100, "page_token": page_token})
+        data = check_response(resp, response_body(resp)).get("data") or {}
+        existing.update(item["field_name"] for item in data.get("items") or [])
+        page_token = data.get("page_token")
+        if not data.get("has_more") or not page_token:
+            break
+    
+    if UPLOADED_FIELD["field_name"] in existing:
+        print(f"✅ 字段 {UPLOADED_FIELD['field_name']} 已存在，无需升级")
+        return
+    resp = client.post(fields_url, json=UPLOADED_FIELD)
+    check_response(resp, response_body(resp))
+    print(f"✅ 已添加字段 {UPLOADED_FIELD['field_name']}")
+
+
 def main():
     import argparse
     
@@ -122,9 +152,23 @@ def main():
     parser.add_argument("--app-id", required=True, help="飞书App ID")
     parser.add_argument("--app-secret", required=True, help="飞书App Secret")
     parser.add_argument("--name", default="龙虾记忆系统", help="应用名称")
+    parser.add_argument("--upgrade", action="store_true",
+                        help="不新建应用，为配置中已有的表（bitable_app_token/bitable_table_id）补齐缺少的字段")
     
     args = parser.parse_args()
     
+    if args.upgrade:
+        config = load_config()
+        if not (config.get("bitable_app_token") and config.get("bitable_table_id")):
+            parser.error("配置中缺少 bitable_app_token / bitable_table_id")
+        try:
+            upgrade_table(args.app_id, args.app_secret,
+                          config["bitable_app_token"], config["bitable_table_id"])
+        except Exception as e:
+            print(f"❌ 升级失败: {e}")
+            sys.exit(1)
+        return
+    
     try:
         app_token, table_id = init_bitable(args.app_id, args.app_secret, args.name)
         print("\n🎉 初始化完成！")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+记忆文本的BM25关键词索引
+写入前先用 zh_text.tokenize 做中文分词，再存入SQLite FTS5全文表，排序用FTS5内置的bm25()；
+人名、邮箱、产品编号等精确词的查询不需要加载Embedding模型
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List
+
+from zh_text import tokenize
+
+# SQLite单条语句的参数个数上限（保守取值）
+MAX_PARAMS = 500
+
+
+def fts_query(text: str) -> str:
+    """把查询文本转换为FTS5查询：每个词加引号（避免被解析为运算符），词之间取OR"""
+    terms = []
+    for token in dict.fromkeys(tokenize(text)):
+        terms.append('"{}"'.format(token.replace('"', '""')))
+    return " OR ".join(terms)
+
+
+class KeywordIndex:
+    """基于SQLite FTS5的BM25索引
+
+    docs 表把记忆ID映射到FTS行号，删除记忆时按行号删除；
+    memory_fts 只保存分好词的文本（空格分隔），不保存原文。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        rowid     INTEGER PRIMARY KEY,
+        memory_id TEXT NOT NULL UNIQUE
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(tokens);
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（守护进程多线程处理请求）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- 增量维护 ----------
+
+    def add_many(self, items: Iterable[tuple]) -> int:
+        """批量索引 [(memory_id, text)]，已存在的记忆会被替换；一个事务完成"""
+        items = list(items)
+        if not items:
+            return 0
+        with self.conn:
+            self._delete(self.conn, [memory_id for memory_id, _ in items])
+            for memory_id, text in items:
+                cursor = self.conn.execute("INSERT INTO docs (memory_id) VALUES (?)", (memory_id,))
+                self.conn.execute("INSERT INTO memory_fts (rowid, tokens) VALUES (?, ?)",
+                                  (cursor.lastrowid, " ".join(tokenize(text))))
+        return len(items)
+
+    def add(self, memory_id: str, text: str):
+        self.add_many([(memory_id, text)])
+
+    def remove(self, memory_ids: Iterable[str]):
+        with self.conn:
+            self._delete(self.conn, list(memory_ids))
+
+    @staticmethod
+    def _delete(conn, memory_ids: list):
+        for start in range(0, len(memory_ids), MAX_PARAMS):
+            chunk = memory_ids[start:start + MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rowids = [row[0] for row in conn.execute(
+                f"SELECT rowid FROM docs WHERE memory_id IN ({placeholders})", chunk)]
+            if rowids:
+                marks = ",".join("?" * len(rowids))
+                conn.execute(f"DELETE FROM memory_fts WHERE rowid IN ({marks})", rowids)
+                conn.execute(f"DELETE FROM docs WHERE rowid IN ({marks})", rowids)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM memory_fts")
+            self.conn.execute("DELETE FROM docs")
+
+    def optimize(self):
+        """合并FTS5段（大量增量写入后执行，加快查询）"""
+        with self.conn:
+            self.conn.execute("INSERT INTO memory_fts (memory_fts) VALUES ('optimize')")
+
+    # ---------- 查询 ----------
+
+    def search(self, query: str, limit: int = 20) -> List[tuple]:
+        """BM25检索
+
+        Returns:
+            [(memory_id, 得分)]，得分越大越相关（bm25()取反）
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = self.conn.execute(
+            "SELECT d.memory_id, -bm25(memory_fts) AS score FROM memory_fts "
+            "JOIN docs d ON d.rowid = memory_fts.rowid "
+            "WHERE memory_fts MATCH ? ORDER BY bm25(memory_fts) LIMIT ?",
+            (match, limit)).fetchall()
+        return [(memory_id, float(score)) for memory_id, score in rows]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+知识图谱双向增量同步
+飞书Bitable仍是数据源，本地SQLite保存一份镜像：
+- 拉取：只请求 上传时间 水位线之后的记录，按record_id覆盖写入本地
+- 推送：本地写入先进发件箱（outbox），攒够一批后用 batch_create 一次上传（带幂等键）
+查询全部在本地完成，写入被合并成少量批量请求
+"""
+
+import time
+import uuid
+import atexit
+import threading
+from typing import List, Dict, Iterator, Iterable
+
+import requests
+
+from triple_store import (BitableTripleStore, BitableError, SQLiteTripleStore, FIELD_UPLOADED,
+                          BATCH_CREATE_LIMIT, MAX_PAGE_SIZE, chunked, now_ms)
+
+DEFAULT_SYNC_INTERVAL = 300       # 秒，查询时距上次拉取超过该间隔则先增量拉取
+DEFAULT_PUSH_BATCH = 50           # 发件箱累计条数达到后自动上传
+# 水位线回退窗口：上传时间由各客户端按本机时钟填写，时钟偏差和请求耗时会让它略早于记录实际可见的时间，
+# 多拉这段时间内的记录，按record_id覆盖写入，重复拉取无副作用。
+# 离线积压后才上传的记录，上传时间仍是上传时刻，不会落到其他客户端的水位线之下
+SYNC_OVERLAP_MS = 10 * 60 * 1000
+
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    record_id TEXT PRIMARY KEY,
+    queued_at INTEGER NOT NULL,
+    batch     TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SyncedTripleStore:
+    """带本地镜像的Bitable三元组存储，接口与其他后端一致
+
+    冲突处理以record_id为准：
+    - 远端记录总是覆盖本地同ID记录
+    - 本地新写入使用临时ID（local_前缀），上传成功后替换为Bitable分配的record_id
+    """
+
+    name = "sync"
+
+    def __init__(self, remote: BitableTripleStore, cache_path,
+                 interval: float = DEFAULT_SYNC_INTERVAL, push_batch: int = DEFAULT_PUSH_BATCH):
+        self.remote = remote
+        # 增量拉取按 上传时间 筛选，上传时必须写入该字段
+        self.remote.stamp_upload = True
+        self.cache = SQLiteTripleStore(cache_path)
+        self.cache.conn.executescript(SYNC_SCHEMA)
+        self.interval = interval
+        self.push_batch = push_batch
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    # ---------- 同步状态 ----------
+
+    def _get_state(self, key: str, default: int = 0) -> int:
+        row = self.cache.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_state(self, conn, key: str, value: int):
+        conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, str(value)))
+
+    def pending(self) -> int:
+        """发件箱中尚未上传的条数"""
+        return self.cache.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def status(self) -> Dict:
+        return {
+            "cached": self.cache.count(),
+            "pending": self.pending(),
+            "watermark": self._get_state("watermark"),
+            "last_pull": self._get_state("last_pull"),
+        }
+
+    # ---------- 读写接口 ----------
+
+    def store_triple(self, subject: str, predicate: str, obj: str,
+                     confidence: float = 1.0, source: str = "") -> Dict:
+        """写入本地镜像并加入发件箱，攒够 push_batch 条后自动上传"""
+        triple = {
+            "record_id": f"local_{uuid.uuid4().hex}",
+            "subject": subject,
+            "predicate": predicate,
+            "object": obj,
+            "confidence": confidence,
+            "source": source,
+            "created_at": now_ms(),
+        }
+        self._enqueue([triple])
+        if self.push_batch and self.pending() >= self.push_batch:
+            self._try_push()
+        return triple
+
+    def store_triples(self, triples: Iterable[Dict], chunk_size: int = BATCH_CREATE_LIMIT,
+                      on_chunk=None) -> Dict:
+        """批量写入本地镜像和发件箱，全部入队后立即上传
+
+        上传失败的条目留在发件箱，下次同步时继续上传，因此不会出现在 failed 中。
+        """
+        stored = 0
+        for chunk in chunked(triples, chunk_size):
+            now = now_ms()
+            self._enqueue([{
+                "record_id": f"local_{uuid.uuid4().hex}",
+                "subject": t["subject"],
+                "predicate": t["predicate"],
+                "object": t["object"],
+                "confidence": t.get("confidence", 1.0),
+                "source": t.get("source", ""),
+                "created_at": t.get("created_at") or now,
+            } for t in chunk])
+            stored += len(chunk)
+            if on_chunk:
+                on_chunk(stored, 0)
+        self._try_push()
+        return {"stored": stored, "failed": []}
+
+    def _enqueue(self, triples: List[Dict]):
+        """写入本地镜像并加入发件箱（同一事务）"""
+        conn = self.cache.conn
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO triples VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [tuple(t[c] for c in SQLiteTripleStore.COLUMNS) for t in triples])
+            conn.executemany("INSERT OR REPLACE INTO outbox (record_id, queued_at) VALUES (?, ?)",
+                             [(t["record_id"], t["created_at"]) for t in triples])
+
+    def _try_push(self):
+        try:
+            self.push()
+        except (requests.RequestException, BitableError) as e:
+            print(f"⚠️ 上传发件箱失败，稍后重试: {e}")
+
+    def query(self, subject: str = None, predicate: str = None,
+              obj: str = None, limit: int = 100) -> List[Dict]:
+        """在本地镜像上查询，镜像过期时先增量拉取"""
+        self.maybe_pull()
+        return self.cache.query(subject, predicate, obj, limit)
+
+    def iter_query(self, subject: str = None, predicate: str = None, obj: str = None,
+                   **_) -> Iterator[Dict]:
+        self.maybe_pull()
+        return self.cache.iter_query(subject, predicate, obj)
+
+    def scan(self) -> Iterator[Dict]:
+        self.maybe_pull()
+        return self.cache.scan()
+
+    # ---------- 同步 ----------
+
+    def maybe_pull(self) -> int:
+        """距上次拉取超过 interval 时增量拉取；网络失败时继续使用本地数据"""
+        if time.time() * 1000 - self._get_state("last_pull") < self.interval * 1000:
+            return 0
+        try:
+            return self.pull()
+        except (requests.RequestException, BitableError) as e:
+            print(f"⚠️ 增量拉取失败，使用本地数据: {e}")
+            return 0
+
+    def pull(self) -> int:
+        """拉取水位线（上传时间）之后的记录，返回拉取条数
+
+        水位线用上传时间而不是三元组的创建时间：离线写入、很久之后才上传的记录，
+        创建时间早于其他客户端的水位线，按创建时间筛选会永远拉不到。
+        """
+        with self._lock:
+            watermark = self._get_state("watermark")
+            since = max(watermark - SYNC_OVERLAP_MS, 0)
+            conditions = None
+            if watermark:
+                # 日期字段的筛选值格式为 ["ExactDate", 毫秒时间戳]
+                conditions = [{"field_name": FIELD_UPLOADED, "operator": "isGreater",
+                               "value": ["ExactDate", str(since)]}]
+            sort = [{"field_name": FIELD_UPLOADED, "desc": False}]
+
+            pulled, started = 0, now_ms()
+            for items in self.remote.iter_pages(conditions, page_size=MAX_PAGE_SIZE, sort=sort):
+                # 服务端按日期粒度筛选，这里再按毫秒精确过滤
+                items = [t for t in items if (t["uploaded_at"] or 0) > since]
+                if items:
+                    self.cache.upsert_many(items)
+                    pulled += len(items)
+                    watermark = max(watermark, max(t["uploaded_at"] or 0 for t in items))
+                    # 每页提交一次水位线，中断后从断点继续
+                    with self.cache.conn as conn:
+                        self._set_state(conn, "watermark", watermark)
+
+            with self.cache.conn as conn:
+                self._set_state(conn, "last_pull", started)
+            return pulled
+
+    def push(self) -> int:
+        """按 batch_create 上限分块上传发件箱，返回上传条数
+
+        每块上传前先把批次号写入发件箱，作为 batch_create 的幂等键（client_token）：
+        响应丢失时这一块留在发件箱，下次按同一批次、同一幂等键重发，飞书不会重复创建。
+        每块上传成功后在同一事务里删除临时记录、写入带正式record_id的记录、
+        清除发件箱条目；失败的块留在发件箱中，下次继续上传。
+        """
+        with self._lock:
+            conn = self.cache.conn
+            rows = conn.execute(
+                "SELECT t.*, o.batch FROM outbox o JOIN triples t ON t.record_id = o.record_id "
+                "ORDER BY o.queued_at").fetchall()
+            batches, unassigned = {}, []
+            for row in rows:
+                triple = dict(row)
+                batch = triple.pop("batch")
+                if batch:
+                    batches.setdefault(batch, []).append(triple)
+                else:
+                    unassigned.append(triple)
+            if unassigned:
+                assigned = []
+                for chunk in chunked(unassigned, BATCH_CREATE_LIMIT):
+                    batch = str(uuid.uuid4())
+                    batches[batch] = chunk
+                    assigned += [(batch, t["record_id"]) for t in chunk]
+                with conn:
+                    conn.executemany("UPDATE outbox SET batch = ? WHERE record_id = ?", assigned)
+
+            pushed = 0
+            for batch, chunk in batches.items():
+                created = self.remote.batch_create(chunk, client_token=batch)
+                local_ids = [(t["record_id"],) for t in chunk]
+                with conn:
+                    conn.executemany("DELETE FROM triples WHERE record_id = ?", local_ids)
+                    conn.executemany("DELETE FROM outbox WHERE record_id = ?", local_ids)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO triples VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [tuple(t[c] for c in SQLiteTripleStore.COLUMNS) for t in created])
+                pushed += len(created)
+            return pushed
+
+    def sync(self) -> Dict:
+        """先推送本地写入，再增量拉取"""
+        pushed = self.push()
+        pulled = self.pull()
+        return {"pushed": pushed, "pulled": pulled}
+
+    def close(self):
+        """退出前尽量上传发件箱，失败的条目保留到下次"""
+        try:
+            if self.pending():
+                self.push()
+        except Exception as e:
+            print(f"⚠️ 上传发件箱失败，稍后重试: {e}")
@@ -1,19 +1,35 @@
 #!/usr/bin/env python3
 """
-知识图谱模块 - 使用飞书Bitable存储三元组
+知识图谱模块 - 使用飞书Bitable（或本地SQLite）存储三元组
 Subject-Predicate-Object 结构
 """
 
-import os
 import sys
+import csv
 import json
-import requests
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator
+
+from triple_store import BitableTripleStore, SQLiteTripleStore, BATCH_CREATE_LIMIT
+from rate_limit import TokenBucket, DEFAULT_RATE
+from feishu_client import FeishuClient
+from kg_sync import SyncedTripleStore, DEFAULT_SYNC_INTERVAL
+from graph_index import AdjacencyIndex, DEFAULT_MAX_DEPTH, DEFAULT_FAN_OUT, TRANSITIVE_PREDICATES
 
 # 配置
 CONFIG_PATH = Path.home() / ".openclaw" / "config.json"
+DEFAULT_KG_DB_PATH = Path.home() / ".openclaw" / "memory" / "knowledge_graph.db"
+DEFAULT_KG_CACHE_PATH = Path.home() / ".openclaw" / "memory" / "knowledge_graph_cache.db"
+
+# 导入文件的列名（中英文均可）
+IMPORT_COLUMNS = {
+    "subject": ("subject", "主语", "主语(Subject)"),
+    "predicate": ("predicate", "谓语", "谓语(Predicate)"),
+    "object": ("object", "obj", "宾语", "宾语(Object)"),
+    "confidence": ("confidence", "置信度", "置信度(Confidence)"),
+    "source": ("source", "来源", "来源(Source)"),
+}
 
 def load_config():
     """加载配置"""
@@ -25,39 +41,45 @@ def load_config():
 
 
 class FeishuKnowledgeGraph:
-    """飞书Bitable知识图谱"""
+    """飞书Bitable知识图谱
+    
+    存储后端由配置 kg_backend 选择：
+    - bitable（默认）: 直接读写飞书Bitable
+    - sqlite: 本地SQLite，查询在本地完成，离线可用
+    - sync: Bitable为数据源，本地镜像增量同步，读在本地、写入批量上传
+    """
     
-    def __init__(self):
+    def __init__(self, backend: str = None):
         self.config = load_config()
         self.app_token = self.config.get("bitable_app_token")
         self.table_id = self.config.get("bitable_table_id", "tbltRiJtLVv0HJ8c")  # 默认表ID
+        self.backend_name = backend or self.config.get("kg_backend", "bitable")
+        self.transitive_predicates = list(self.config.get("kg_transitive_predicates", TRANSITIVE_PREDICATES))
+        self._graph = None
         
-        # 从环境或配置文件获取飞书token
-        self.tenant_token = os.environ.get("FEISHU_TENANT_TOKEN") or self.config.get("feishu_tenant_token")
-        self.app_id = os.environ.get("FEISHU_APP_ID") or self.config.get("feishu_app_id")
-        self.app_secret = os.environ.get("FEISHU_APP_SECRET") or self.config.get("feishu_app_secret")
-        
-        if not self.tenant_token and (self.app_id and self.app_secret):
-            self.tenant_token = self._get_tenant_token()
-    
-    def _get_tenant_token(self) -> str:
-        """通过AppID和AppSecret获取TenantToken"""
-        url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-        headers = {"Content-Type": "application/json"}
-        data = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        resp = requests.post(url, headers=headers, json=data)
-        resp.raise_for_status()
-        return resp.json()["tenant_access_token"]
+        # 从环境或配置文件获取飞书凭证，token由客户端缓存并在过期前刷新
+        self.client = FeishuClient.from_config(self.config)
+        self.app_id = self.client.app_id
+        self.app_secret = self.client.app_secret
+        
+        if self.backend_name == "sqlite":
+            self.store = SQLiteTripleStore(self.config.get("kg_db_path", DEFAULT_KG_DB_PATH))
+        elif self.backend_name in ("bitable", "sync"):
+            rate = self.config.get("kg_write_rate", DEFAULT_RATE)
+            self.store = BitableTripleStore(self.app_token, self.table_id, self.client,
+                                            rate_limiter=TokenBucket(rate, burst=max(1, int(rate))))
+            if self.backend_name == "sync":
+                self.store = SyncedTripleStore(
+                    self.store,
+                    self.config.get("kg_cache_path", DEFAULT_KG_CACHE_PATH),
+                    interval=self.config.get("kg_sync_interval", DEFAULT_SYNC_INTERVAL))
+        else:
+            raise ValueError(f"不支持的知识图谱后端: {self.backend_name}（可选 bitable / sqlite / sync）")
     
-    def _get_headers(self) -> dict:
-        """获取请求头"""
-        return {
-            "Authorization": f"Bearer {self.tenant_token}",
-            "Content-Type": "application/json"
-        }
+    @property
+    def tenant_token(self) -> str:
+        """当前有效的TenantToken（首次访问时获取）"""
+        return self.client.get_token()
     
     def store_triple(self, subject: str, predicate: str, obj: str, 
                      confidence: float = 1.0, source: str = "") -> dict:
@@ -71,24 +93,31 @@ class FeishuKnowledgeGraph:
             source: 来源
         
         Returns:
-            存储结果
+            存储的三元组（含record_id）
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{self.table_id}/records"
-        
-        record = {
-            "fields": {
-                "主语(Subject)": subject,
-                "谓语(Predicate)": predicate,
-                "宾语(Object)": obj,
-                "置信度(Confidence)": confidence,
-                "来源(Source)": source,
-                "创建时间": int(datetime.now().timestamp() * 1000),
-            }
-        }
+        triple = self.store.store_triple(subject, predicate, obj, confidence, source)
+        if self._graph is not None:
+            self._graph.add(triple)
+        return triple
+    
+    def store_triples(self, triples: Iterable[Dict], chunk_size: int = BATCH_CREATE_LIMIT,
+                      on_chunk=None) -> Dict:
+        """批量存储三元组
         
-        resp = requests.post(url, headers=self._get_headers(), json=record)
-        resp.raise_for_status()
-        return resp.json()
+        Bitable后端按每块最多500条调用 batch_create，请求节奏由令牌桶控制
+        （配置 kg_write_rate，次/秒），被限流时按响应头暂停；失败的块单独重试。
+        
+        Args:
+            triples: 三元组字典的可迭代对象（subject/predicate/object[/confidence/source]）
+            on_chunk: 每块完成后回调 on_chunk(已写入条数, 失败条数)
+        
+        Returns:
+            {"stored": 写入条数, "failed": [{"triples": [...], "error": "..."}]}
+        """
+        result = self.store.store_triples(triples, chunk_size=chunk_size, on_chunk=on_chunk)
+        # 批量写入后邻接索引下次使用时重建
+        self._graph = None
+        return result
     
     def query(self, subject: str = None, predicate: str = None, 
               obj: str = None, limit: int = 100) -> List[Dict]:
@@ -103,85 +132,126 @@ class FeishuKnowledgeGraph:
         Returns:
             匹配的三元组列表
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{self.table_id}/records/search"
-        
-        # 构建过滤条件
-        filters = []
-        if subject:
-            filters.append({"field_name": "主语(Subject)", "operator": "is", "value": [subject]})
-        if predicate:
-            filters.append({"field_name": "谓语(Predicate)", "operator": "is", "value": [predicate]})
-        if obj:
-            filters.append({"field_name": "宾语(Object)", "operator": "is", "value": [obj]})
-        
-        data = {
-            "filter": {"conjunction": "and", "conditions": filters} if filters else None,
-            "page_size": limit
-        }
+        return self.store.query(subject, predicate, obj, limit)
+    
+    def iter_query(self, subject: str = None, predicate: str = None,
+                   obj: str = None, prefetch: bool = True) -> Iterator[Dict]:
+        """流式查询全部匹配的三元组
+        
+        按页惰性读取，不受 limit 截断，也不会一次把结果全部读入内存；
+        Bitable后端在处理当前页时后台预取下一页。
+        
+        Args:
+            subject: 主语筛选
+            predicate: 谓语筛选
+            obj: 宾语筛选
+            prefetch: 是否后台预取下一页
         
-        resp = requests.post(url, headers=self._get_headers(), json=data)
-        resp.raise_for_status()
-        result = resp.json()
-        
-        # 格式化返回结果
-        items = result.get("data", {}).get("items", [])
-        return [
-            {
-                "record_id": item["record_id"],
-                "subject": item["fields"].get("主语(Subject)", ""),
-                "predicate": item["fields"].get("谓语(Predicate)", ""),
-                "object": item["fields"].get("宾语(Object)", ""),
-                "confidence": item["fields"].get("置信度(Confidence)", 1.0),
-                "source": item["fields"].get("来源(Source)", ""),
-                "created_at": item["fields"].get("创建时间", 0),
-            }
-            for item in items
-        ]
-    
-    def simple_reasoning(self, subject: str, predicate: str = None) -> List[Dict]:
+        Yields:
+            三元组字典
+        """
+        return self.store.iter_query(subject, predicate, obj, prefetch=prefetch)
+    
+    @property
+    def graph(self) -> AdjacencyIndex:
+        """内存邻接索引，首次使用时从存储后端一次性构建"""
+        if self._graph is None:
+            self._graph = AdjacencyIndex(self.store.scan())
+        return self._graph
+    
+    def simple_reasoning(self, subject: str, predicate: str = None,
+                         max_depth: int = DEFAULT_MAX_DEPTH) -> List[Dict]:
         """简单推理查询
         
         例如：已知"老板喜欢吃川菜"，查询"老板喜欢吃什么"
+        对传递关系（是、属于、位于...）沿关系链推理：
+        已知"办公室位于朝阳区"、"朝阳区位于北京"，可推出"办公室位于北京"
         
         Args:
             subject: 主语
-            predicate: 谓语（可选）
+            predicate: 谓语（可选，不指定时对所有传递关系推理）
+            max_depth: 传递推理的最大跳数
         
         Returns:
-            推理结果
+            推理结果：直接事实在前，推出的事实带 inferred=True 和推理路径 path
         """
         # 直接查询
         results = self.query(subject=subject, predicate=predicate)
         
-        # 简单推理扩展
-        if predicate is None:
-            # 查询所有相关关系
-            return results
+        # 传递关系推理
+        predicates = [predicate] if predicate else self.transitive_predicates
+        known = {(r["predicate"], r["object"]) for r in results}
+        for p in predicates:
+            if p not in self.transitive_predicates:
+                continue
+            for triple in self.graph.transitive(subject, p, max_depth=max_depth):
+                if (p, triple["object"]) not in known:
+                    known.add((p, triple["object"]))
+                    results.append(triple)
         
         return results
     
-    def find_related(self, subject: str, depth: int = 1) -> List[Dict]:
-        """查找相关实体（图遍历）
+    def find_related(self, subject: str, depth: int = 1, fan_out: int = DEFAULT_FAN_OUT,
+                     direction: str = "both", predicate: str = None) -> Dict:
+        """查找相关实体（广度优先图遍历）
         
         Args:
             subject: 起始实体
-            depth: 遍历深度（目前只支持1层）
+            depth: 遍历深度
+            fan_out: 每个实体最多展开的关系数（按置信度取前N条）
+            direction: out 只沿 主语->宾语 方向，in 只反向，both 双向
+            predicate: 只沿指定关系遍历
         
         Returns:
-            相关实体列表
+            {"as_subject": 直接出边, "as_object": 直接入边,
+             "related": [{"entity", "depth", "path"}] 多跳可达实体及最短路径}
         """
-        # 查询以subject为主语的三元组
-        as_subject = self.query(subject=subject)
-        
-        # 查询以subject为宾语的三元组
-        as_object = self.query(obj=subject)
-        
+        graph = self.graph
         return {
-            "as_subject": as_subject,  # subject -> ?
-            "as_object": as_object     # ? -> subject
+            "as_subject": [t for _, t in graph.edges(subject, "out")],  # subject -> ?
+            "as_object": [t for _, t in graph.edges(subject, "in")],    # ? -> subject
+            "related": graph.traverse(subject, depth=depth, fan_out=fan_out,
+                                      direction=direction, predicate=predicate),
         }
 
 
+def normalize_triple(row: dict, default_source: str = "") -> Optional[Dict]:
+    """把导入文件的一行转换为三元组字典，缺少主谓宾时返回None"""
+    triple = {}
+    for key, aliases in IMPORT_COLUMNS.items():
+        for alias in aliases:
+            if row.get(alias) not in (None, ""):
+                triple[key] = row[alias]
+                break
+    if not all(str(triple.get(k, "")).strip() for k in ("subject", "predicate", "object")):
+        return None
+    triple["confidence"] = float(triple.get("confidence", 1.0))
+    triple["source"] = triple.get("source") or default_source
+    return triple
+
+
+def read_triples(path: str, fmt: str = None, default_source: str = "", skipped: list = None) -> Iterator[Dict]:
+    """逐行读取CSV（带表头）或JSONL文件中的三元组
+    
+    Args:
+        fmt: csv / jsonl，默认按扩展名判断
+        skipped: 传入列表时记录被跳过的行号
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for line_no, row in enumerate(rows, start=1):
+            triple = normalize_triple(row, default_source)
+            if triple is None:
+                if skipped is not None:
+                    skipped.append(line_no)
+                continue
+            yield triple
+
+
 def main():
     """命令行入口"""
     import argparse
@@ -202,11 +272,35 @@ def main():
     query_parser.add_argument("--subject", help="主语")
     query_parser.add_argument("--predicate", help="谓语")
     query_parser.add_argument("--object", help="宾语")
+    query_parser.add_argument("--limit", type=int, default=100, help="返回数量")
+    query_parser.add_argument("--all", action="store_true", help="流式输出全部结果（自动翻页）")
     
     # reason命令
     reason_parser = subparsers.add_parser("reason", help="简单推理")
     reason_parser.add_argument("subject", help="主语")
     reason_parser.add_argument("--predicate", help="谓语")
+    reason_parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="传递推理最大跳数")
+    
+    # related命令
+    related_parser = subparsers.add_parser("related", help="多跳查找相关实体")
+    related_parser.add_argument("subject", help="起始实体")
+    related_parser.add_argument("--depth", type=int, default=2, help="遍历深度")
+    related_parser.add_argument("--fan-out", type=int, default=DEFAULT_FAN_OUT, help="每个实体最多展开的关系数")
+    related_parser.add_argument("--direction", choices=["out", "in", "both"], default="both", help="遍历方向")
+    related_parser.add_argument("--predicate", help="只沿指定关系遍历")
+    
+    # import命令
+    import_parser = subparsers.add_parser("import", help="从CSV/JSONL批量导入三元组")
+    import_parser.add_argument("file", help="CSV（带表头）或JSONL文件")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="文件格式（默认按扩展名判断）")
+    import_parser.add_argument("--source", default="", help="缺省来源")
+    import_parser.add_argument("--chunk-size", type=int, default=BATCH_CREATE_LIMIT, help="每次批量写入条数（最多500）")
+    
+    # sync命令
+    sync_parser = subparsers.add_parser("sync", help="与Bitable双向增量同步（sync后端）")
+    sync_parser.add_argument("--status", action="store_true", help="只显示同步状态")
+    
+    parser.add_argument("--backend", choices=["bitable", "sqlite", "sync"], help="存储后端（默认取配置 kg_backend）")
     
     args = parser.parse_args()
     
@@ -214,7 +308,7 @@ def main():
         parser.print_help()
         return
     
-    kg = FeishuKnowledgeGraph()
+    kg = FeishuKnowledgeGraph(backend=args.backend)
     
     if args.command == "store":
         result = kg.store_triple(args.subject, args.predicate, args.object, 
@@ -222,16 +316,74 @@ def main():
         print(json.dumps(result, ensure_ascii=False, indent=2))
     
     elif args.command == "query":
-        results = kg.query(args.subject, args.predicate, args.object)
-        print(f"找到 {len(results)} 条记录：")
-        for r in results:
-            print(f"  {r['subject']} --[{r['predicate']}]--> {r['object']}")
+        if args.all:
+            count = 0
+            for r in kg.iter_query(args.subject, args.predicate, args.object):
+                print(f"  {r['subject']} --[{r['predicate']}]--> {r['object']}")
+                count += 1
+            print(f"共 {count} 条记录")
+        else:
+            results = kg.query(args.subject, args.predicate, args.object, limit=args.limit)
+            print(f"找到 {len(results)} 条记录：")
+            for r in results:
+                print(f"  {r['subject']} --[{r['predicate']}]--> {r['object']}")
     
     elif args.command == "reason":
-        results = kg.simple_reasoning(args.subject, args.predicate)
+        results = kg.simple_reasoning(args.subject, args.predicate, max_depth=args.max_depth)
         print(f"推理结果 ({len(results)} 条)：")
         for r in results:
-            print(f"  {r['subject']} --[{r['predicate']}]--> {r['object']}")
+            line = f"  {r['subject']} --[{r['predicate']}]--> {r['object']}"
+            if r.get("inferred"):
+                chain = " → ".join([r["path"][0]["subject"]] + [t["object"] for t in r["path"]])
+                line += f"  （推理: {chain}，置信度 {r['confidence']}）"
+            print(line)
+    
+    elif args.command == "related":
+        result = kg.find_related(args.subject, depth=args.depth, fan_out=args.fan_out,
+                                 direction=args.direction, predicate=args.predicate)
+        print(f"相关实体 ({len(result['related'])} 个)：")
+        for hop in result["related"]:
+            steps = []
+            entity = args.subject
+            for t in hop["path"]:
+                if t["subject"] == entity:
+                    steps.append(f"--[{t['predicate']}]--> {t['object']}")
+                    entity = t["object"]
+                else:
+                    steps.append(f"<--[{t['predicate']}]-- {t['subject']}")
+                    entity = t["subject"]
+            print(f"  [{hop['depth']}跳] {args.subject} " + " ".join(steps))
+    
+    elif args.command == "import":
+        skipped = []
+        triples = read_triples(args.file, args.format, args.source, skipped)
+        
+        def progress(stored, failed):
+            print(f"\r  已写入 {stored} 条，失败 {failed} 条", end="", flush=True)
+        
+        result = kg.store_triples(triples, chunk_size=args.chunk_size, on_chunk=progress)
+        print()
+        print(f"✅ 导入完成: 写入 {result['stored']} 条")
+        if skipped:
+            print(f"⚠️ 跳过 {len(skipped)} 行（缺少主语/谓语/宾语）: {skipped[:10]}")
+        if result["failed"]:
+            failed_path = Path(args.file).with_suffix(".failed.jsonl")
+            with open(failed_path, "w", encoding="utf-8") as f:
+                for chunk in result["failed"]:
+                    for triple in chunk["triples"]:
+                        f.write(json.dumps(triple, ensure_ascii=False) + "\n")
+            print(f"❌ {sum(len(c['triples']) for c in result['failed'])} 条写入失败: {result['failed'][0]['error']}")
+            print(f"   已保存到 {failed_path}，可再次运行 import 重试")
+            sys.exit(1)
+    
+    elif args.command == "sync":
+        if not isinstance(kg.store, SyncedTripleStore):
+            print("❌ 同步需要 sync 后端（配置 kg_backend: \"sync\" 或 --backend sync）")
+            sys.exit(1)
+        if not args.status:
+            result = kg.store.sync()
+            print(f"✅ 上传 {result['pushed']} 条，拉取 {result['pulled']} 条")
+        print(json.dumps(kg.store.status(), ensure_ascii=False, indent=2))
 
 
 if __name__ == "__main__":
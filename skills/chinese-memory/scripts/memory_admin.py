@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+向量记忆维护工具
+索引重建、去重、实体/关键词索引、模型迁移等离线维护操作（直接在本进程打开LanceDB，不经过守护进程）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+
+import numpy as np
+
+from memory_store import (ChineseMemory, DUPLICATE_THRESHOLD, EMBED_PREFIX, MODEL_TIERS,
+                          BACKENDS, TABLE_NAME, load_model, memory_schema)
+from duplicates import load_vectors, find_clusters, SCAN_BLOCK
+
+# 没有表指针的旧表：抽样重新编码，与库中向量的余弦相似度都超过该值即认为由当前模型生成
+LEGACY_CHECK_SAMPLES = 8
+LEGACY_MATCH_COSINE = 0.99
+
+
+def measure_recall(memory: ChineseMemory, samples: int = 50, k: int = 10) -> dict:
+    """用库内随机向量作查询，比较ANN搜索与精确搜索的召回率
+
+    Returns:
+        平均召回率以及两种搜索的平均延迟
+    """
+    table = memory.table
+    sample = table.to_lance().sample(min(samples, table.count_rows()), columns=["vector"])
+    queries = sample.column("vector").to_pylist()
+
+    recalls, ann_ms, exact_ms = [], [], []
+    for vector in queries:
+        start = time.perf_counter()
+        ann = (table.search(vector).distance_type(memory.metric).limit(k).nprobes(memory.nprobes)
+               .refine_factor(memory.refine_factor or 1).select(["id"]).to_list())
+        ann_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        exact = (table.search(vector).distance_type(memory.metric).limit(k)
+                 .bypass_vector_index().select(["id"]).to_list())
+        exact_ms.append((time.perf_counter() - start) * 1000)
+
+        exact_ids = {r["id"] for r in exact}
+        if exact_ids:
+            recalls.append(len(exact_ids & {r["id"] for r in ann}) / len(exact_ids))
+
+    return {
+        "samples": len(queries),
+        "k": k,
+        "recall": round(float(np.mean(recalls)), 4) if recalls else None,
+        "ann_ms": round(float(np.mean(ann_ms)), 2) if ann_ms else None,
+        "exact_ms": round(float(np.mean(exact_ms)), 2) if exact_ms else None,
+    }
+
+
+def cmd_reindex(memory: ChineseMemory, args):
+    rows = memory.table.count_rows()
+    if rows < 256:
+        print(f"❌ 记忆数量太少（{rows} 条），无法训练IVF-PQ索引")
+        sys.exit(1)
+    if args.index_type:
+        memory.index_type = args.index_type
+
+    state = memory.build_index()
+    print(f"✅ 索引建立完成: {state['index_type']} ({state['metric']}), {state['rows']} 条, "
+          f"{state['num_partitions']} 个分区, 耗时 {state['build_seconds']}s")
+
+    if args.samples > 0:
+        report = measure_recall(memory, samples=args.samples, k=args.k)
+        print(f"📊 召回率@{report['k']}: {report['recall']:.1%} ({report['samples']} 个查询, "
+              f"nprobes={memory.nprobes}, refine_factor={memory.refine_factor})")
+        print(f"   平均延迟: ANN {report['ann_ms']}ms | 精确搜索 {report['exact_ms']}ms")
+        state["recall"] = report
+
+    if args.json:
+        print(json.dumps(state, ensure_ascii=False, indent=2))
+
+
+def plan_dedupe(memory: ChineseMemory, threshold: float = DUPLICATE_THRESHOLD) -> tuple:
+    """找出重复记忆簇，并为每个簇选出保留的记忆
+
+    保留重要度最高者（其次访问次数多、创建时间早），合并后重要度取簇内最大值、
+    访问次数取总和。
+
+    Returns:
+        (plans, 向量矩阵, {列名: 列表})，plans 为
+        [{"keep": 行号, "drop": [行号...], "importance": ..., "access_count": ...}]
+    """
+    matrix, values = load_vectors(
+        memory.table, columns=("id", "text", "category", "importance", "created_at", "access_count"))
+    clusters = find_clusters(matrix, threshold)
+
+    plans = []
+    for members in clusters:
+        ranked = sorted(members, key=lambda i: (-values["importance"][i],
+                                                -values["access_count"][i],
+                                                values["created_at"][i]))
+        plans.append({
+            "keep": ranked[0],
+            "drop": ranked[1:],
+            "importance": max(values["importance"][i] for i in members),
+            "access_count": sum(values["access_count"][i] for i in members),
+        })
+    return plans, matrix, values
+
+
+def cmd_dedupe(memory: ChineseMemory, args):
+    start = time.perf_counter()
+    plans, matrix, values = plan_dedupe(memory, args.threshold)
+    seconds = time.perf_counter() - start
+    dropped = sum(len(p["drop"]) for p in plans)
+    print(f"🔍 扫描 {len(matrix)} 条记忆，耗时 {seconds:.2f}s：发现 {len(plans)} 个重复簇，"
+          f"可移除 {dropped} 条")
+
+    for plan in plans[:args.show]:
+        print(f"  ✅ 保留: {values['text'][plan['keep']][:60]}")
+        for i in plan["drop"]:
+            print(f"     🗑️  {values['text'][i][:60]}")
+    if len(plans) > args.show:
+        print(f"  ... 另有 {len(plans) - args.show} 个簇")
+
+    if not plans:
+        return
+    if not args.apply:
+        print("\n（预览模式，加 --apply 执行）")
+        return
+
+    if args.strategy == "merge":
+        # 保留的记忆继承整簇的最高重要度和访问次数，一次 merge_insert 写回
+        import pyarrow as pa
+        keep = [p["keep"] for p in plans]
+        updates = pa.Table.from_pydict({
+            "id": [values["id"][i] for i in keep],
+            "text": [values["text"][i] for i in keep],
+            "vector": [matrix[i].tolist() for i in keep],
+            "category": [values["category"][i] for i in keep],
+            "importance": [float(p["importance"]) for p in plans],
+            "created_at": [values["created_at"][i] for i in keep],
+            "access_count": [int(p["access_count"]) for p in plans],
+        }, schema=memory.table.schema)
+        memory.table.merge_insert("id").when_matched_update_all().execute(updates)
+
+    drop_ids = [values["id"][i] for p in plans for i in p["drop"]]
+    memory.delete_many(drop_ids)
+    print(f"✅ 已移除 {len(drop_ids)} 条重复记忆（{args.strategy}）")
+
+
+def _neighbors(vectors: np.ndarray, k: int) -> np.ndarray:
+    """每个向量在样本内的TopK近邻（不含自身）"""
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def cmd_bench(memory: ChineseMemory, args):
+    """比较不同模型档位/推理后端的编码速度，以及与当前配置的近邻一致率"""
+    rows = memory.table.count_rows()
+    if rows < args.k + 1:
+        print(f"❌ 记忆数量太少（{rows} 条），无法评估")
+        sys.exit(1)
+    texts = memory.table.to_lance().sample(min(args.samples, rows), columns=["text"]).column("text").to_pylist()
+    prefixed = [f"{EMBED_PREFIX}{t}" for t in texts]
+    k = min(args.k, len(texts) - 1)
+
+    reference = memory.model.encode(prefixed, batch_size=args.batch_size, normalize_embeddings=True)
+    reference_neighbors = _neighbors(np.asarray(reference), k)
+
+    print(f"📊 {len(texts)} 条样本，对照: {memory.model_name} ({memory.backend})")
+    for tier in args.tier:
+        for backend in args.backend:
+            model_name = MODEL_TIERS[tier]
+            model = load_model(model_name, backend)
+            start = time.perf_counter()
+            vectors = model.encode(prefixed, batch_size=args.batch_size, normalize_embeddings=True)
+            seconds = time.perf_counter() - start
+            neighbors = _neighbors(np.asarray(vectors), k)
+            agreement = np.mean([len(set(a) & set(b)) / k
+                                 for a, b in zip(neighbors, reference_neighbors)])
+            print(f"  {tier:<5} {backend:<5} {len(texts) / seconds:8.1f} 条/秒 | "
+                  f"{model.get_sentence_embedding_dimension()}维 | 近邻一致率@{k}: {agreement:.1%}")
+            del model
+
+
+def _next_table_name(existing) -> str:
+    """下一个版本号的表名：memories_v2、memories_v3 ..."""
+    versions = [int(m.group(1)) for name in existing
+                for m in [re.fullmatch(rf"{TABLE_NAME}_v(\d+)", name)] if m]
+    return f"{TABLE_NAME}_v{max(versions, default=1) + 1}"
+
+
+def _encoded_by_current_model(memory: ChineseMemory, table, samples: int = LEGACY_CHECK_SAMPLES) -> bool:
+    """抽样重新编码，判断表中向量是否由当前配置的模型生成（空表视为是）"""
+    sample = table.to_lance().sample(min(samples, table.count_rows()), columns=["text", "vector"])
+    if not sample.num_rows:
+        return True
+    stored = np.array(sample.column("vector").to_pylist(), dtype=np.float32)
+    fresh = memory.embed_many(sample.column("text").to_pylist())
+    return bool(np.all(np.sum(stored * fresh, axis=1) > LEGACY_MATCH_COSINE))
+
+
+def migrate_model(memory: ChineseMemory, chunk_size: int = 1000, batch_size: int = 32,
+                  drop_old: bool = False) -> dict:
+    """用当前配置的模型重新生成全部向量，写入新版本的表后原子切换
+
+    分块读取旧表，已写入新表的ID会被跳过，中断后重新运行即可从断点继续。
+    """
+    from memory_client import MemoryClient
+    if MemoryClient.connect() is not None:
+        print("❌ 记忆守护进程正在运行，请先执行: python3 memory_server.py stop")
+        sys.exit(1)
+
+    db = memory.db
+    source_name = memory.table_name
+    if source_name not in db.table_names():
+        print(f"❌ 向量表 {source_name} 不存在，无需迁移")
+        sys.exit(1)
+    source = db.open_table(source_name)
+    source_dim = source.schema.field("vector").type.list_size
+    source_model = memory.active_table().get("model")
+    dim = memory.embedding_dim
+    if source_model == memory.model_name and source_dim == dim:
+        print(f"✅ 向量表 {source_name} 已由 {memory.model_name} 生成，无需迁移")
+        return {"status": "unchanged", "table": source_name}
+    # 表指针出现之前建的旧表不知道模型：维度一致且抽样向量吻合时只补写指针
+    if source_model is None and source_dim == dim and _encoded_by_current_model(memory, source):
+        memory.switch_table(source_name, memory.model_name, memory.backend, dim)
+        print(f"✅ 向量表 {source_name} 已由 {memory.model_name} 生成（已补写表指针），无需迁移")
+        return {"status": "unchanged", "table": source_name}
+
+    # 断点续传：同一源表、同一目标模型的迁移沿用上次的目标表
+    state_path = memory.db_path.parent / "migration.json"
+    state = {}
+    if state_path.exists():
+        with open(state_path) as f:
+            state = json.load(f)
+    if state.get("source") != source_name or state.get("model") != memory.model_name:
+        state = {"source": source_name, "target": _next_table_name(db.table_names()),
+                 "model": memory.model_name, "backend": memory.backend,
+                 "started_at": int(time.time() * 1000)}
+        with open(state_path, "w") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+    target_name = state["target"]
+
+    if target_name in db.table_names():
+        target = db.open_table(target_name)
+        done_ids = set(target.to_lance().to_table(columns=["id"]).column("id").to_pylist())
+    else:
+        target = db.create_table(target_name, schema=memory_schema(dim))
+        done_ids = set()
+
+    total = source.count_rows()
+    print(f"🔄 迁移 {source_name}（{source_model or '旧模型'}，{source_dim}维）→ "
+          f"{target_name}（{memory.model_name}，{dim}维），共 {total} 条")
+    if done_ids:
+        print(f"   从断点继续：已完成 {len(done_ids)} 条")
+
+    columns = ["id", "text", "category", "importance", "created_at", "access_count"]
+    start = time.perf_counter()
+    encoded = 0
+    for batch in source.to_lance().to_batches(columns=columns, batch_size=chunk_size):
+        rows = [r for r in batch.to_pylist() if r["id"] not in done_ids]
+        if not rows:
+            continue
+        vectors = memory.embed_many([r["text"] for r in rows], batch_size=batch_size)
+        for row, vector in zip(rows, vectors):
+            row["vector"] = vector.tolist()
+        target.add(rows)
+        done_ids.update(r["id"] for r in rows)
+        encoded += len(rows)
+
+        seconds = time.perf_counter() - start
+        rate = encoded / seconds if seconds else 0.0
+        remaining = max(total - len(done_ids), 0)
+        eta = remaining / rate if rate else 0.0
+        print(f"   {len(done_ids)}/{total} ({len(done_ids) / max(total, 1):.0%}) | "
+              f"{rate:.1f} 条/秒 | 预计剩余 {eta:.0f}s")
+
+    if target.count_rows() < total:
+        print(f"❌ 新表只有 {target.count_rows()} 条，少于源表 {total} 条，未切换")
+        sys.exit(1)
+
+    memory.switch_table(target_name, memory.model_name, memory.backend, dim)
+    os.remove(state_path)
+    seconds = time.perf_counter() - start
+    print(f"✅ 已切换到 {target_name}：重新编码 {encoded} 条，耗时 {seconds:.1f}s")
+
+    index = memory.maybe_index()
+    if index:
+        print(f"   已为新表建立索引（{index['build_seconds']}s）")
+
+    if drop_old:
+        db.drop_table(source_name)
+        print(f"🗑️  已删除旧表 {source_name}")
+    else:
+        print(f"   旧表 {source_name} 已保留，可用于回退")
+
+    return {"status": "success", "source": source_name, "target": target_name,
+            "encoded": encoded, "seconds": round(seconds, 3)}
+
+
+def cmd_entities(memory: ChineseMemory, args):
+    """刷新知识图谱实体、重建实体索引、查看统计"""
+    index = memory.entities
+    if index is None:
+        print("❌ 实体索引未启用（配置 entity_index=false）")
+        sys.exit(1)
+
+    if args.kg:
+        from knowledge_graph import FeishuKnowledgeGraph
+        count = index.set_kg_entities(FeishuKnowledgeGraph().graph.entities)
+        print(f"✅ 已载入 {count} 个知识图谱实体")
+
+    # 已知实体变化后，已有记忆需要重新抽取实体
+    if args.rebuild or args.kg:
+        start = time.perf_counter()
+        index.clear()
+        indexed = pairs = 0
+        for batch in memory.table.to_lance().to_batches(columns=["id", "text"], batch_size=SCAN_BLOCK):
+            items = list(zip(batch.column("id").to_pylist(), batch.column("text").to_pylist()))
+            pairs += index.add_many(items)
+            indexed += len(items)
+        print(f"✅ 已重建实体索引: {indexed} 条记忆，{pairs} 个实体引用，"
+              f"耗时 {time.perf_counter() - start:.2f}s")
+
+    stats = index.stats()
+    print(f"📇 实体索引: {stats['entities']} 个实体 / {stats['memories']} 条记忆 / "
+          f"{stats['pairs']} 个引用，已知图谱实体 {stats['kg_entities']} 个")
+    for entity, count in index.top_entities(args.top):
+        print(f"   {entity}: {count}")
+
+
+def cmd_keywords(memory: ChineseMemory, args):
+    """重建/优化BM25关键词索引"""
+    index = memory.keywords
+    if index is None:
+        print("❌ 关键词索引未启用（配置 keyword_index=false）")
+        sys.exit(1)
+
+    if args.rebuild:
+        start = time.perf_counter()
+        index.clear()
+        indexed = 0
+        for batch in memory.table.to_lance().to_batches(columns=["id", "text"], batch_size=SCAN_BLOCK):
+            indexed += index.add_many(zip(batch.column("id").to_pylist(), batch.column("text").to_pylist()))
+        print(f"✅ 已重建关键词索引: {indexed} 条记忆，耗时 {time.perf_counter() - start:.2f}s")
+
+    if args.rebuild or args.optimize:
+        index.optimize()
+        print("✅ 已合并索引段")
+
+    print(f"🔤 关键词索引: {index.count()} 条记忆")
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="向量记忆维护")
+    subparsers = parser.add_subparsers(dest="command", help="子命令")
+
+    # reindex命令
+    reindex_parser = subparsers.add_parser("reindex", help="重建ANN索引并评估召回率")
+    reindex_parser.add_argument("--index-type", choices=["IVF_PQ", "IVF_HNSW_SQ", "IVF_HNSW_PQ"],
+                                help="索引类型（默认取配置 index_type）")
+    reindex_parser.add_argument("--samples", type=int, default=50, help="评估召回率的查询数，0表示跳过")
+    reindex_parser.add_argument("-k", type=int, default=10, help="评估召回率的TopK")
+    reindex_parser.add_argument("--json", action="store_true", help="输出JSON结果")
+
+    # dedupe命令
+    dedupe_parser = subparsers.add_parser("dedupe", help="查找并合并/删除重复记忆")
+    dedupe_parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                               help="余弦相似度阈值（与距离度量无关）")
+    dedupe_parser.add_argument("--strategy", choices=["merge", "delete"], default="merge",
+                               help="merge: 保留者继承重要度和访问次数；delete: 直接删除其余")
+    dedupe_parser.add_argument("--apply", action="store_true", help="执行（默认只预览）")
+    dedupe_parser.add_argument("--show", type=int, default=20, help="预览显示的簇数")
+
+    # bench命令
+    bench_parser = subparsers.add_parser("bench", help="比较模型档位/推理后端的编码速度与效果")
+    bench_parser.add_argument("--tier", nargs="+", choices=list(MODEL_TIERS), default=list(MODEL_TIERS),
+                              help="模型档位")
+    bench_parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["torch", "int8"],
+                              help="推理后端")
+    bench_parser.add_argument("--samples", type=int, default=200, help="从记忆库抽样的文本数")
+    bench_parser.add_argument("-k", type=int, default=5, help="近邻一致率的TopK")
+    bench_parser.add_argument("--batch-size", type=int, default=32, help="编码批大小")
+
+    # migrate-model命令
+    migrate_parser = subparsers.add_parser("migrate-model",
+                                           help="用配置中的新模型重新生成全部向量并切换到新表")
+    migrate_parser.add_argument("--chunk-size", type=int, default=1000, help="每次从旧表读取的行数")
+    migrate_parser.add_argument("--batch-size", type=int, default=32, help="编码批大小")
+    migrate_parser.add_argument("--drop-old", action="store_true", help="切换后删除旧表")
+
+    # entities命令
+    entities_parser = subparsers.add_parser("entities", help="维护实体倒排索引（实体 → 记忆ID）")
+    entities_parser.add_argument("--kg", action="store_true", help="从知识图谱刷新已知实体并重建索引")
+    entities_parser.add_argument("--rebuild", action="store_true", help="扫描全部记忆重建索引")
+    entities_parser.add_argument("--top", type=int, default=10, help="显示提及最多的实体数")
+
+    # keywords命令
+    keywords_parser = subparsers.add_parser("keywords", help="维护BM25关键词索引")
+    keywords_parser.add_argument("--rebuild", action="store_true", help="扫描全部记忆重建索引")
+    keywords_parser.add_argument("--optimize", action="store_true", help="合并索引段，加快查询")
+
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    memory = ChineseMemory()
+
+    if args.command == "reindex":
+        cmd_reindex(memory, args)
+    elif args.command == "dedupe":
+        cmd_dedupe(memory, args)
+    elif args.command == "bench":
+        cmd_bench(memory, args)
+    elif args.command == "entities":
+        cmd_entities(memory, args)
+    elif args.command == "keywords":
+        cmd_keywords(memory, args)
+    elif args.command == "migrate-model":
+        migrate_model(memory, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                      drop_old=args.drop_old)
+
+
+if __name__ == "__main__":
+    main()
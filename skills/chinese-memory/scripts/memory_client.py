@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+记忆守护进程客户端
+通过Unix Socket连接 memory_server.py，守护进程未运行时回退到进程内模式
+"""
+
+import os
+import json
+import socket
+from pathlib import Path
+
+from memory_store import load_config, DEFAULT_DB_PATH
+
+# 设置该环境变量可强制使用进程内模式
+LOCAL_ENV = "CHINESE_MEMORY_LOCAL"
+DEFAULT_TIMEOUT = 300
+
+
+def default_socket_path(config: dict = None) -> Path:
+    """守护进程Socket路径，默认与向量库放在同一目录"""
+    config = load_config() if config is None else config
+    if config.get("server_socket"):
+        return Path(config["server_socket"]).expanduser()
+    db_path = Path(config.get("vector_db_path", DEFAULT_DB_PATH)).expanduser()
+    return db_path.parent / "chinese-memory.sock"
+
+
+class DaemonError(Exception):
+    """守护进程返回的错误"""
+
+
+class MemoryClient:
+    """与 ChineseMemory 接口一致的守护进程客户端"""
+
+    def __init__(self, socket_path=None, timeout: float = DEFAULT_TIMEOUT):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, socket_path=None):
+        """守护进程在运行时返回客户端，否则返回None"""
+        client = cls(socket_path)
+        if not client.socket_path.exists():
+            return None
+        try:
+            client.call("ping")
+        except (OSError, DaemonError):
+            return None
+        return client
+
+    def call(self, op: str, **args):
+        """发送一次请求，每行一个JSON"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.socket_path))
+            request = json.dumps({"op": op, "args": args}, ensure_ascii=False)
+            sock.sendall(request.encode("utf-8") + b"\n")
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+        if not line:
+            raise DaemonError("守护进程未返回结果")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "未知错误"))
+        return response.get("result")
+
+    def store(self, text: str, category: str = "other", importance: float = 0.7) -> dict:
+        return self.call("store", text=text, category=category, importance=importance)
+
+    def store_many(self, texts, categories=None, importances=None, batch_size: int = None) -> list:
+        args = {"texts": list(texts)}
+        if categories is not None:
+            args["categories"] = list(categories)
+        if importances is not None:
+            args["importances"] = list(importances)
+        if batch_size is not None:
+            args["batch_size"] = batch_size
+        return self.call("store_many", **args)
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.5, **options) -> list:
+        """options 与 ChineseMemory.search 一致（nprobes、category、rerank等）"""
+        return self.call("search", query=query, limit=limit, min_score=min_score, **options)
+
+    def delete(self, memory_id: str) -> dict:
+        return self.call("delete", memory_id=memory_id)
+
+    def memories_about(self, entity: str, limit: int = 20) -> list:
+        return self.call("memories_about", entity=entity, limit=limit)
+
+    def cache_stats(self) -> dict:
+        return self.call("cache_stats")
+
+
+def open_memory(local: bool = False):
+    """获取记忆实例：优先使用守护进程，未运行时回退到进程内 ChineseMemory"""
+    if not local and not os.environ.get(LOCAL_ENV):
+        client = MemoryClient.connect()
+        if client is not None:
+            return client
+    from memory_store import ChineseMemory
+    return ChineseMemory()
@@ -8,9 +8,28 @@ import os
 import sys
 import json
 from pathlib import Path
+from datetime import datetime, timedelta
 
-# 复用memory_store中的类
-from memory_store import ChineseMemory
+# 守护进程运行时作为客户端，否则在本进程加载 ChineseMemory
+from memory_client import open_memory
+from memory_store import CATEGORIES
+
+
+def parse_time(value: str) -> int:
+    """解析时间参数为毫秒时间戳：支持 YYYY-MM-DD、YYYY-MM-DD HH:MM，或相对时间如 7d / 12h"""
+    if value[-1:] in ("d", "h") and value[:-1].isdigit():
+        unit = "days" if value[-1] == "d" else "hours"
+        moment = datetime.now() - timedelta(**{unit: int(value[:-1])})
+    else:
+        for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                moment = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"无法解析时间: {value}")
+    return int(moment.timestamp() * 1000)
 
 
 def main():
@@ -18,30 +37,95 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="搜索向量记忆")
-    parser.add_argument("query", help="查询文本")
+    parser.add_argument("query", nargs="?", help="查询文本")
     parser.add_argument("--limit", type=int, default=5, help="返回结果数量")
     parser.add_argument("--min-score", type=float, default=0.5, help="最小相似度阈值")
+    parser.add_argument("--nprobes", type=int, help="查询的IVF分区数（默认取配置）")
+    parser.add_argument("--refine-factor", type=int, help="候选重排倍数，0表示不重排（默认取配置）")
+    parser.add_argument("--category", action="append", choices=CATEGORIES,
+                        help="只搜索该类别，可重复指定")
+    parser.add_argument("--since", help="起始时间：YYYY-MM-DD 或相对时间如 7d")
+    parser.add_argument("--until", help="截止时间：YYYY-MM-DD 或相对时间如 1d")
+    parser.add_argument("--min-importance", type=float, help="最小重要度")
+    parser.add_argument("--where", help="额外的SQL过滤条件，如 \"access_count > 0\"")
+    parser.add_argument("--rerank", action="store_true",
+                        help="按相似度、重要度、时间衰减、访问频次混合排序")
+    parser.add_argument("--mode", choices=["vector", "keyword", "hybrid"], default="vector",
+                        help="vector 语义检索；keyword BM25关键词检索（不加载模型）；hybrid 两者融合")
+    parser.add_argument("--expand-entities", action="store_true",
+                        help="同时返回提到查询中实体的记忆（实体索引）")
+    parser.add_argument("--about", metavar="ENTITY",
+                        help="列出提到该实体的全部记忆（只查实体索引，不加载模型）")
     parser.add_argument("--format", choices=["json", "text"], default="text", help="输出格式")
+    parser.add_argument("--stats", action="store_true", help="输出Embedding缓存命中统计")
+    parser.add_argument("--local", action="store_true", help="不连接守护进程，直接在本进程加载模型")
     
     args = parser.parse_args()
     
-    memory = ChineseMemory()
-    results = memory.search(args.query, limit=args.limit, min_score=args.min_score)
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if not args.query and not args.about:
+        parser.error("请提供查询文本，或使用 --about 按实体列出记忆")
+    
+    memory = open_memory(local=args.local)
+    if args.about:
+        results = memory.memories_about(args.about, limit=args.limit)
+    else:
+        results = memory.search(args.query, limit=args.limit, min_score=args.min_score,
+                                nprobes=args.nprobes, refine_factor=args.refine_factor,
+                                category=args.category, since=since, until=until,
+                                min_importance=args.min_importance, where=args.where,
+                                rerank=args.rerank, expand_entities=args.expand_entities,
+                                mode=args.mode)
     
     if args.format == "json":
-        print(json.dumps(results, ensure_ascii=False, indent=2))
+        if args.stats:
+            print(json.dumps({"results": results, "cache": memory.cache_stats()},
+                             ensure_ascii=False, indent=2))
+        else:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
     else:
         # 文本格式输出
         if not results:
             print("未找到相关记忆")
-            return
+        else:
+            print(f"找到 {len(results)} 条相关记忆：")
+            print("-" * 50)
+            for i, r in enumerate(results, 1):
+                print(f"{i}. [{r['category']}] {r['text']}")
+                line = f"   重要度: {r['importance']}"
+                if "keyword_score" in r:
+                    line = f"   关键词: {r['keyword_score']:.2f} |" + line[2:]
+                if "score" in r:
+                    line = f"   相似度: {r['score']:.1%} |" + line[2:]
+                if "hybrid_score" in r:
+                    line += f" | 混合得分: {r['hybrid_score']:.3f}"
+                if r.get("entities"):
+                    line += f" | 实体: {'、'.join(r['entities'])}"
+                if "rank_score" in r:
+                    line += f" | 综合得分: {r['rank_score']:.3f}"
+                print(line)
+                print()
         
-        print(f"找到 {len(results)} 条相关记忆：")
-        print("-" * 50)
-        for i, r in enumerate(results, 1):
-            print(f"{i}. [{r['category']}] {r['text']}")
-            print(f"   相似度: {r['score']:.1%} | 重要度: {r['importance']}")
-            print()
+        if args.stats:
+            print_cache_stats(memory.cache_stats())
+
+
+def print_cache_stats(stats: dict):
+    """打印Embedding缓存统计"""
+    if not stats.get("enabled"):
+        print("Embedding缓存: 未启用")
+        return
+    session, total = stats["session"], stats["total"]
+    print(f"Embedding缓存: {stats['size']}/{stats['capacity']} 条 | 平均编码 {stats['avg_encode_ms']}ms")
+    print(f"   本次: 命中 {session['hits']} / 未命中 {session['misses']} "
+          f"({session['hit_rate']:.1%})，节省 {session['saved_seconds']}s")
+    print(f"   累计: 命中 {total['hits']} / 未命中 {total['misses']} "
+          f"({total['hit_rate']:.1%})，节省 {total['saved_seconds']}s")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+记忆守护进程
+常驻内存持有一个 ChineseMemory 实例（BGE模型和LanceDB只加载一次），
+通过本地Unix Socket提供 store/search/delete 服务
+"""
+
+import os
+import sys
+import json
+import signal
+import threading
+import socketserver
+
+from memory_store import ChineseMemory, DEFAULT_BATCH_SIZE
+from memory_client import MemoryClient, DaemonError, default_socket_path
+
+
+def _to_json(obj):
+    """numpy标量/数组转换为可序列化的Python对象"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+class MemoryRequestHandler(socketserver.StreamRequestHandler):
+    """每行一个JSON请求: {"op": ..., "args": {...}}"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request.get("op"), request.get("args") or {})
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            payload = json.dumps(response, ensure_ascii=False, default=_to_json)
+            self.wfile.write(payload.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class MemoryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, memory: ChineseMemory):
+        self.memory = memory
+        # 模型推理和LanceDB写入串行执行
+        self.lock = threading.Lock()
+        # 仅当前用户可访问：bind() 创建Socket文件时就是0600，不留先建后改权限的空档
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), MemoryRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, op: str, args: dict):
+        if op == "ping":
+            return {"pid": os.getpid()}
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"status": "stopping"}
+
+        memory = self.memory
+        with self.lock:
+            if op == "store":
+                return memory.store(args["text"], args.get("category", "other"),
+                                    args.get("importance", 0.7))
+            if op == "store_many":
+                return memory.store_many(args["texts"], args.get("categories"),
+                                         args.get("importances"),
+                                         batch_size=args.get("batch_size", DEFAULT_BATCH_SIZE))
+            if op == "search":
+                return memory.search(**args)
+            if op == "delete":
+                return memory.delete(args["memory_id"])
+            if op == "memories_about":
+                return memory.memories_about(args["entity"], args.get("limit", 20))
+            if op == "cache_stats":
+                return memory.cache_stats()
+        raise ValueError(f"未知操作: {op}")
+
+
+def serve(socket_path, preload: bool = True):
+    """前台运行守护进程"""
+    if MemoryClient.connect(socket_path) is not None:
+        print(f"守护进程已在运行: {socket_path}")
+        sys.exit(1)
+    # 清理上次异常退出留下的Socket文件
+    if socket_path.exists():
+        socket_path.unlink()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    memory = ChineseMemory()
+    # 写入后在后台线程维护ANN索引，不占用服务锁
+    memory.background_index = True
+    # 所有客户端的搜索命中在守护进程内累计，批量写回
+    memory.record_access = True
+    if preload:
+        memory.model
+        memory.table
+
+    server = MemoryServer(socket_path, memory)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+        target=server.shutdown, daemon=True).start())
+    print(f"记忆守护进程已启动 (pid {os.getpid()}): {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+        memory.close()
+        print("记忆守护进程已停止")
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="记忆守护进程（本地Unix Socket）")
+    parser.add_argument("command", nargs="?", default="start",
+                        choices=["start", "stop", "status"], help="子命令")
+    parser.add_argument("--socket", help="Socket路径（默认与向量库同目录）")
+    parser.add_argument("--no-preload", action="store_true", help="启动时不预加载模型")
+
+    args = parser.parse_args()
+    socket_path = default_socket_path() if args.socket is None else default_socket_path(
+        {"server_socket": args.socket})
+
+    if args.command == "start":
+        serve(socket_path, preload=not args.no_preload)
+        return
+
+    client = MemoryClient.connect(socket_path)
+    if client is None:
+        print("守护进程未运行")
+        sys.exit(1)
+
+    if args.command == "status":
+        info = client.call("ping")
+        stats = client.cache_stats()
+        print(f"守护进程运行中 (pid {info['pid']}): {socket_path}")
+        print(json.dumps({"cache": stats}, ensure_ascii=False, indent=2))
+    elif args.command == "stop":
+        try:
+            client.call("shutdown")
+        except DaemonError as e:
+            print(f"停止失败: {e}")
+            sys.exit(1)
+        print("已发送停止请求")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,22 +7,77 @@
 import os
 import sys
 import json
+import time
+import threading
+import importlib
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
-# 添加依赖路径
-try:
-    from sentence_transformers import SentenceTransformer
-    import lancedb
-except ImportError:
-    print("请先安装依赖: pip install sentence-transformers lancedb")
-    sys.exit(1)
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_SIZE
+from duplicates import iter_vectors, max_similarity
+from access_tracker import AccessTracker, DEFAULT_FLUSH_INTERVAL, DEFAULT_FLUSH_THRESHOLD
+from entity_index import EntityIndex
+from keyword_index import KeywordIndex
 
 # 配置
 CONFIG_PATH = Path.home() / ".openclaw" / "config.json"
 DEFAULT_DB_PATH = Path.home() / ".openclaw" / "memory" / "vectors"
 DEFAULT_MODEL = "BAAI/bge-large-zh-v1.5"
+# 模型档位：small速度最快、召回略低，large效果最好
+MODEL_TIERS = {
+    "small": "BAAI/bge-small-zh-v1.5",
+    "base": "BAAI/bge-base-zh-v1.5",
+    "large": "BAAI/bge-large-zh-v1.5",
+}
+# 已知模型的向量维度，建表时无需加载模型；其他模型从模型本身读取
+MODEL_DIMS = {
+    "BAAI/bge-small-zh-v1.5": 512,
+    "BAAI/bge-base-zh-v1.5": 768,
+    "BAAI/bge-large-zh-v1.5": 1024,
+}
+# 推理后端：torch原始精度 / int8动态量化（CPU） / ONNX Runtime
+BACKENDS = ["torch", "int8", "onnx"]
+# 默认向量表名；更换模型迁移后切换到带版本号的新表（见 memory_admin.py migrate-model）
+TABLE_NAME = "memories"
+# BGE模型建议添加的检索前缀
+EMBED_PREFIX = "为这个句子生成表示："
+DEFAULT_BATCH_SIZE = 32
+CATEGORIES = ["preference", "fact", "decision", "entity", "other"]
+# 余弦相似度超过该值视为重复记忆（与度量无关；旧版 l2 打分下的 0.95 即余弦约 0.974）
+DUPLICATE_THRESHOLD = 0.974
+# ANN索引：超过该行数自动建索引，之后每新增N条增量合并一次（table.optimize），行数翻倍时重建
+DEFAULT_INDEX_MIN_ROWS = 10000
+DEFAULT_REINDEX_EVERY = 5000
+DEFAULT_INDEX_TYPE = "IVF_PQ"
+DEFAULT_NPROBES = 20
+DEFAULT_REFINE_FACTOR = 10
+# 向量已归一化，默认用余弦相似度；l2 为旧版行为
+DEFAULT_METRIC = "cosine"
+METRICS = ["cosine", "dot", "l2"]
+# 与向量索引一起建立的标量索引，使 where 预过滤无需全表扫描
+SCALAR_INDEXES = {
+    "id": "BTREE",
+    "category": "BITMAP",
+    "created_at": "BTREE",
+    "importance": "BTREE",
+}
+# 混合排序：相似度、重要度、时间衰减、访问频次的权重
+DEFAULT_RERANK = {
+    "similarity": 0.7,
+    "importance": 0.15,
+    "recency": 0.1,
+    "access": 0.05,
+    "half_life_days": 30,
+}
+# 混合排序时多取的候选倍数
+RERANK_OVERSAMPLE = 4
+# 检索方式：vector 语义检索；keyword BM25关键词检索（不加载模型）；hybrid 两者加权融合
+SEARCH_MODES = ["vector", "keyword", "hybrid"]
+# hybrid 模式中向量相似度的权重，其余为归一化BM25得分
+DEFAULT_HYBRID_ALPHA = 0.5
+# 返回给调用方的记忆字段（不含向量）
+MEMORY_COLUMNS = ["id", "text", "category", "importance", "created_at", "access_count"]
 
 def load_config():
     """加载配置"""
@@ -32,13 +87,176 @@ def load_config():
             return config.get("chinese-memory", {})
     return {}
 
+
+def memory_schema(dim: int):
+    """memories表结构"""
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.string()),
+        ("text", pa.string()),
+        ("vector", pa.list_(pa.float32(), dim)),
+        ("category", pa.string()),
+        ("importance", pa.float32()),
+        ("created_at", pa.int64()),
+        ("access_count", pa.int32()),
+    ])
+
+
+def resolve_model_name(name: str) -> str:
+    """配置中的 embedding_model 可以是档位名（small/base/large）或完整模型名"""
+    return MODEL_TIERS.get(name, name)
+
+
+def load_model(model_name: str, backend: str = "torch"):
+    """加载SentenceTransformer模型
+    
+    int8: 对Linear层做动态量化，CPU编码通常快2-3倍，相似度误差很小；
+    onnx: 使用ONNX Runtime推理（需要 pip install "sentence-transformers[onnx]"）。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {backend}，可选 {BACKENDS}")
+    sentence_transformers = require("sentence_transformers")
+    if backend == "onnx":
+        return sentence_transformers.SentenceTransformer(model_name, backend="onnx")
+    
+    model = sentence_transformers.SentenceTransformer(model_name, device="cpu" if backend == "int8" else None)
+    if backend == "int8":
+        torch = require("torch")
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def require(module_name: str):
+    """按需导入重量级依赖
+
+    sentence_transformers会连带导入torch，耗时数秒；作为守护进程的
+    客户端运行时完全不需要它们，所以推迟到真正加载模型/数据库时再导入。
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        print("请先安装依赖: pip install sentence-transformers lancedb")
+        sys.exit(1)
+
+
+def distance_to_score(distance, metric: str = DEFAULT_METRIC):
+    """LanceDB返回的距离转换为相似度分数
+    
+    cosine/dot: LanceDB距离为 1 - 相似度，直接还原为余弦相似度；
+    l2: 旧版换算 1 / (1 + 平方L2距离)，分数被压缩在较窄区间。
+    """
+    if metric == "l2":
+        return 1 / (1 + distance)
+    return 1 - distance
+
+
+def score_to_distance(score: float, metric: str = DEFAULT_METRIC) -> float:
+    """distance_to_score 的反函数，用于把 min_score 下推为距离上限"""
+    if metric == "l2":
+        return 1 / score - 1 if score > 0 else float("inf")
+    return 1 - score
+
+
+def build_where(category=None, since: int = None, until: int = None,
+                min_importance: float = None, where: str = None):
+    """把元数据过滤条件拼成LanceDB的SQL where子句
+    
+    Args:
+        category: 类别或类别列表
+        since/until: created_at 时间窗口（毫秒时间戳，左闭右开）
+        min_importance: 最小重要度
+        where: 额外的原始SQL条件
+    
+    Returns:
+        where子句，无条件时返回None
+    """
+    clauses = []
+    if category:
+        categories = [category] if isinstance(category, str) else list(category)
+        for c in categories:
+            if c not in CATEGORIES:
+                raise ValueError(f"类别无效: {c}")
+        clauses.append("category IN ({})".format(", ".join(f"'{c}'" for c in categories)))
+    if since is not None:
+        clauses.append(f"created_at >= {int(since)}")
+    if until is not None:
+        clauses.append(f"created_at < {int(until)}")
+    if min_importance is not None:
+        clauses.append(f"importance >= {float(min_importance)}")
+    if where:
+        clauses.append(f"({where})")
+    return " AND ".join(clauses) or None
+
+
+def rerank_memories(memories: list, weights: dict = None, now_ms: int = None) -> list:
+    """混合排序：按相似度、重要度、时间衰减和访问频次加权打分
+    
+    recency = 0.5 ^ (距今天数 / half_life_days)，access 按候选中最大访问次数做对数归一化。
+    每条结果增加 rank_score 字段，按其降序返回。
+    """
+    if not memories:
+        return memories
+    weights = {**DEFAULT_RERANK, **(weights or {})}
+    now_ms = int(datetime.now().timestamp() * 1000) if now_ms is None else now_ms
+    
+    # 相关度依次取混合得分、向量相似度、关键词得分
+    similarity = np.array([m.get("hybrid_score", m.get("score", m.get("keyword_score", 0)))
+                           for m in memories], dtype=np.float64)
+    importance = np.array([m["importance"] for m in memories], dtype=np.float64)
+    age_days = np.maximum(now_ms - np.array([m["created_at"] for m in memories]), 0) / 86400000
+    recency = np.power(0.5, age_days / weights["half_life_days"])
+    access = np.log1p([m.get("access_count", 0) for m in memories])
+    if access.max() > 0:
+        access = access / access.max()
+    
+    scores = (weights["similarity"] * similarity + weights["importance"] * importance
+              + weights["recency"] * recency + weights["access"] * access)
+    for memory, score in zip(memories, scores):
+        memory["rank_score"] = float(score)
+    return sorted(memories, key=lambda m: m["rank_score"], reverse=True)
+
+
+def cosine_to_score(cosine, metric: str = DEFAULT_METRIC):
+    """归一化向量的余弦相似度换算为当前度量下的分数（平方L2 = 2 - 2cos）"""
+    if metric == "l2":
+        return distance_to_score(2 - 2 * cosine, metric)
+    return cosine
+
+
 class ChineseMemory:
     def __init__(self):
         self.config = load_config()
         self.db_path = Path(self.config.get("vector_db_path", DEFAULT_DB_PATH)).expanduser()
-        self.model_name = self.config.get("embedding_model", DEFAULT_MODEL)
+        self.model_name = resolve_model_name(self.config.get("embedding_model", DEFAULT_MODEL))
+        self.backend = self.config.get("embedding_backend", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"不支持的推理后端: {self.backend}，可选 {BACKENDS}")
+        # 缓存键包含后端，量化后的向量与原始精度略有差异
+        self.model_key = self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
         self.use_local = self.config.get("use_local_model", True)
         
+        # ANN索引配置
+        self.index_min_rows = self.config.get("index_min_rows", DEFAULT_INDEX_MIN_ROWS)
+        self.reindex_every = self.config.get("reindex_every", DEFAULT_REINDEX_EVERY)
+        self.index_type = self.config.get("index_type", DEFAULT_INDEX_TYPE)
+        self.nprobes = self.config.get("nprobes", DEFAULT_NPROBES)
+        self.refine_factor = self.config.get("refine_factor", DEFAULT_REFINE_FACTOR)
+        self.metric = self.config.get("distance_metric", DEFAULT_METRIC)
+        if self.metric not in METRICS:
+            raise ValueError(f"不支持的距离度量: {self.metric}，可选 {METRICS}")
+        self._index_metric = None
+        # 写入后是否在后台线程维护索引（守护进程开启；关闭时在写入调用末尾同步执行）
+        self.background_index = False
+        self._index_thread = None
+        self._index_lock = threading.Lock()
+        # 是否累计访问次数（守护进程开启；一次性CLI搜索不在退出时写表）
+        self.record_access = False
+        
+        # 当前使用的向量表（迁移模型后指向新版本的表）
+        self.table_pointer_path = self.db_path.parent / "memories_table.json"
+        self.table_name = self.active_table().get("table", TABLE_NAME)
+        self.index_state_path = self.db_path.parent / f"{self.table_name}_index.json"
+        
         # 确保目录存在
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
@@ -46,53 +264,306 @@ class ChineseMemory:
         self._model = None
         self._db = None
         self._table = None
+        self._cache = None
+        self._entities = None
+        self._keywords = None
+        # search() 命中的访问计数，批量写回
+        self.access = AccessTracker(
+            lambda: self.table,
+            interval=self.config.get("access_flush_interval", DEFAULT_FLUSH_INTERVAL),
+            threshold=self.config.get("access_flush_threshold", DEFAULT_FLUSH_THRESHOLD),
+        )
+    
+    @property
+    def cache(self):
+        """懒加载Embedding缓存，配置 embedding_cache=false 时返回None"""
+        if self._cache is None and self.config.get("embedding_cache", True):
+            self._cache = EmbeddingCache(
+                self.db_path.parent / "embedding_cache",
+                capacity=self.config.get("embedding_cache_size", DEFAULT_CACHE_SIZE),
+            )
+        return self._cache
+    
+    @property
+    def entities(self):
+        """懒加载实体倒排索引，配置 entity_index=false 时返回None"""
+        if self._entities is None and self.config.get("entity_index", True):
+            self._entities = EntityIndex(self.db_path.parent / "entity_index.db")
+        return self._entities
+    
+    @property
+    def keywords(self):
+        """懒加载BM25关键词索引，配置 keyword_index=false 时返回None"""
+        if self._keywords is None and self.config.get("keyword_index", True):
+            self._keywords = KeywordIndex(self.db_path.parent / "keyword_index.db")
+        return self._keywords
+    
+    def _index_texts(self, items: list):
+        """新记忆写入实体索引和关键词索引"""
+        if self.entities is not None:
+            self.entities.add_many(items)
+        if self.keywords is not None:
+            self.keywords.add_many(items)
+    
+    def _unindex(self, memory_ids: list):
+        if self.entities is not None:
+            self.entities.remove(memory_ids)
+        if self.keywords is not None:
+            self.keywords.remove(memory_ids)
+    
+    def cache_stats(self) -> dict:
+        """Embedding缓存命中率和节省的编码时间"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def close(self):
+        """写回访问计数，并把缓存写回磁盘"""
+        self.access.close()
+        if self._cache is not None:
+            self._cache.flush()
     
     @property
     def model(self):
         """懒加载Embedding模型"""
         if self._model is None:
-            print(f"正在加载BGE模型: {self.model_name}...")
-            print("首次加载需要下载模型（约1.5GB），请耐心等待...")
-            self._model = SentenceTransformer(self.model_name)
+            print(f"正在加载BGE模型: {self.model_name} ({self.backend})...")
+            print("首次加载需要下载模型（large约1.5GB），请耐心等待...")
+            self._model = load_model(self.model_name, self.backend)
             print("模型加载完成！")
         return self._model
     
+    @property
+    def embedding_dim(self) -> int:
+        """向量维度：配置 embedding_dim > 已知模型维度 > 从模型读取"""
+        dim = self.config.get("embedding_dim") or MODEL_DIMS.get(self.model_name)
+        if dim is None:
+            dim = self.model.get_sentence_embedding_dimension()
+        return dim
+    
     @property
     def db(self):
         """懒加载LanceDB"""
         if self._db is None:
-            self._db = lancedb.connect(str(self.db_path))
+            self._db = require("lancedb").connect(str(self.db_path))
         return self._db
     
+    def active_table(self) -> dict:
+        """当前向量表信息：表名以及生成向量所用的模型"""
+        if self.table_pointer_path.exists():
+            with open(self.table_pointer_path) as f:
+                return json.load(f)
+        return {}
+    
+    def switch_table(self, table_name: str, model_name: str, backend: str, dim: int):
+        """原子地切换到新的向量表（写临时文件后rename）"""
+        self._write_table_pointer(table_name, model_name, backend, dim)
+        self.table_name = table_name
+        self.index_state_path = self.db_path.parent / f"{table_name}_index.json"
+        self._table = None
+        self._index_metric = None
+    
+    def _write_table_pointer(self, table_name: str, model_name: str, backend: str, dim: int):
+        pointer = {
+            "table": table_name,
+            "model": model_name,
+            "backend": backend,
+            "dim": dim,
+            "switched_at": int(datetime.now().timestamp() * 1000),
+        }
+        tmp_path = self.table_pointer_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(pointer, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.table_pointer_path)
+    
     @property
     def table(self):
         """懒加载数据表"""
         if self._table is None:
-            table_name = "memories"
+            table_name = self.table_name
             if table_name in self.db.table_names():
                 self._table = self.db.open_table(table_name)
+                table_dim = self._table.schema.field("vector").type.list_size
+                table_model = self.active_table().get("model")
+                if table_dim != self.embedding_dim or (table_model and table_model != self.model_name):
+                    self._table = None
+                    raise ValueError(
+                        f"向量表 {table_name} 由 {table_model or '旧模型'}（{table_dim}维）生成，"
+                        f"与当前模型 {self.model_name}（{self.embedding_dim}维）不一致，"
+                        f"请运行: python3 memory_admin.py migrate-model")
             else:
                 # 创建新表
-                import pyarrow as pa
-                schema = pa.schema([
-                    ("id", pa.string()),
-                    ("text", pa.string()),
-                    ("vector", pa.list_(pa.float32(), 1024 if "large" in self.model_name else 768)),
-                    ("category", pa.string()),
-                    ("importance", pa.float32()),
-                    ("created_at", pa.int64()),
-                    ("access_count", pa.int32()),
-                ])
-                self._table = self.db.create_table(table_name, schema=schema)
+                self._table = self.db.create_table(table_name, schema=memory_schema(self.embedding_dim))
+                self._write_table_pointer(table_name, self.model_name, self.backend, self.embedding_dim)
         return self._table
     
+    def index_state(self) -> dict:
+        """上次建索引时的状态（行数、耗时、时间）"""
+        if self.index_state_path.exists():
+            with open(self.index_state_path) as f:
+                return json.load(f)
+        return {}
+    
+    def has_index(self) -> bool:
+        """memories表的vector列是否已有ANN索引"""
+        return any("vector" in index.columns for index in self.table.list_indices())
+    
+    def build_index(self) -> dict:
+        """（重新）建立ANN索引
+        
+        IVF分区数取 sqrt(行数)，PQ子向量每16维一个；同时为过滤用到的
+        元数据列建立标量索引。
+        
+        Returns:
+            建索引的行数、索引类型和耗时
+        """
+        rows = self.table.count_rows()
+        dim = self.table.schema.field("vector").type.list_size
+        num_partitions = max(1, int(np.sqrt(rows)))
+        options = {"index_type": self.index_type, "num_partitions": num_partitions}
+        if self.index_type.endswith("PQ") and dim % 16 == 0:
+            options["num_sub_vectors"] = dim // 16
+        
+        print(f"正在建立向量索引: {self.index_type}, {rows} 条记忆...")
+        start = time.perf_counter()
+        self.table.create_index(metric=self.metric, vector_column_name="vector",
+                                replace=True, **options)
+        for column, index_type in SCALAR_INDEXES.items():
+            self.table.create_scalar_index(column, index_type=index_type, replace=True)
+        seconds = time.perf_counter() - start
+        self._index_metric = self.metric
+        
+        state = {
+            "rows": rows,
+            "metric": self.metric,
+            "index_type": self.index_type,
+            "num_partitions": num_partitions,
+            "build_seconds": round(seconds, 3),
+            "built_at": int(datetime.now().timestamp() * 1000),
+        }
+        self._write_index_state(state)
+        return state
+    
+    def optimize_index(self) -> dict:
+        """增量更新索引：把新写入的数据并入已有索引并合并小片段（不重新训练IVF分区）
+        
+        Returns:
+            更新后的索引状态，optimized_rows 为已并入索引的行数
+        """
+        rows = self.table.count_rows()
+        start = time.perf_counter()
+        self.table.optimize()
+        state = {
+            **self.index_state(),
+            "optimized_rows": rows,
+            "optimize_seconds": round(time.perf_counter() - start, 3),
+            "optimized_at": int(datetime.now().timestamp() * 1000),
+        }
+        self._write_index_state(state)
+        return state
+    
+    def _write_index_state(self, state: dict):
+        tmp_path = self.index_state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_state_path)
+    
+    def maybe_index(self):
+        """检查是否需要建立、增量更新或重建索引
+        
+        行数首次达到 index_min_rows（或度量变化）时建索引；之后每新增 reindex_every 条
+        用 table.optimize() 把新数据并入索引，而不是一直留在索引外被暴力扫描；
+        行数比上次建索引时翻倍后重建，使IVF分区数跟上数据规模。
+        
+        Returns:
+            建索引/更新结果，无需处理时返回None
+        """
+        rows = self.table.count_rows()
+        if rows < self.index_min_rows:
+            return None
+        state = self.index_state()
+        if (not state or state.get("metric", "l2") != self.metric or not self.has_index()
+                or rows >= 2 * state.get("rows", 0)):
+            return self.build_index()
+        if rows - state.get("optimized_rows", state["rows"]) >= self.reindex_every:
+            return self.optimize_index()
+        return None
+    
+    def schedule_index(self):
+        """写入后执行 maybe_index
+        
+        background_index 开启时放到后台线程，不阻塞写入调用；关闭时（CLI、进程内调用）同步执行，
+        行数未达阈值时只是一次 count_rows，开销很小。
+        """
+        if not self.background_index:
+            self._run_index()
+            return
+        with self._index_lock:
+            if self._index_thread is not None and self._index_thread.is_alive():
+                return
+            self._index_thread = threading.Thread(target=self._run_index, name="memory-index", daemon=True)
+            self._index_thread.start()
+    
+    def _run_index(self):
+        try:
+            self.maybe_index()
+        except Exception as e:
+            print(f"⚠️ 维护向量索引失败: {e}")
+    
+    def _index_usable(self) -> bool:
+        """索引必须用与查询相同的度量训练，否则结果无效，只能走精确搜索"""
+        if self._index_metric is None:
+            self._index_metric = self.index_state().get("metric", "l2")
+        return self._index_metric == self.metric
+    
     def embed(self, text: str) -> np.ndarray:
-        """生成文本的Embedding向量"""
+        """生成文本的Embedding向量（优先读取缓存）"""
+        cache = self.cache
+        if cache is not None:
+            key = cache.make_key(self.model_key, EMBED_PREFIX, text)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        model = self.model
+        start = time.perf_counter()
         # BGE模型建议添加前缀
-        prefixed_text = f"为这个句子生成表示：{text}"
-        embedding = self.model.encode(prefixed_text, normalize_embeddings=True)
+        prefixed_text = f"{EMBED_PREFIX}{text}"
+        embedding = model.encode(prefixed_text, normalize_embeddings=True)
+        
+        if cache is not None:
+            cache.record_encode(1, time.perf_counter() - start)
+            cache.put(key, embedding)
         return embedding
     
+    def embed_many(self, texts: list, batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """批量生成Embedding向量，返回 (len(texts), dim) 的矩阵
+
+        已缓存的文本直接读取，只把未命中的文本送入模型批量编码。
+        """
+        cache = self.cache
+        cached = [None] * len(texts)
+        keys = []
+        if cache is not None:
+            keys = [cache.make_key(self.model_key, EMBED_PREFIX, text) for text in texts]
+            cached = [cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        
+        if missing:
+            model = self.model
+            start = time.perf_counter()
+            prefixed_texts = [f"{EMBED_PREFIX}{texts[i]}" for i in missing]
+            encoded = model.encode(prefixed_texts, batch_size=batch_size,
+                                   normalize_embeddings=True)
+            if cache is not None:
+                cache.record_encode(len(missing), time.perf_counter() - start)
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+                if cache is not None:
+                    cache.put(keys[i], vector)
+        
+        return np.asarray(cached, dtype=np.float32)
+    
     def store(self, text: str, category: str = "other", importance: float = 0.7) -> dict:
         """存储记忆
         
@@ -126,57 +597,343 @@ class ChineseMemory:
         
         # 存储到LanceDB
         self.table.add([record])
+        self._index_texts([(record["id"], text)])
+        self.schedule_index()
         
         return {"status": "success", "id": record["id"], "text": text}
     
-    def _check_duplicate(self, vector: np.ndarray, text: str, threshold: float = 0.95) -> bool:
-        """检查是否存在相似记忆"""
-        try:
-            results = self.search(vector, limit=1)
-            if results and results[0]["score"] > threshold:
-                return True
-        except Exception:
-            pass
-        return False
-    
-    def search(self, query, limit: int = 5, min_score: float = 0.5) -> list:
+    def store_many(self, texts: list, categories=None, importances=None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> list:
+        """批量存储记忆
+        
+        一次批量编码、一次分块扫描去重、一次 table.add 写入。
+        
+        Args:
+            texts: 要存储的文本列表
+            categories: 类别列表（与texts等长），None表示全部为"other"
+            importances: 重要程度列表（与texts等长），None表示全部为0.7
+            batch_size: 模型编码的批大小
+        
+        Returns:
+            与texts一一对应的存储结果列表
+        """
+        import uuid
+        
+        texts = list(texts)
+        if not texts:
+            return []
+        categories = list(categories) if categories is not None else ["other"] * len(texts)
+        importances = list(importances) if importances is not None else [0.7] * len(texts)
+        if not (len(categories) == len(importances) == len(texts)):
+            raise ValueError("texts、categories、importances 长度必须一致")
+        
+        vectors = self.embed_many(texts, batch_size=batch_size)
+        duplicates = self._find_duplicates(vectors)
+        
+        now = int(datetime.now().timestamp() * 1000)
+        records = []
+        results = []
+        for i, text in enumerate(texts):
+            if duplicates[i]:
+                results.append({"status": "duplicate", "message": "相似记忆已存在", "text": text})
+                continue
+            record = {
+                "id": str(uuid.uuid4()),
+                "text": text,
+                "vector": vectors[i].tolist(),
+                "category": categories[i],
+                "importance": float(importances[i]),
+                "created_at": now,
+                "access_count": 0,
+            }
+            records.append(record)
+            results.append({"status": "success", "id": record["id"], "text": text})
+        
+        # 所有新记录一次写入，只产生一个LanceDB片段
+        if records:
+            self.table.add(records)
+            self._index_texts([(r["id"], r["text"]) for r in records])
+            self.schedule_index()
+        
+        return results
+    
+    def _find_duplicates(self, vectors: np.ndarray, threshold: float = DUPLICATE_THRESHOLD) -> np.ndarray:
+        """批量检查重复，返回布尔掩码
+        
+        同一批次内部以及与库中已有记忆都做比对。向量已归一化，点积即余弦相似度，
+        直接与余弦阈值比较。库中向量逐块读取，不在进程中常驻。
+        """
+        # 与库中已有记忆比对：逐块读取向量做矩阵乘法
+        best = np.full(len(vectors), -1.0, dtype=np.float32)
+        for block, _ in iter_vectors(self.table):
+            best = np.maximum(best, max_similarity(vectors, block))
+        duplicates = best > threshold
+        
+        # 批次内部比对：只与排在前面且未被判重的记录比较
+        sims = vectors @ vectors.T
+        for i in range(1, len(vectors)):
+            if duplicates[i]:
+                continue
+            earlier = sims[i, :i][~duplicates[:i]]
+            if earlier.size and earlier.max() > threshold:
+                duplicates[i] = True
+        return duplicates
+    
+    def delete(self, memory_id: str) -> dict:
+        """按ID删除记忆"""
+        escaped = memory_id.replace("'", "''")
+        self.table.delete(f"id = '{escaped}'")
+        self._unindex([memory_id])
+        return {"status": "success", "id": memory_id}
+    
+    def delete_many(self, memory_ids: list, chunk_size: int = 500) -> int:
+        """批量删除记忆，返回删除的条数"""
+        memory_ids = list(memory_ids)
+        for start in range(0, len(memory_ids), chunk_size):
+            chunk = memory_ids[start:start + chunk_size]
+            id_list = ", ".join("'{}'".format(i.replace("'", "''")) for i in chunk)
+            self.table.delete(f"id IN ({id_list})")
+        self._unindex(memory_ids)
+        return len(memory_ids)
+    
+    def _check_duplicate(self, vector: np.ndarray, text: str,
+                         threshold: float = DUPLICATE_THRESHOLD) -> bool:
+        """检查是否存在相似记忆：一次最近邻查询（有ANN索引时走索引），不读全表
+        
+        threshold 为余弦相似度，按当前度量换算为分数后比较。
+        """
+        memories, _ = self._vector_search(vector, 1, None, None, None, None)
+        return bool(memories) and memories[0]["score"] > cosine_to_score(threshold, self.metric)
+    
+    def search(self, query, limit: int = 5, min_score: float = 0.5,
+               nprobes: int = None, refine_factor: int = None,
+               category=None, since: int = None, until: int = None,
+               min_importance: float = None, where: str = None, rerank=False,
+               expand_entities: bool = False, mode: str = "vector",
+               track_access: bool = True) -> list:
         """搜索相关记忆
         
         Args:
             query: 查询文本或向量
             limit: 返回结果数量
-            min_score: 最小相似度阈值
+            min_score: 最小相似度阈值（精确搜索时在LanceDB内按距离上限过滤）
+            nprobes: 查询的IVF分区数（默认取配置），越大召回越高、越慢
+            refine_factor: 取 limit*refine_factor 个候选用原始向量重排（0表示不重排）
+            category: 只搜索该类别（或类别列表）
+            since/until: created_at 时间窗口（毫秒时间戳）
+            min_importance: 最小重要度
+            where: 额外的SQL过滤条件，与以上条件取AND
+            rerank: True按配置权重混合排序，也可传入权重dict覆盖部分权重
+            expand_entities: 同时返回提到查询中实体的记忆（经实体索引查找，不受min_score限制）
+            mode: vector 语义检索；keyword 只用BM25关键词索引（不加载模型，min_score不生效）；
+                  hybrid 向量与关键词候选合并，按 hybrid_alpha 加权的混合得分排序
+            track_access: 是否为返回的记忆累计访问次数（内部查询可关闭；record_access 关闭时不生效）
+        
+        过滤条件在向量检索之前于LanceDB内执行（预过滤）。
         
         Returns:
             相关记忆列表
         """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"不支持的检索方式: {mode}，可选 {SEARCH_MODES}")
+        if mode != "vector" and not isinstance(query, str):
+            raise ValueError(f"{mode} 检索需要文本查询")
+        if mode != "vector" and self.keywords is None:
+            raise RuntimeError("关键词索引未启用（配置 keyword_index=false）")
+        where_clause = build_where(category, since, until, min_importance, where)
+        fetch = limit * RERANK_OVERSAMPLE if rerank or mode == "hybrid" else limit
+        
+        if mode == "keyword":
+            memories = self._keyword_search(query, fetch, where_clause)
+        else:
+            memories, query_vector = self._vector_search(query, fetch, min_score, nprobes,
+                                                         refine_factor, where_clause)
+            if expand_entities and isinstance(query, str) and self.entities is not None:
+                memories = self._expand_entities(query, query_vector, memories, fetch, where_clause)
+            if mode == "hybrid":
+                memories = self._hybrid_merge(query, query_vector, memories, fetch, where_clause)
+        
+        if rerank:
+            weights = {**self.config.get("rerank", {}), **(rerank if isinstance(rerank, dict) else {})}
+            memories = rerank_memories(memories, weights)
+        memories = memories[:limit]
+        if track_access and self.record_access:
+            self.access.record(m["id"] for m in memories)
+        return memories
+    
+    def _vector_search(self, query, fetch: int, min_score: float, nprobes: int,
+                       refine_factor: int, where_clause: str) -> tuple:
+        """向量检索，返回 (记忆列表, 查询向量)"""
         # 如果是文本，先转换为向量
         if isinstance(query, str):
             query_vector = self.embed(query)
         else:
             query_vector = query
         
-        # 执行向量搜索
-        results = self.table.search(query_vector).limit(limit).to_list()
+        # 执行向量搜索（表未建索引时nprobes/refine_factor不生效，退化为精确搜索）
+        nprobes = self.nprobes if nprobes is None else nprobes
+        refine_factor = self.refine_factor if refine_factor is None else refine_factor
+        builder = (self.table.search(query_vector)
+                   .distance_type(self.metric)
+                   .limit(fetch)
+                   .nprobes(nprobes))
+        if where_clause:
+            builder = builder.where(where_clause, prefilter=True)
+        use_index = self._index_usable()
+        if not use_index:
+            builder = builder.bypass_vector_index()
+        if refine_factor:
+            builder = builder.refine_factor(refine_factor)
+        if min_score is not None and min_score > 0 and not use_index:
+            # 精确搜索时在LanceDB内按距离上限过滤（区间左闭右开，加一点余量）；
+            # 走ANN索引时过滤会作用在PQ近似距离上而误删结果，改为重排后再过滤
+            builder = builder.distance_range(
+                upper_bound=score_to_distance(min_score, self.metric) + 1e-6)
+        results = builder.to_list()
         
-        # 过滤和格式化结果
+        # 格式化结果
         memories = []
         for r in results:
-            score = r.get("_distance", 0)
-            # LanceDB使用L2距离，转换为相似度分数 (0-1)
-            similarity = 1 / (1 + score)
-            
-            if similarity >= min_score:
-                memories.append({
-                    "id": r["id"],
-                    "text": r["text"],
-                    "category": r["category"],
-                    "importance": r["importance"],
-                    "score": similarity,
-                    "created_at": r["created_at"],
-                })
-        
+            similarity = distance_to_score(r.get("_distance", 0), self.metric)
+            if min_score is None or similarity >= min_score:
+                memories.append(self._format_memory(r, similarity))
+        return memories, query_vector
+    
+    def _keyword_search(self, query: str, fetch: int, where_clause: str = None) -> list:
+        """BM25关键词检索，keyword_score 按本次最高分归一化到 0-1"""
+        hits = self.keywords.search(query, limit=fetch)
+        if not hits:
+            return []
+        top = max(score for _, score in hits) or 1.0
+        scores = {memory_id: score / top for memory_id, score in hits}
+        memories = [self._format_memory(r) for r in self._fetch_by_ids(list(scores), where_clause)]
+        for memory in memories:
+            memory["keyword_score"] = round(scores[memory["id"]], 4)
+        memories.sort(key=lambda m: m["keyword_score"], reverse=True)
         return memories
+    
+    def _hybrid_merge(self, query: str, query_vector, memories: list,
+                      fetch: int, where_clause: str = None) -> list:
+        """合并向量候选与BM25候选
+        
+        hybrid_score = alpha * 向量相似度 + (1 - alpha) * 归一化BM25得分；
+        只被关键词命中的记忆用其向量补算相似度（不受min_score限制）。
+        """
+        alpha = self.config.get("hybrid_alpha", DEFAULT_HYBRID_ALPHA)
+        hits = self.keywords.search(query, limit=fetch)
+        top = max((score for _, score in hits), default=0) or 1.0
+        keyword_scores = {memory_id: score / top for memory_id, score in hits}
+        
+        by_id = {m["id"]: m for m in memories}
+        missing = [memory_id for memory_id in keyword_scores if memory_id not in by_id]
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        for row in self._fetch_by_ids(missing, where_clause, with_vector=True):
+            cosine = float(np.dot(np.asarray(row["vector"], dtype=np.float32), query_vector))
+            by_id[row["id"]] = self._format_memory(row, cosine_to_score(cosine, self.metric))
+        
+        for memory_id, memory in by_id.items():
+            keyword = keyword_scores.get(memory_id, 0.0)
+            memory["keyword_score"] = round(keyword, 4)
+            memory["hybrid_score"] = alpha * memory["score"] + (1 - alpha) * keyword
+        return sorted(by_id.values(), key=lambda m: m["hybrid_score"], reverse=True)[:fetch]
+    
+    def _format_memory(self, row: dict, score: float = None) -> dict:
+        memory = {
+            "id": row["id"],
+            "text": row["text"],
+            "category": row["category"],
+            "importance": row["importance"],
+            "created_at": row["created_at"],
+            # 加上尚未写回的计数
+            "access_count": row.get("access_count", 0) + self.access.pending(row["id"]),
+        }
+        if score is not None:
+            memory["score"] = score
+        return memory
+    
+    def _fetch_by_ids(self, memory_ids: list, where: str = None, with_vector: bool = False) -> list:
+        """按ID读取记忆行（id列有标量索引时走索引）"""
+        if not memory_ids:
+            return []
+        id_list = ", ".join("'{}'".format(i.replace("'", "''")) for i in memory_ids)
+        condition = f"id IN ({id_list})" + (f" AND ({where})" if where else "")
+        columns = MEMORY_COLUMNS + (["vector"] if with_vector else [])
+        return (self.table.search().where(condition).select(columns)
+                .limit(len(memory_ids)).to_list())
+    
+    def _expand_entities(self, query: str, query_vector, memories: list,
+                         fetch: int, where_clause: str = None) -> list:
+        """把提到查询实体的记忆并入向量检索结果，按与查询的相似度排序"""
+        entities = self.entities.entities_in(query)
+        seen = {m["id"] for m in memories}
+        ids = []
+        for entity in entities:
+            for memory_id in self.entities.memory_ids(entity, limit=fetch):
+                if memory_id not in seen:
+                    seen.add(memory_id)
+                    ids.append(memory_id)
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        for row in self._fetch_by_ids(ids, where_clause, with_vector=True):
+            cosine = float(np.dot(np.asarray(row["vector"], dtype=np.float32), query_vector))
+            memory = self._format_memory(row, cosine_to_score(cosine, self.metric))
+            memory["entities"] = [e for e in entities if e in row["text"]]
+            memories.append(memory)
+        memories.sort(key=lambda m: m["score"], reverse=True)
+        return memories[:fetch]
+    
+    def memories_about(self, entity: str, limit: int = 20) -> list:
+        """提到某个实体的全部记忆（实体索引查找，不加载模型），按重要度和时间排序"""
+        if self.entities is None:
+            raise RuntimeError("实体索引未启用（配置 entity_index=false）")
+        rows = self._fetch_by_ids(self.entities.memory_ids(entity))
+        memories = [self._format_memory(r) for r in rows]
+        memories.sort(key=lambda m: (m["importance"], m["created_at"]), reverse=True)
+        return memories[:limit]
+
+
+def read_jsonl_memories(path: str, default_category: str = "other",
+                        default_importance: float = 0.7):
+    """读取JSONL格式的记忆列表
+    
+    每行可以是 {"text": ..., "category": ..., "importance": ...}，
+    也可以是纯JSON字符串；空行会被跳过。
+    
+    Returns:
+        (texts, categories, importances)
+    
+    Raises:
+        ValueError: 某一行格式错误，消息以 "文件:行号:" 开头
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    name = "<stdin>" if path == "-" else path
+    texts, categories, importances = [], [], []
+    try:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{name}:{line_no}: JSON格式错误: {e.msg}")
+            if isinstance(item, str):
+                item = {"text": item}
+            if not isinstance(item, dict) or not item.get("text"):
+                raise ValueError(f"{name}:{line_no}: 缺少 text 字段")
+            category = item.get("category", default_category)
+            if category not in CATEGORIES:
+                raise ValueError(f"{name}:{line_no}: 类别无效: {category}，可选 {CATEGORIES}")
+            try:
+                importance = float(item.get("importance", default_importance))
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}:{line_no}: 重要程度无效: {item.get('importance')}")
+            texts.append(item["text"])
+            categories.append(category)
+            importances.append(importance)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return texts, categories, importances
 
 
 def main():
@@ -184,15 +941,49 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="存储向量记忆")
-    parser.add_argument("text", help="要存储的文本")
+    parser.add_argument("text", nargs="?", help="要存储的文本")
     parser.add_argument("--category", default="other", 
-                       choices=["preference", "fact", "decision", "entity", "other"],
+                       choices=CATEGORIES,
                        help="记忆类别")
     parser.add_argument("--importance", type=float, default=0.7, help="重要程度0-1")
+    parser.add_argument("--from-file", metavar="PATH",
+                       help="从JSONL文件批量导入（- 表示标准输入），每行 {\"text\", \"category\", \"importance\"}")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="批量编码大小")
+    parser.add_argument("--delete", metavar="ID", help="按ID删除记忆")
+    parser.add_argument("--local", action="store_true", help="不连接守护进程，直接在本进程加载模型")
     
     args = parser.parse_args()
     
-    memory = ChineseMemory()
+    from memory_client import open_memory
+    
+    if args.delete:
+        memory = open_memory(local=args.local)
+        print(json.dumps(memory.delete(args.delete), ensure_ascii=False, indent=2))
+        return
+    
+    if args.from_file:
+        try:
+            texts, categories, importances = read_jsonl_memories(
+                args.from_file, args.category, args.importance)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            parser.error(str(e))
+        memory = open_memory(local=args.local)
+        results = memory.store_many(texts, categories, importances, batch_size=args.batch_size)
+        stored = sum(1 for r in results if r["status"] == "success")
+        print(json.dumps({
+            "status": "success",
+            "total": len(results),
+            "stored": stored,
+            "duplicates": len(results) - stored,
+            "cache": memory.cache_stats(),
+            "results": results,
+        }, ensure_ascii=False, indent=2))
+        return
+    
+    if not args.text:
+        parser.error("请提供要存储的文本，或使用 --from-file 批量导入")
+    
+    memory = open_memory(local=args.local)
     result = memory.store(args.text, args.category, args.importance)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+飞书API限流
+令牌桶控制请求节奏，并根据服务端返回的限流响应头暂停发送
+"""
+
+import time
+import threading
+
+# 飞书网关限流响应头
+HEADER_LIMIT = "x-ogw-ratelimit-limit"     # 接口频率上限（次/秒）
+HEADER_RESET = "x-ogw-ratelimit-reset"     # 距限流窗口重置的秒数
+
+DEFAULT_RATE = 5.0      # 次/秒
+DEFAULT_BURST = 5
+
+
+class TokenBucket:
+    """线程安全的令牌桶
+
+    acquire() 取不到令牌时阻塞等待；observe() 读取响应头，
+    被限流（429）时清空令牌并暂停到服务端给出的重置时间。
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """取一个令牌，必要时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """暂停发送若干秒，并清空已积累的令牌"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+    def observe(self, resp, rate_limited: bool = None):
+        """根据响应调整节奏
+
+        Args:
+            resp: requests.Response
+            rate_limited: 业务错误码表明被限流时传True（HTTP状态仍为200的情况）
+        """
+        limit = resp.headers.get(HEADER_LIMIT)
+        if limit:
+            try:
+                with self._lock:
+                    self.rate = min(self.rate, float(limit))
+            except ValueError:
+                pass
+        if rate_limited is None:
+            rate_limited = resp.status_code == 429
+        if rate_limited:
+            reset = resp.headers.get(HEADER_RESET) or resp.headers.get("Retry-After")
+            try:
+                seconds = float(reset)
+            except (TypeError, ValueError):
+                seconds = 1.0
+            self.pause(max(seconds, 0.1))
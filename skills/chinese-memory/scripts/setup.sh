@@ -24,10 +24,10 @@ echo "   Python版本: $python_version"
 # 2. 安装Python依赖
 echo ""
 echo "[2/5] 安装Python依赖..."
-echo "   安装: sentence-transformers lancedb pyarrow requests"
-pip install -q sentence-transformers lancedb pyarrow requests numpy || {
+echo "   安装: sentence-transformers lancedb pyarrow requests jieba"
+pip install -q sentence-transformers lancedb pyarrow requests numpy jieba || {
     echo -e "${RED}❌ 依赖安装失败${NC}"
-    echo "   请手动运行: pip install sentence-transformers lancedb pyarrow requests numpy"
+    echo "   请手动运行: pip install sentence-transformers lancedb pyarrow requests numpy jieba"
     exit 1
 }
 echo -e "${GREEN}✅ 依赖安装完成${NC}"
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+三元组存储后端
+- BitableTripleStore: 飞书Bitable（每次查询一次HTTP请求，批量写入走 batch_create）
+- SQLiteTripleStore: 本地SQLite（WAL模式，SPO/POS/OSP三组索引，离线可用）
+两者接口一致，由 knowledge_graph.py 按配置选择
+"""
+
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Iterable
+
+import requests
+
+from rate_limit import TokenBucket
+from feishu_client import FeishuClient
+
+# batch_create 单次最多500条
+BATCH_CREATE_LIMIT = 500
+# search 接口单页最多500条
+MAX_PAGE_SIZE = 500
+# 批量写入失败块的最大重试次数
+DEFAULT_MAX_RETRIES = 3
+# 表示被限流的业务错误码（HTTP状态可能仍是200）
+RATE_LIMIT_CODES = {1254290, 99991400}
+
+# Bitable字段名
+FIELD_SUBJECT = "主语(Subject)"
+FIELD_PREDICATE = "谓语(Predicate)"
+FIELD_OBJECT = "宾语(Object)"
+FIELD_CONFIDENCE = "置信度(Confidence)"
+FIELD_SOURCE = "来源(Source)"
+FIELD_CREATED = "创建时间"
+# 上传时间：写入请求发出时填写，记录何时进入Bitable（与三元组本身的创建时间无关），作为增量拉取的水位线；
+# 只有 sync 后端写入该字段（需先 init_bitable.py --upgrade），bitable 后端不依赖它
+FIELD_UPLOADED = "上传时间"
+
+
+def now_ms() -> int:
+    return int(datetime.now().timestamp() * 1000)
+
+
+def format_record(item: dict) -> Dict:
+    """Bitable记录转换为三元组字典"""
+    fields = item.get("fields", {})
+    return {
+        "record_id": item["record_id"],
+        "subject": fields.get(FIELD_SUBJECT, ""),
+        "predicate": fields.get(FIELD_PREDICATE, ""),
+        "object": fields.get(FIELD_OBJECT, ""),
+        "confidence": fields.get(FIELD_CONFIDENCE, 1.0),
+        "source": fields.get(FIELD_SOURCE, ""),
+        "created_at": fields.get(FIELD_CREATED, 0),
+        # 旧记录没有上传时间，按创建时间计
+        "uploaded_at": fields.get(FIELD_UPLOADED) or fields.get(FIELD_CREATED, 0),
+    }
+
+
+def triple_fields(subject: str, predicate: str, obj: str,
+                  confidence: float = 1.0, source: str = "", created_at: int = None,
+                  uploaded_at: int = None) -> dict:
+    """三元组转换为Bitable字段（uploaded_at 为None时不写上传时间）"""
+    fields = {
+        FIELD_SUBJECT: subject,
+        FIELD_PREDICATE: predicate,
+        FIELD_OBJECT: obj,
+        FIELD_CONFIDENCE: confidence,
+        FIELD_SOURCE: source,
+        FIELD_CREATED: created_at if created_at is not None else now_ms(),
+    }
+    if uploaded_at is not None:
+        fields[FIELD_UPLOADED] = uploaded_at
+    return fields
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """把任意可迭代对象切成固定大小的列表，不一次性读入内存"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BitableError(Exception):
+    """Bitable返回非0业务错误码"""
+
+    def __init__(self, code: int, msg: str):
+        super().__init__(f"[{code}] {msg}")
+        self.code = code
+        self.retryable = code in RATE_LIMIT_CODES
+
+
+def response_body(resp) -> Dict:
+    """解析响应JSON（非JSON时返回空字典）"""
+    try:
+        return resp.json()
+    except ValueError:
+        return {}
+
+
+def check_response(resp, body: Dict) -> Dict:
+    """业务错误码非0时抛出 BitableError（HTTP状态可能仍是200），再检查HTTP状态"""
+    code = body.get("code", 0)
+    if code:
+        raise BitableError(code, body.get("msg", ""))
+    resp.raise_for_status()
+    return body
+
+
+def is_retryable(error: Exception) -> bool:
+    """网络错误、限流和5xx可以重试，其余错误（参数、权限）重试也不会成功"""
+    if isinstance(error, BitableError):
+        return error.retryable
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class BitableTripleStore:
+    """飞书Bitable三元组存储"""
+
+    name = "bitable"
+
+    def __init__(self, app_token: str, table_id: str, client: FeishuClient,
+                 rate_limiter: TokenBucket = None):
+        self.app_token = app_token
+        self.table_id = table_id
+        self.client = client
+        self.rate_limiter = rate_limiter or TokenBucket()
+        # 是否写入 上传时间 字段（由 SyncedTripleStore 打开）
+        self.stamp_upload = False
+
+    def _uploaded_at(self):
+        return now_ms() if self.stamp_upload else None
+
+    @property
+    def records_url(self) -> str:
+        return f"/bitable/v1/apps/{self.app_token}/tables/{self.table_id}/records"
+
+    def store_triple(self, subject: str, predicate: str, obj: str,
+                     confidence: float = 1.0, source: str = "") -> Dict:
+        record = {"fields": triple_fields(subject, predicate, obj, confidence, source,
+                                          uploaded_at=self._uploaded_at())}
+        resp = self.client.post(self.records_url, json=record)
+        body = check_response(resp, response_body(resp))
+        return format_record(body["data"]["record"])
+
+    def batch_create(self, triples: List[Dict], client_token: str = None) -> List[Dict]:
+        """一次请求写入多条三元组（最多 BATCH_CREATE_LIMIT 条），返回顺序与输入一致
+
+        client_token（uuid4）是幂等键：响应丢失后用同一个 client_token 重发，飞书不会重复创建记录
+        """
+        uploaded_at = self._uploaded_at()
+        records = [{"fields": triple_fields(t["subject"], t["predicate"], t["object"],
+                                            t.get("confidence", 1.0), t.get("source", ""),
+                                            t.get("created_at"), uploaded_at)}
+                   for t in triples]
+        self.rate_limiter.acquire()
+        params = {"client_token": client_token} if client_token else None
+        resp = self.client.post(f"{self.records_url}/batch_create", params=params, json={"records": records})
+        body = response_body(resp)
+        self.rate_limiter.observe(resp, rate_limited=resp.status_code == 429
+                                  or body.get("code") in RATE_LIMIT_CODES)
+        check_response(resp, body)
+        return [format_record(item) for item in body["data"]["records"]]
+
+    def store_triples(self, triples: Iterable[Dict], chunk_size: int = BATCH_CREATE_LIMIT,
+                      max_retries: int = DEFAULT_MAX_RETRIES, on_chunk=None) -> Dict:
+        """批量写入三元组
+
+        按 chunk_size 分块调用 batch_create，令牌桶控制请求节奏；
+        某一块失败时只重试这一块，已成功的块不会重复写入。
+
+        Args:
+            triples: 三元组字典的可迭代对象（subject/predicate/object[/confidence/source]）
+            on_chunk: 每块结束后回调 on_chunk(已写入条数, 失败条数)
+
+        Returns:
+            {"stored": 写入条数, "failed": [{"triples": [...], "error": "..."}]}
+        """
+        chunk_size = min(chunk_size, BATCH_CREATE_LIMIT)
+        stored, failed = 0, []
+        for chunk in chunked(triples, chunk_size):
+            # 同一块的重试共用一个幂等键
+            client_token = str(uuid.uuid4())
+            for attempt in range(max_retries + 1):
+                try:
+                    stored += len(self.batch_create(chunk, client_token))
+                    break
+                except (requests.RequestException, BitableError) as e:
+                    if not is_retryable(e) or attempt == max_retries:
+                        failed.append({"triples": chunk, "error": str(e)})
+                        break
+                    # 限流的等待由令牌桶处理，这里只对网络错误和5xx退避
+                    if not isinstance(e, BitableError):
+                        time.sleep(min(2 ** attempt, 30))
+            if on_chunk:
+                on_chunk(stored, sum(len(f["triples"]) for f in failed))
+        return {"stored": stored, "failed": failed}
+
+    def search_page(self, conditions: List[Dict] = None, page_size: int = 100,
+                    page_token: str = None, sort: List[Dict] = None) -> tuple:
+        """请求一页记录
+
+        业务错误（HTTP 200 但 code 非0）抛出 BitableError，不会当作空的最后一页返回。
+
+        Returns:
+            (三元组列表, has_more, 下一页page_token)
+        """
+        data = {
+            "filter": {"conjunction": "and", "conditions": conditions} if conditions else None,
+            # 飞书要求 page_size 在 1..MAX_PAGE_SIZE 之间
+            "page_size": max(1, min(page_size, MAX_PAGE_SIZE)),
+        }
+        if sort:
+            data["sort"] = sort
+        params = {"page_token": page_token} if page_token else None
+        resp = self.client.post(f"{self.records_url}/search", params=params, json=data)
+        body = check_response(resp, response_body(resp)).get("data") or {}
+        items = [format_record(item) for item in body.get("items") or []]
+        return items, bool(body.get("has_more")), body.get("page_token")
+
+    def iter_pages(self, conditions: List[Dict] = None, page_size: int = MAX_PAGE_SIZE,
+                   sort: List[Dict] = None, prefetch: bool = True) -> Iterator[List[Dict]]:
+        """逐页返回记录，沿 has_more/page_token 翻到最后一页
+
+        prefetch 为True时，调用方处理当前页的同时后台线程已在请求下一页；
+        生成器被提前关闭时不再发起新请求。
+        """
+        if not prefetch:
+            page_token = None
+            while True:
+                items, has_more, page_token = self.search_page(conditions, page_size, page_token, sort)
+                yield items
+                if not has_more or not page_token:
+                    return
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bitable-prefetch")
+        try:
+            future = executor.submit(self.search_page, conditions, page_size, None, sort)
+            while future is not None:
+                items, has_more, page_token = future.result()
+                future = None
+                if has_more and page_token:
+                    future = executor.submit(self.search_page, conditions, page_size, page_token, sort)
+                yield items
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_query(self, subject: str = None, predicate: str = None, obj: str = None,
+                   page_size: int = MAX_PAGE_SIZE, prefetch: bool = True) -> Iterator[Dict]:
+        """流式返回全部匹配的三元组，按需翻页"""
+        # 构建过滤条件
+        filters = []
+        if subject:
+            filters.append({"field_name": FIELD_SUBJECT, "operator": "is", "value": [subject]})
+        if predicate:
+            filters.append({"field_name": FIELD_PREDICATE, "operator": "is", "value": [predicate]})
+        if obj:
+            filters.append({"field_name": FIELD_OBJECT, "operator": "is", "value": [obj]})
+
+        for items in self.iter_pages(filters, page_size=page_size, prefetch=prefetch):
+            yield from items
+
+    def query(self, subject: str = None, predicate: str = None,
+              obj: str = None, limit: int = 100) -> List[Dict]:
+        if limit <= 0:
+            return []
+        # 超过一页时继续翻页，直到凑满limit条；不预取，避免多请求一页
+        results = self.iter_query(subject, predicate, obj,
+                                  page_size=min(limit, MAX_PAGE_SIZE), prefetch=False)
+        return list(islice(results, limit))
+
+    def scan(self) -> Iterator[Dict]:
+        """逐页读出全部三元组"""
+        return self.iter_query()
+
+
+class SQLiteTripleStore:
+    """本地SQLite三元组存储
+
+    三组复合索引覆盖所有查询模式：
+    SPO (subject, predicate, object) —— 已知主语
+    POS (predicate, object, subject) —— 已知谓语
+    OSP (object, subject, predicate) —— 已知宾语（反向查询）
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS triples (
+        record_id  TEXT PRIMARY KEY,
+        subject    TEXT NOT NULL,
+        predicate  TEXT NOT NULL,
+        object     TEXT NOT NULL,
+        confidence REAL NOT NULL DEFAULT 1.0,
+        source     TEXT NOT NULL DEFAULT '',
+        created_at INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_spo ON triples (subject, predicate, object);
+    CREATE INDEX IF NOT EXISTS idx_pos ON triples (predicate, object, subject);
+    CREATE INDEX IF NOT EXISTS idx_osp ON triples (object, subject, predicate);
+    """
+
+    COLUMNS = ("record_id", "subject", "predicate", "object", "confidence", "source", "created_at")
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（sqlite3连接不能跨线程共享）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.row_factory = sqlite3.Row
+            # WAL模式：读写互不阻塞；NORMAL同步在WAL下仍保证一致性
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def store_triple(self, subject: str, predicate: str, obj: str,
+                     confidence: float = 1.0, source: str = "", record_id: str = None,
+                     created_at: int = None) -> Dict:
+        triple = {
+            "record_id": record_id or f"local_{uuid.uuid4().hex}",
+            "subject": subject,
+            "predicate": predicate,
+            "object": obj,
+            "confidence": confidence,
+            "source": source,
+            "created_at": created_at if created_at is not None else now_ms(),
+        }
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO triples VALUES (?, ?, ?, ?, ?, ?, ?)",
+                tuple(triple[c] for c in self.COLUMNS))
+        return triple
+
+    def _select(self, subject: str = None, predicate: str = None, obj: str = None,
+                limit: int = None) -> sqlite3.Cursor:
+        conditions, params = [], []
+        for column, value in (("subject", subject), ("predicate", predicate), ("object", obj)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT * FROM triples"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params)
+
+    def query(self, subject: str = None, predicate: str = None,
+              obj: str = None, limit: int = 100) -> List[Dict]:
+        return [dict(row) for row in self._select(subject, predicate, obj, limit)]
+
+    def iter_query(self, subject: str = None, predicate: str = None, obj: str = None,
+                   **_) -> Iterator[Dict]:
+        """流式返回全部匹配的三元组（游标逐行读取）"""
+        for row in self._select(subject, predicate, obj):
+            yield dict(row)
+
+    def scan(self) -> Iterator[Dict]:
+        """读出全部三元组"""
+        return self.iter_query()
+
+    def store_triples(self, triples: Iterable[Dict], chunk_size: int = BATCH_CREATE_LIMIT,
+                      on_chunk=None) -> Dict:
+        """批量写入三元组，每块一个事务"""
+        stored = 0
+        for chunk in chunked(triples, chunk_size):
+            now = now_ms()
+            stored += self.upsert_many([dict(t, record_id=f"local_{uuid.uuid4().hex}",
+                                             created_at=t.get("created_at") or now)
+                                        for t in chunk])
+            if on_chunk:
+                on_chunk(stored, 0)
+        return {"stored": stored, "failed": []}
+
+    def upsert_many(self, triples: List[Dict]) -> int:
+        """按record_id批量写入（已存在则覆盖），一个事务完成"""
+        rows = [(t["record_id"], t["subject"], t["predicate"], t["object"],
+                 t.get("confidence", 1.0), t.get("source", ""), t.get("created_at", 0))
+                for t in triples]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO triples VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def delete(self, record_id: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM triples WHERE record_id = ?", (record_id,))
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
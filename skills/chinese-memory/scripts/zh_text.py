@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+中文分词与实体匹配
+安装了 jieba 时用 jieba 分词；未安装时退回到规则切分（英文/数字串整体保留，中文短段整体保留、长段切成二元组），
+实体索引、关键词索引、Markdown全文索引共用
+"""
+
+import re
+
+try:
+    import jieba
+    jieba.setLogLevel(60)
+except ImportError:
+    jieba = None
+
+# 实体名最长字数（在文本中做子串匹配时的上限）
+MAX_ENTITY_LENGTH = 20
+# 未安装jieba时，不超过该长度的中文连续段整体作为候选实体，更长的段切成二元组
+MAX_CJK_RUN_ENTITY = 4
+
+# 英文单词、邮箱、产品编号（ABC-123、v1.5）等作为整体
+ASCII_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.@+\-]*[A-Za-z0-9]|[A-Za-z0-9]")
+CJK_RUN = re.compile(r"[一-鿿]+")
+WORD = re.compile(r"[\w一-鿿]", re.UNICODE)
+
+# 不作为实体的常见词
+STOPWORDS = frozenset("""
+我们 你们 他们 她们 它们 自己 什么 怎么 为什么 哪里 哪个 这个 那个 这些 那些 一个 一些
+没有 不是 就是 还是 可以 已经 因为 所以 但是 如果 虽然 或者 而且 然后 现在 今天 昨天 明天
+时候 之前 之后 以后 以前 非常 特别 比较 应该 需要 觉得 知道 喜欢 希望 问题 事情 东西
+""".split())
+
+
+def has_jieba() -> bool:
+    return jieba is not None
+
+
+def add_words(words):
+    """把已知实体加入jieba词典，保证它们被切成完整的词"""
+    if jieba is None:
+        return
+    for word in words:
+        if 1 < len(word) <= MAX_ENTITY_LENGTH:
+            jieba.add_word(word)
+
+
+def segment(text: str) -> list:
+    """分词（精确模式）；未安装jieba时英文串整体保留、中文连续段整体保留"""
+    if jieba is not None:
+        return [w for w in jieba.lcut(text) if WORD.search(w)]
+    return ASCII_TOKEN.findall(text) + CJK_RUN.findall(text)
+
+
+def tokenize(text: str) -> list:
+    """检索用的分词：jieba搜索引擎模式（长词再切出短词），英文小写；
+    未安装jieba时中文按二元组（bigram）切分，单字段保留单字
+    """
+    if jieba is not None:
+        return [w.lower() for w in jieba.lcut_for_search(text) if WORD.search(w)]
+    tokens = [t.lower() for t in ASCII_TOKEN.findall(text)]
+    for run in CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def candidate_entities(text: str) -> set:
+    """从分词结果中挑出可能是实体的词：至少两个字、不是纯数字、不在停用词表
+
+    未安装jieba时过长的中文连续段不能整体当作实体，与关键词索引一样切成二元组，
+    "老板喜欢吃川菜" 仍能按 "老板"、"川菜" 查到
+    """
+    words = set()
+    for word in segment(text):
+        word = word.strip()
+        if jieba is None and CJK_RUN.fullmatch(word) and len(word) > MAX_CJK_RUN_ENTITY:
+            words.update(gram for gram in (word[i:i + 2] for i in range(len(word) - 1))
+                         if gram not in STOPWORDS)
+            continue
+        if len(word) < 2 or word.isdigit() or word in STOPWORDS:
+            continue
+        words.add(word)
+    return words
+
+
+def substrings(text: str, max_length: int = MAX_ENTITY_LENGTH, min_length: int = 2):
+    """文本中所有长度在 [min_length, max_length] 的子串"""
+    for start in range(len(text)):
+        for end in range(start + min_length, min(len(text), start + max_length) + 1):
+            yield text[start:end]
+
+
+def match_entities(text: str, entities, max_length: int = MAX_ENTITY_LENGTH) -> list:
+    """找出文本中出现的已知实体，长词优先、互不重叠
+
+    枚举文本的子串在实体集合中查找，耗时只与文本长度有关，与实体数量无关。
+    """
+    found, covered = [], set()
+    spans = []
+    for start in range(len(text)):
+        for end in range(min(len(text), start + max_length), start, -1):
+            if text[start:end] in entities:
+                spans.append((start, end))
+                break
+    for start, end in sorted(spans, key=lambda s: s[0] - s[1]):
+        if covered.isdisjoint(range(start, end)):
+            covered.update(range(start, end))
+            found.append(text[start:end])
+    return found
@@ -16,7 +16,18 @@ from email.mime.base import MIMEBase
 from email import encoders
 from datetime import datetime
 
+# 工作区 scripts/ 下的重试机制（退避 + 抖动 + smtp 熔断）；单独安装本技能时不重试
+sys.path.insert(0, '/workspace/projects/workspace/scripts')
+try:
+    from retry_mechanism import retry_with_backoff
+except ImportError:
+    def retry_with_backoff(**kwargs):
+        return lambda func: func
+
 CONFIG_PATH = Path.home() / ".openclaw" / "config.json"
+# 只重试连接类错误；认证失败、收件人被拒等重试也不会成功
+SMTP_TRANSIENT_ERRORS = (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected,
+                         ConnectionError, TimeoutError)
 
 def load_config():
     """加载配置"""
@@ -27,6 +38,15 @@ def load_config():
             return config.get("email-sender", config.get("notification", {}).get("email", {}))
     return {}
 
+@retry_with_backoff(max_attempts=3, initial_delay=2, jitter="full", target="smtp",
+                    exceptions=SMTP_TRANSIENT_ERRORS)
+def deliver(smtp_host: str, smtp_port: int, username: str, password: str, msg) -> None:
+    """连接SMTP服务器发送一封已组装好的邮件（连接失败时退避重试）"""
+    context = ssl.create_default_context()
+    with smtplib.SMTP_SSL(smtp_host, smtp_port, context=context, timeout=60) as server:
+        server.login(username, password)
+        server.send_message(msg)
+
 def send_email(subject: str, body: str, to: str = None, 
                html: bool = False, attachment: str = None,
                smtp_host: str = None, smtp_port: int = None,
@@ -88,10 +108,7 @@ def send_email(subject: str, body: str, to: str = None,
             print(f"📎 附件: {os.path.basename(attachment)}")
         
         # 发送邮件
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(smtp_host, smtp_port, context=context, timeout=60) as server:
-            server.login(username, password)
-            server.send_message(msg)
+        deliver(smtp_host, smtp_port, username, password, msg)
         
         print(f"✅ 邮件发送成功！")
         print(f"   收件人: {to}")
@@ -12,7 +12,18 @@ from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+# 工作区 scripts/ 下的重试机制（退避 + 抖动 + 按渠道熔断）；单独安装本技能时不重试
+sys.path.insert(0, '/workspace/projects/workspace/scripts')
+try:
+    from retry_mechanism import retry_with_backoff
+except ImportError:
+    def retry_with_backoff(**kwargs):
+        return lambda func: func
+
 CONFIG_PATH = Path.home() / ".openclaw" / "config.json"
+# 只重试连接类错误；认证失败、收件人被拒等重试也不会成功
+SMTP_TRANSIENT_ERRORS = (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected,
+                         ConnectionError, TimeoutError)
 
 def load_config():
     if CONFIG_PATH.exists():
@@ -20,6 +31,22 @@ def load_config():
             return json.load(f).get("notification", {})
     return {}
 
+@retry_with_backoff(max_attempts=3, initial_delay=2, jitter="full", target="feishu",
+                    exceptions=(requests.ConnectionError, requests.Timeout))
+def post_webhook(webhook: str, data: dict) -> None:
+    """调用飞书机器人Webhook（网络错误时退避重试）"""
+    resp = requests.post(webhook, json=data, timeout=30)
+    resp.raise_for_status()
+
+@retry_with_backoff(max_attempts=3, initial_delay=2, jitter="full", target="smtp",
+                    exceptions=SMTP_TRANSIENT_ERRORS)
+def deliver(smtp_host: str, smtp_port: int, username: str, password: str, msg) -> None:
+    """通过STARTTLS发送一封已组装好的邮件（连接失败时退避重试）"""
+    with smtplib.SMTP(smtp_host, smtp_port, timeout=60) as server:
+        server.starttls()
+        server.login(username, password)
+        server.send_message(msg)
+
 class Notifier:
     def __init__(self):
         self.config = load_config()
@@ -41,8 +68,7 @@ class Notifier:
         }
         
         try:
-            resp = requests.post(webhook, json=data)
-            resp.raise_for_status()
+            post_webhook(webhook, data)
             print("✅ 飞书通知已发送")
             return True
         except Exception as e:
@@ -69,10 +95,7 @@ class Notifier:
             msg['Subject'] = subject
             msg.attach(MIMEText(content, 'plain', 'utf-8'))
             
-            with smtplib.SMTP(smtp_host, smtp_port) as server:
-                server.starttls()
-                server.login(username, password)
-                server.send_message(msg)
+            deliver(smtp_host, smtp_port, username, password, msg)
             
             print(f"✅ 邮件已发送至 {to}")
             return True